@@ -1,5 +1,22 @@
+import io
+
 import streamlit as st
-from PIL import Image, ImageDraw
+
+from ring_designer import (
+    CERTIFICATE_TYPES, CLARITY_GRADES, COLOR_GRADES, DIAMOND_SHAPES, DIAMOND_TYPES,
+    METALS, SETTINGS, SIDE_STONE_SHAPES, RingConfig, calculate_price,
+)
+from ring_designer.animation import ANIMATION_FORMATS, iter_carat_sweep, iter_metal_cycle
+from ring_designer.cache import SKETCH_CACHE
+from ring_designer.compositor import LAYER_CACHE
+from ring_designer.encoding import ENCODE_STATS, ENCODED_CACHE
+from ring_designer.export import iter_print_export
+from ring_designer.price_book import current_price_book
+from ring_designer.progressive import (
+    FINAL_CACHE, cached_final_sketch_bytes, final_sketch_bytes, preview_sketch_bytes,
+)
+from ring_designer.quotes import quote_store
+from ring_designer.timing import HISTOGRAMS, capture, span
 
 # --- Page Configuration ---
 st.set_page_config(layout="wide", page_title="Ring Sketch Designer", page_icon="💍")
@@ -8,65 +25,63 @@ st.set_page_config(layout="wide", page_title="Ring Sketch Designer", page_icon="
 st.title("Ring Sketch Designer")
 st.write("Select the components in the sidebar to sketch your dream ring.")
 
-# --- Constants & Options ---
-DIAMOND_SHAPES = [
-    "Round", "Princess", "Oval", "Emerald",
-    "Cushion", "Pear", "Marquise",
-    "Asscher", "Radiant"
-]
-DIAMOND_TYPES = ["Natural", "Lab-Grown"]
-METALS = {
-    "Yellow Gold (14K)": "yellow_gold",
-    "White Gold (14K)": "white_gold",
-    "Rose Gold (14K)": "rose_gold"
-}
-SETTINGS = {
-    "Solitaire (Single Diamond)": "solitaire",
-    "Halo": "halo",
-    "Three-Stone": "three_stone",
-    "Seven-Stone (Cluster Sides)": "seven_stone"
-}
-SIDE_STONE_SHAPES = ["Round", "Marquise", "Pear"]
-CERTIFICATE_TYPES = ["GIA", "CGL"]
-USD_TO_ILS_RATE = 3.7
-
-# --- Color definitions for drawing ---
-METAL_COLORS_RGB = {
-    "yellow_gold": (212, 175, 55),
-    "white_gold": (220, 220, 220),
-    "rose_gold": (230, 180, 170)
-}
-DIAMOND_OUTLINE = (50, 50, 50)
-DIAMOND_FILL = (245, 245, 245)
+# --- Design State (shareable as ?ring=<id>) ---
+# Widgets read their values from session state, seeded once per session from
+# the URL (or the defaults), so a shared link restores the whole design from
+# one compact RingConfig id.
+DEFAULT_DESIGN = RingConfig(DIAMOND_SHAPES[0], 1.0, DIAMOND_TYPES[0], "G", "VS1",
+                            list(METALS)[0], CERTIFICATE_TYPES[0], list(SETTINGS)[0])
+
+
+def design_widget_state(config):
+    sides = config.side_stones + (SIDE_STONE_SHAPES[0],) * (3 - len(config.side_stones))
+    return {
+        "shape": config.shape, "carat": config.carat, "diamond_type": config.diamond_type,
+        "color": config.color, "clarity": config.clarity, "metal": config.metal,
+        "certificate": config.certificate, "setting": config.setting,
+        "three_stone_shape": sides[0], "seven_stone_1": sides[0], "seven_stone_2": sides[1], "seven_stone_3": sides[2],
+    }
+
+
+if "design_seeded" not in st.session_state:
+    st.session_state.design_seeded = True
+    design = DEFAULT_DESIGN
+    if "ring" in st.query_params:
+        try:
+            design = RingConfig.from_token(st.query_params["ring"])
+        except ValueError:
+            st.warning("That design link is not valid; showing the default ring.")
+    st.session_state.update(design_widget_state(design))
+else:
+    # Widgets that were hidden last run (e.g. side stones) lose their state; re-seed defaults
+    for key, value in design_widget_state(DEFAULT_DESIGN).items():
+        st.session_state.setdefault(key, value)
+
+# --- Apply mode ---
+# With "Apply changes together" on, the sidebar is a form: edits are batched
+# and the page reruns once, on Apply, instead of once per widget.
+apply_mode = st.sidebar.toggle("Apply changes together", key="apply_mode")
+sidebar = st.sidebar.form("ring_options") if apply_mode else st.sidebar
 
 # --- Sidebar Widgets (User Input) ---
-st.sidebar.header("Select Your Ring Components")
-selected_shape = st.sidebar.selectbox("1. Select Diamond Shape:", DIAMOND_SHAPES)
-selected_carat = st.sidebar.slider("2. Select Size (Carat):",
-                                    min_value=0.5, max_value=3.0,
-                                    value=1.0, step=0.1)
-selected_diamond_type = st.sidebar.selectbox("3. Select Diamond Type:", DIAMOND_TYPES)
-
-st.sidebar.subheader("4. Diamond Quality")
-selected_color = st.sidebar.select_slider("Color:",
-                                         options=["J", "I", "H", "G", "F", "E", "D"],
-                                         value="G")
-selected_clarity = st.sidebar.select_slider("Clarity:",
-                                           options=["SI2", "SI1", "VS2", "VS1", "VVS2", "VVS1", "IF", "FL"],
-                                           value="VS1")
-
-selected_metal = st.sidebar.selectbox("5. Select Metal Type:", list(METALS.keys()))
-selected_certificate = st.sidebar.selectbox("6. Select Certificate:", CERTIFICATE_TYPES)
-
-selected_setting = st.sidebar.selectbox("7. Select Setting Type:", list(SETTINGS.keys()))
+# Only options that change the sketch live here; changing one reruns the
+# whole page. Price-only options are in the price panel fragment below.
+sidebar.header("Select Your Ring Components")
+selected_shape = sidebar.selectbox("1. Select Diamond Shape:", DIAMOND_SHAPES, key="shape")
+selected_carat = sidebar.slider("2. Select Size (Carat):",
+                                min_value=0.5, max_value=3.0,
+                                step=0.1, key="carat")
+
+selected_metal = sidebar.selectbox("5. Select Metal Type:", list(METALS.keys()), key="metal")
+selected_setting = sidebar.selectbox("7. Select Setting Type:", list(SETTINGS.keys()), key="setting")
 
 # --- Side stone selection (now follows Setting) ---
 setting_key = SETTINGS[selected_setting]
 side_stone_shapes = ("Round",) # Default tuple
 
 if setting_key == "three_stone":
-    st.sidebar.subheader("Side Stone")
-    shape = st.sidebar.selectbox(
+    sidebar.subheader("Side Stone")
+    shape = sidebar.selectbox(
         "Select Side Stone Shape:",
         SIDE_STONE_SHAPES,
         key="three_stone_shape"
@@ -74,476 +89,87 @@ if setting_key == "three_stone":
     side_stone_shapes = (shape,) # Tuple with one element
 
 elif setting_key == "seven_stone":
-    st.sidebar.subheader("Side Stones (Symmetrical)")
-    shape_1 = st.sidebar.selectbox(
+    sidebar.subheader("Side Stones (Symmetrical)")
+    shape_1 = sidebar.selectbox(
         "Stone 1 (Top):",
         SIDE_STONE_SHAPES,
         key="seven_stone_1"
     )
-    shape_2 = st.sidebar.selectbox(
+    shape_2 = sidebar.selectbox(
         "Stone 2 (Bottom):",
         SIDE_STONE_SHAPES,
         key="seven_stone_2"
     )
-    shape_3 = st.sidebar.selectbox(
+    shape_3 = sidebar.selectbox(
         "Stone 3 (Side):",
         SIDE_STONE_SHAPES,
         key="seven_stone_3"
     )
     side_stone_shapes = (shape_1, shape_2, shape_3) # Tuple with three elements
 
+if apply_mode:
+    sidebar.form_submit_button("Apply", type="primary")
+    st.sidebar.caption("Side stone choices appear after applying a new setting.")
 
-# --- Price Calculation Logic (Demo) ---
-BASE_DIAMOND_PRICE_PER_CARAT = 5000
-DIAMOND_TYPE_MULTIPLIERS = {"Natural": 1.0, "Lab-Grown": 0.5} 
-SHAPE_MULTIPLIERS = {
-    "Round": 1.0, "Princess": 0.9, "Oval": 0.95,
-    "Emerald": 0.9, "Cushion": 0.85, "Pear": 0.9,
-    "Marquise": 0.8, "Asscher": 0.85, "Radiant": 0.88
-}
-COLOR_MULTIPLIERS = {"J": 0.8, "I": 0.9, "H": 1.0, "G": 1.1, "F": 1.3, "E": 1.5, "D": 2.0}
-CLARITY_MULTIPLIERS = {"SI2": 0.8, "SI1": 0.9, "VS2": 1.0, "VS1": 1.1, "VVS2": 1.3, "VVS1": 1.5, "IF": 1.8, "FL": 2.2}
-METAL_BASE_PRICE = {"Yellow Gold (14K)": 500, "White Gold (14K)": 550, "Rose Gold (14K)": 520}
-SETTING_BASE_PRICE = {
-    "Solitaire (Single Diamond)": 200,
-    "Halo": 800,
-    "Three-Stone": 600,
-    "Seven-Stone (Cluster Sides)": 1400
-}
-CERTIFICATE_MULTIPLIERS = {"GIA": 1.15, "CGL": 1.0}
-SIDE_STONE_MULTIPLIER = {"Round": 1.0, "Marquise": 1.2, "Pear": 1.25}
-
-def calculate_price(shape, carat, color, clarity, metal, setting, certificate, side_shapes_tuple, diamond_type):
-    base_price = BASE_DIAMOND_PRICE_PER_CARAT * carat
-    
-    type_factor = DIAMOND_TYPE_MULTIPLIERS.get(diamond_type, 1.0)
-    shape_factor = SHAPE_MULTIPLIERS.get(shape, 1.0)
-    color_factor = COLOR_MULTIPLIERS.get(color, 1.0)
-    clarity_factor = CLARITY_MULTIPLIERS.get(clarity, 1.0)
-    cert_factor = CERTIFICATE_MULTIPLIERS.get(certificate, 1.0)
-    
-    diamond_price_usd = base_price * type_factor * shape_factor * color_factor * clarity_factor * cert_factor
-    
-    setting_base = SETTING_BASE_PRICE.get(setting, 200)
-    
-    side_stone_factor = 1.0
-    if SETTINGS[setting] in ["three_stone", "seven_stone"]:
-        total_multiplier = sum(SIDE_STONE_MULTIPLIER.get(s, 1.0) for s in side_shapes_tuple)
-        side_stone_factor = total_multiplier / len(side_shapes_tuple)
-
-    setting_price_usd = METAL_BASE_PRICE.get(metal, 500) + (setting_base * side_stone_factor)
-        
-    total_price_usd = diamond_price_usd + setting_price_usd
-    
-    total_price_ils = total_price_usd * USD_TO_ILS_RATE
-    diamond_price_ils = diamond_price_usd * USD_TO_ILS_RATE
-    setting_price_ils = setting_price_usd * USD_TO_ILS_RATE
-    
-    return total_price_ils, diamond_price_ils, setting_price_ils
-
-# --- Helper function for drawing prongs ---
-def draw_prongs(draw, center_x, center_y, radius_x, radius_y, color, base_size_px):
-    """Draws 4 small prongs outside a stone, respecting x and y radius."""
-    prong_size = max(2, int(base_size_px * 0.05)) 
-    half_prong = max(1, prong_size // 2)
-    
-    offset_x = radius_x + half_prong 
-    offset_y = radius_y + half_prong
-    
-    draw.ellipse([(center_x - offset_x - half_prong, center_y - half_prong), 
-                  (center_x - offset_x + half_prong, center_y + half_prong)], fill=color) # Left
-    draw.ellipse([(center_x + offset_x - half_prong, center_y - half_prong), 
-                  (center_x + offset_x + half_prong, center_y + half_prong)], fill=color) # Right
-    draw.ellipse([(center_x - half_prong, center_y - offset_y - half_prong), 
-                  (center_x + half_prong, center_y - offset_y + half_prong)], fill=color) # Top
-    draw.ellipse([(center_x - half_prong, center_y + offset_y - half_prong), 
-                  (center_x + half_prong, center_y + offset_y + half_prong)], fill=color) # Bottom
-
-# --- Helper function for drawing side stones ---
-def draw_side_stone(draw, shape, center_x, center_y, radius, color, outline, orientation='up'):
-    if radius <= 0: return (0, 0) # Return tuple
-    
-    h_radius_out = radius
-    v_radius_out = radius
-
-    if shape == "Round":
-        draw.ellipse(
-            [(center_x - radius, center_y - radius),
-             (center_x + radius, center_y + radius)],
-            outline=outline, fill=color, width=2
-        )
-    elif shape == "Marquise":
-        h_radius = max(1, int(radius * 0.8))
-        v_radius = int(radius * 1.5)
-        
-        if orientation == 'left' or orientation == 'right':
-            h_radius = int(radius * 1.5)
-            v_radius = max(1, int(radius * 0.8))
-        
-        h_radius_out = h_radius
-        v_radius_out = v_radius
-        
-        draw.polygon(
-            [
-                (center_x, center_y - v_radius), # Top
-                (center_x + h_radius, center_y), # Right
-                (center_x, center_y + v_radius), # Bottom
-                (center_x - h_radius, center_y)  # Left
-            ],
-            outline=outline, fill=color, width=2
-        )
-    elif shape == "Pear":
-        h_radius = radius
-        v_radius = int(radius * 1.3)
-        h_radius_out, v_radius_out = h_radius, v_radius
-        
-        if orientation == 'up':
-            points = [(center_x, center_y - v_radius), (center_x + h_radius, center_y), (center_x + h_radius * 0.5, center_y + v_radius), (center_x - h_radius * 0.5, center_y + v_radius), (center_x - h_radius, center_y)]
-        elif orientation == 'down':
-             points = [(center_x, center_y + v_radius), (center_x + h_radius, center_y), (center_x + h_radius * 0.5, center_y - v_radius), (center_x - h_radius * 0.5, center_y - v_radius), (center_x - h_radius, center_y)]
-        elif orientation == 'left':
-            h_radius, v_radius = v_radius, h_radius
-            h_radius_out, v_radius_out = h_radius, v_radius
-            points = [(center_x - h_radius, center_y), (center_x, center_y - v_radius), (center_x + h_radius * 0.8, center_y - v_radius * 0.5), (center_x + h_radius * 0.8, center_y + v_radius * 0.5), (center_x, center_y + v_radius)]
-        else: # 'right'
-            h_radius, v_radius = v_radius, h_radius
-            h_radius_out, v_radius_out = h_radius, v_radius
-            points = [(center_x + h_radius, center_y), (center_x, center_y - v_radius), (center_x - h_radius * 0.8, center_y - v_radius * 0.5), (center_x - h_radius * 0.8, center_y + v_radius * 0.5), (center_x, center_y + v_radius)]
-        draw.polygon(points, outline=outline, fill=color, width=2)
-    
-    return h_radius_out, v_radius_out
-
-
-# --- Image SKETCHING Logic (Top-Down "On-Hand" View) ---
-def create_ring_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple):
-    IMG_SIZE = 500
-    CENTER = (IMG_SIZE // 2, IMG_SIZE // 2)
-    
-    canvas = Image.new("RGB", (IMG_SIZE, IMG_SIZE), "white")
-    draw = ImageDraw.Draw(canvas)
-    
-    band_color = METAL_COLORS_RGB.get(metal_key, "grey")
-    
-    base_size_px = int(carat * 35) 
-    half_size = max(1, base_size_px // 2)
-    
-    # --- Step A: Calculate Dimensions (No Drawing) ---
-    total_setting_width = base_size_px
-    main_stone_coords = [
-        (CENTER[0] - half_size, CENTER[1] - half_size),
-        (CENTER[0] + half_size, CENTER[1] + half_size)
-    ]
-    main_stone_extents = {'half_width': half_size, 'half_height': half_size}
-
-    if "Oval" in shape:
-        main_stone_extents['half_height'] = int(half_size * 1.4)
-        main_stone_extents['half_width'] = half_size
-        main_stone_coords = [(CENTER[0] - half_size, CENTER[1] - main_stone_extents['half_height']), (CENTER[0] + half_size, CENTER[1] + main_stone_extents['half_height'])]
-    elif "Pear" in shape:
-        main_stone_extents['half_height'] = int(half_size * 1.3)
-        main_stone_extents['half_width'] = half_size
-        main_stone_coords = [(CENTER[0] - main_stone_extents['half_width'], CENTER[1] - main_stone_extents['half_height']), (CENTER[0] + main_stone_extents['half_width'], CENTER[1] + main_stone_extents['half_height'])]
-    elif "Marquise" in shape:
-        main_stone_extents['half_height'] = int(half_size * 1.5)
-        main_stone_extents['half_width'] = max(1, int(half_size * 0.8)) # "Fatter" marquise
-        main_stone_coords = [(CENTER[0] - main_stone_extents['half_width'], CENTER[1] - main_stone_extents['half_height']), (CENTER[0] + main_stone_extents['half_width'], CENTER[1] + main_stone_extents['half_height'])]
-
-    side_stone_radius = 0 # Initialize
-    if "halo" in setting_key:
-        halo_padding = 8
-        # Adjust total setting width to accommodate halo around different shapes
-        total_setting_width = (main_stone_extents['half_width'] + halo_padding) * 2
-    elif "three_stone" in setting_key:
-        side_stone_radius = max(4, int(base_size_px / 4.0)) 
-        # Total width is main stone + 2 side stones
-        total_setting_width = (main_stone_extents['half_width'] * 2) + (side_stone_radius * 4) # Approximation
-    elif "seven_stone" in setting_key:
-        side_stone_radius = max(3, int(base_size_px / 6.0))
-        # Total width is main stone + 2 clusters (each approx 3 stones wide)
-        total_setting_width = (main_stone_extents['half_width'] * 2) + (side_stone_radius * 8) # Approximation
-    else: # Solitaire
-        total_setting_width = main_stone_extents['half_width'] * 2
-            
-    # --- Step B: Draw the Ring Band "Shoulders" (FIRST) ---
-    # === THIS BLOCK IS CORRECTED ===
-    band_thickness = 14
-    band_y_start = CENTER[1] - (band_thickness // 2)
-    band_y_end = CENTER[1] + (band_thickness // 2)
-
-    # Calculate the effective width of the entire setting
-    effective_setting_half_width = total_setting_width // 2
-
-    # *** FIX ***: For Solitaire, the band connects to the stone's *actual* width.
-    # For other settings, it connects to the *total setting* width (which includes halo/side stones).
-    if setting_key == "solitaire":
-        # For long stones, connect to the horizontal radius
-        if shape in ["Oval", "Pear", "Marquise", "Emerald", "Radiant", "Asscher", "Cushion", "Princess"]:
-             effective_setting_half_width = main_stone_extents['half_width']
-        # For Round, it's the same
-        else:
-             effective_setting_half_width = main_stone_extents['half_width']
-
-    # Draw the main parts of the band, connecting to the effective width
-    draw.rectangle(
-        [(0, band_y_start), (CENTER[0] - effective_setting_half_width, band_y_end)],
-        fill=band_color
-    )
-    draw.rectangle(
-        [(CENTER[0] + effective_setting_half_width, band_y_start), (IMG_SIZE, band_y_end)],
-        fill=band_color
-    )
-
-    # For settings that aren't solitaire, draw a connecting piece (basket/base)
-    if setting_key in ["halo", "three_stone", "seven_stone"]:
-        draw.rectangle(
-            [(CENTER[0] - effective_setting_half_width, band_y_start),
-             (CENTER[0] + effective_setting_half_width, band_y_end)],
-            fill=band_color
-        )
-    # === END OF CORRECTED BLOCK B ===
-        
-    # --- Step C: Draw Main Diamond (SECOND) ---
-    main_radius_x = main_stone_extents['half_width']
-    main_radius_y = main_stone_extents['half_height']
-    
-    if "Round" in shape:
-        draw.ellipse(main_stone_coords, outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL, width=2)
-    elif "Princess" in shape:
-        draw.rectangle(main_stone_coords, outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL, width=2)
-        draw.line([(main_stone_coords[0]), (main_stone_coords[1])], fill=DIAMOND_OUTLINE)
-        draw.line([(main_stone_coords[0][0], main_stone_coords[1][1]), (main_stone_coords[1][0], main_stone_coords[0][1])], fill=DIAMOND_OUTLINE)
-    elif "Oval" in shape:
-        draw.ellipse(main_stone_coords, outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL, width=2)
-    elif "Emerald" in shape or "Radiant" in shape:
-        cut_size = max(1, half_size // 4)
-        points = [
-            (CENTER[0] - half_size + cut_size, CENTER[1] - half_size), (CENTER[0] + half_size - cut_size, CENTER[1] - half_size),
-            (CENTER[0] + half_size, CENTER[1] - half_size + cut_size), (CENTER[0] + half_size, CENTER[1] + half_size - cut_size),
-            (CENTER[0] + half_size - cut_size, CENTER[1] + half_size), (CENTER[0] - half_size + cut_size, CENTER[1] + half_size),
-            (CENTER[0] - half_size, CENTER[1] + half_size - cut_size), (CENTER[0] - half_size, CENTER[1] - half_size + cut_size),
-        ]
-        draw.polygon(points, outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL, width=2)
-    elif "Cushion" in shape:
-        draw.rounded_rectangle(main_stone_coords, radius=max(1, half_size // 3), outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL, width=2)
-    elif "Pear" in shape:
-        points = [
-            (CENTER[0], CENTER[1] - main_radius_y), # Top point
-            (CENTER[0] + main_radius_x, CENTER[1]), # Right shoulder
-            (CENTER[0] + main_radius_x * 0.5, CENTER[1] + main_radius_y), # Bottom-right
-            (CENTER[0] - main_radius_x * 0.5, CENTER[1] + main_radius_y), # Bottom-left
-            (CENTER[0] - main_radius_x, CENTER[1])  # Left shoulder
-        ]
-        draw.polygon(points, outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL, width=2)
-    elif "Marquise" in shape:
-        points = [(CENTER[0], CENTER[1] - main_radius_y), (CENTER[0] + main_radius_x, CENTER[1]), (CENTER[0], CENTER[1] + main_radius_y), (CENTER[0] - main_radius_x, CENTER[1])]
-        draw.polygon(points, outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL, width=2)
-    else: # Fallback for Asscher
-        draw.rectangle(main_stone_coords, outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL, width=2)
-
-    # --- Step D: Draw the Setting (Prongs, Halo, Side Stones) (LAST) ---
-    # === THIS BLOCK IS CORRECTED ===
-    if "solitaire" in setting_key:
-        if shape in ["Marquise", "Pear"]:
-            # Special V-prongs for tips and side prongs for support for Marquise/Pear
-            prong_size = max(2, int(base_size_px * 0.05)) * 2 # Make V-prongs more visible
-            half_prong_size = max(1, prong_size // 2)
-
-            # Side prongs (at widest part)
-            offset_x = main_radius_x + (half_prong_size // 2)
-            draw.ellipse([(CENTER[0] - offset_x - half_prong_size, CENTER[1] - half_prong_size),
-                          (CENTER[0] - offset_x + half_prong_size, CENTER[1] + half_prong_size)], fill=band_color) # Left
-            draw.ellipse([(CENTER[0] + offset_x - half_prong_size, CENTER[1] - half_prong_size),
-                          (CENTER[0] + offset_x + half_prong_size, CENTER[1] + half_prong_size)], fill=band_color) # Right
-
-            # V-prongs at tips (approximated)
-            offset_y_top = main_radius_y
-            # Top V-prong
-            draw.polygon([(CENTER[0], CENTER[1] - offset_y_top),
-                          (CENTER[0] - half_prong_size, CENTER[1] - offset_y_top - prong_size),
-                          (CENTER[0] + half_prong_size, CENTER[1] - offset_y_top - prong_size)], fill=band_color)
-            
-            if shape == "Marquise":
-                # Bottom V-prong
-                offset_y_bottom = main_radius_y
-                draw.polygon([(CENTER[0], CENTER[1] + offset_y_bottom),
-                              (CENTER[0] - half_prong_size, CENTER[1] + offset_y_bottom + prong_size),
-                              (CENTER[0] + half_prong_size, CENTER[1] + offset_y_bottom + prong_size)], fill=band_color)
-            else: # Pear (flat bottom)
-                # Bottom prongs (2)
-                offset_y_bottom = main_radius_y + (half_prong_size // 2)
-                prong_base_width = main_radius_x * 0.5
-                draw.ellipse([(CENTER[0] - prong_base_width - half_prong_size, CENTER[1] + offset_y_bottom - half_prong_size),
-                              (CENTER[0] - prong_base_width + half_prong_size, CENTER[1] + offset_y_bottom + half_prong_size)], fill=band_color)
-                draw.ellipse([(CENTER[0] + prong_base_width - half_prong_size, CENTER[1] + offset_y_bottom - half_prong_size),
-                              (CENTER[0] + prong_base_width + half_prong_size, CENTER[1] + offset_y_bottom + half_prong_size)], fill=band_color)
-        
-        # *** NEW FIX ***: Special corner prongs for Emerald, Radiant, Asscher, Princess, Cushion
-        elif shape in ["Emerald", "Radiant", "Asscher", "Princess", "Cushion"]:
-            prong_width = max(3, int(base_size_px * 0.1)) # Width of the corner prong
-            prong_length = max(3, int(base_size_px * 0.15)) # Length of the corner prong
-            
-            # Get the exact corner coordinates of the main stone
-            top_left = main_stone_coords[0]
-            top_right = (main_stone_coords[1][0], main_stone_coords[0][1])
-            bottom_left = (main_stone_coords[0][0], main_stone_coords[1][1])
-            bottom_right = main_stone_coords[1]
-            
-            # Adjust for Emerald/Radiant/Asscher cut corners
-            if shape in ["Emerald", "Radiant", "Asscher"]:
-                 cut_size = max(1, half_size // 4)
-                 top_left = (top_left[0] + cut_size, top_left[1])
-                 top_right = (top_right[0] - cut_size, top_right[1])
-                 bottom_left = (bottom_left[0] + cut_size, bottom_left[1])
-                 bottom_right = (bottom_right[0] - cut_size, bottom_right[1])
-
-            # Top-Left Corner Prong
-            draw.polygon([
-                (top_left[0] - prong_length, top_left[1]),
-                (top_left[0], top_left[1] - prong_length),
-                (top_left[0] + prong_width, top_left[1]),
-                (top_left[0], top_left[1] + prong_width)
-            ], fill=band_color)
-
-            # Top-Right Corner Prong
-            draw.polygon([
-                (top_right[0] + prong_length, top_right[1]),
-                (top_right[0], top_right[1] - prong_length),
-                (top_right[0] - prong_width, top_right[1]),
-                (top_right[0], top_right[1] + prong_width)
-            ], fill=band_color)
-
-            # Bottom-Left Corner Prong
-            draw.polygon([
-                (bottom_left[0] - prong_length, bottom_left[1]),
-                (bottom_left[0], bottom_left[1] + prong_length),
-                (bottom_left[0] + prong_width, bottom_left[1]),
-                (bottom_left[0], bottom_left[1] - prong_width)
-            ], fill=band_color)
-
-            # Bottom-Right Corner Prong
-            draw.polygon([
-                (bottom_right[0] + prong_length, bottom_right[1]),
-                (bottom_right[0], bottom_right[1] + prong_length),
-                (bottom_right[0] - prong_width, bottom_right[1]),
-                (bottom_right[0], bottom_right[1] - prong_width)
-            ], fill=band_color)
-
-        else:
-            # Standard 4 prongs for Round and Oval shapes
-            draw_prongs(draw, CENTER[0], CENTER[1], main_radius_x, main_radius_y, band_color, base_size_px=base_size_px)
-            
-    elif "halo" in setting_key:
-        # *** FIX ***: No prongs for halo, just the halo frame
-        halo_padding = 8
-        coords = [(main_stone_coords[0][0] - halo_padding, main_stone_coords[0][1] - halo_padding), (main_stone_coords[1][0] + halo_padding, main_stone_coords[1][1] + halo_padding)]
-        
-        if "Round" in shape or "Oval" in shape:
-            draw.ellipse(coords, outline=band_color, width=6)
-        elif "Princess" in shape or "Cushion" in shape or "Emerald" in shape or "Radiant" in shape or "Asscher" in shape:
-             draw.rounded_rectangle(coords, radius=halo_padding, outline=band_color, width=6)
-        elif "Pear" in shape:
-             halo_main_radius_x = main_radius_x + halo_padding
-             halo_main_radius_y = main_radius_y + halo_padding
-             points = [
-                 (CENTER[0], CENTER[1] - halo_main_radius_y), (CENTER[0] + halo_main_radius_x, CENTER[1]),
-                 (CENTER[0] + halo_main_radius_x * 0.5, CENTER[1] + halo_main_radius_y),
-                 (CENTER[0] - halo_main_radius_x * 0.5, CENTER[1] + halo_main_radius_y),
-                 (CENTER[0] - halo_main_radius_x, CENTER[1])]
-             draw.polygon(points, outline=band_color, width=6)
-        elif "Marquise" in shape:
-             halo_main_radius_x = main_radius_x + halo_padding
-             halo_main_radius_y = main_radius_y + halo_padding
-             points = [(CENTER[0], CENTER[1] - halo_main_radius_y), (CENTER[0] + halo_main_radius_x, CENTER[1]), 
-                       (CENTER[0], CENTER[1] + halo_main_radius_y), (CENTER[0] - halo_main_radius_x, CENTER[1])]
-             draw.polygon(points, outline=band_color, width=6)
-            
-    elif "three_stone" in setting_key:
-        side_stone_shape = side_shapes_tuple[0]
-        side_stone_radius = max(4, int(base_size_px / 4.0))
-        
-        # Calculate horizontal offset based on main stone width
-        h_offset = main_radius_x + side_stone_radius
-        
-        left_center_x = CENTER[0] - h_offset
-        rx1, ry1 = draw_side_stone(draw, side_stone_shape, left_center_x, CENTER[1], side_stone_radius, DIAMOND_FILL, DIAMOND_OUTLINE, orientation='right')
-        draw_prongs(draw, left_center_x, CENTER[1], rx1, ry1, band_color, base_size_px=base_size_px)
-        
-        right_center_x = CENTER[0] + h_offset
-        rx2, ry2 = draw_side_stone(draw, side_stone_shape, right_center_x, CENTER[1], side_stone_radius, DIAMOND_FILL, DIAMOND_OUTLINE, orientation='left')
-        draw_prongs(draw, right_center_x, CENTER[1], rx2, ry2, band_color, base_size_px=base_size_px)
-        
-        draw_prongs(draw, CENTER[0], CENTER[1], main_radius_x, main_radius_y, band_color, base_size_px=base_size_px)
-        
-    elif "seven_stone" in setting_key:
-        shape_1, shape_2, shape_3 = side_shapes_tuple
-        side_stone_radius = max(3, int(base_size_px / 6.0))
-        buffer = 1
-        
-        h_offset_1 = main_radius_x + side_stone_radius
-        v_offset_1 = side_stone_radius + buffer
-        h_offset_2 = h_offset_1 + (side_stone_radius * 2)
-
-        # Left Cluster
-        left_1_x, left_1_y = CENTER[0] - h_offset_1, CENTER[1] - v_offset_1
-        rx1, ry1 = draw_side_stone(draw, shape_1, left_1_x, left_1_y, side_stone_radius, DIAMOND_FILL, DIAMOND_OUTLINE, orientation='right')
-        draw_prongs(draw, left_1_x, left_1_y, rx1, ry1, band_color, base_size_px=base_size_px)
-        
-        left_2_x, left_2_y = CENTER[0] - h_offset_1, CENTER[1] + v_offset_1
-        rx2, ry2 = draw_side_stone(draw, shape_2, left_2_x, left_2_y, side_stone_radius, DIAMOND_FILL, DIAMOND_OUTLINE, orientation='right')
-        draw_prongs(draw, left_2_x, left_2_y, rx2, ry2, band_color, base_size_px=base_size_px)
-        
-        left_3_x, left_3_y = CENTER[0] - h_offset_2, CENTER[1]
-        rx3, ry3 = draw_side_stone(draw, shape_3, left_3_x, left_3_y, side_stone_radius, DIAMOND_FILL, DIAMOND_OUTLINE, orientation='left')
-        draw_prongs(draw, left_3_x, left_3_y, rx3, ry3, band_color, base_size_px=base_size_px)
-        
-        # Right Cluster
-        right_1_x, right_1_y = CENTER[0] + h_offset_1, CENTER[1] - v_offset_1
-        rx4, ry4 = draw_side_stone(draw, shape_1, right_1_x, right_1_y, side_stone_radius, DIAMOND_FILL, DIAMOND_OUTLINE, orientation='left')
-        draw_prongs(draw, right_1_x, right_1_y, rx4, ry4, band_color, base_size_px=base_size_px)
-        
-        right_2_x, right_2_y = CENTER[0] + h_offset_1, CENTER[1] + v_offset_1
-        rx5, ry5 = draw_side_stone(draw, shape_2, right_2_x, right_2_y, side_stone_radius, DIAMOND_FILL, DIAMOND_OUTLINE, orientation='left')
-        draw_prongs(draw, right_2_x, right_2_y, rx5, ry5, band_color, base_size_px=base_size_px)
-
-        right_3_x, right_3_y = CENTER[0] + h_offset_2, CENTER[1]
-        rx6, ry6 = draw_side_stone(draw, shape_3, right_3_x, right_3_y, side_stone_radius, DIAMOND_FILL, DIAMOND_OUTLINE, orientation='right')
-        draw_prongs(draw, right_3_x, right_3_y, rx6, ry6, band_color, base_size_px=base_size_px)
-        
-        draw_prongs(draw, CENTER[0], CENTER[1], main_radius_x, main_radius_y, band_color, base_size_px=base_size_px)
-    # === END OF CORRECTED BLOCK D ===
-
-    return canvas
-
-# --- Main App Logic ---
-
-# 1. Calculate price
-total_price, diamond_price, setting_price = calculate_price(
-    selected_shape, selected_carat, selected_color,
-    selected_clarity, selected_metal, selected_setting,
-    selected_certificate, side_stone_shapes, selected_diamond_type
-)
-
-# 2. Generate the sketch
-final_ring_image = create_ring_sketch(
-    selected_shape,
-    selected_carat,
-    METALS[selected_metal],
-    SETTINGS[selected_setting],
-    side_stone_shapes
-)
+# Spans recorded while this session's script runs, for the debug panel
+rerun_spans = {}
+# Full-page reruns vs. fragment-only reruns, for the debug panel
+run_counts = st.session_state.setdefault("run_counts", {"page": 0, "price": 0, "sketch": 0, "budget": 0, "quotes": 0})
+run_counts["page"] += 1
 
 # 3. Display the results
 st.sidebar.success("Your sketch is ready!")
 
-# --- Display Area (Main Page) ---
-col1, col2 = st.columns(2)
 
-with col1:
-    st.header("Your Sketch:")
-    st.image(final_ring_image, use_column_width=True)
+# --- Price Panel (fragment) ---
+# Diamond type, color, clarity, certificate and currency only change the
+# price, so their widgets live inside this fragment: editing them reruns
+# this panel alone and never touches the sketch.
+@st.fragment
+def price_panel(*design):
+    run_counts["price"] += 1
+    # The fragment's own cost, i.e. what a price-only edit costs in the browser
+    with span("ui.price_panel"):
+        render_price_panel(*design)
+
+
+def render_price_panel(selected_shape, selected_carat, selected_metal, selected_setting, side_stone_shapes):
+    setting_key = SETTINGS[selected_setting]
+    # Price-only options follow the sidebar's apply mode
+    panel = st.form("price_options", border=False) if apply_mode else st.container()
+    with panel:
+        st.subheader("Diamond Quality & Price")
+        selected_diamond_type = st.selectbox("3. Select Diamond Type:", DIAMOND_TYPES, key="diamond_type")
+        selected_color = st.select_slider("Color:",
+                                          options=COLOR_GRADES, key="color")
+        selected_clarity = st.select_slider("Clarity:",
+                                            options=CLARITY_GRADES, key="clarity")
+        selected_certificate = st.selectbox("6. Select Certificate:", CERTIFICATE_TYPES, key="certificate")
+
+        # Currency rates come from the price book, which can change without a restart
+        price_book = current_price_book()
+        currencies = list(price_book.currencies)
+        selected_currency = st.selectbox("Currency:", currencies,
+                                         index=currencies.index(price_book.default_currency), key="currency")
+        currency_symbol = price_book.symbol(selected_currency)
+        if apply_mode:
+            st.form_submit_button("Apply", type="primary")
+
+    # 1. Calculate price
+    with capture(rerun_spans):
+        total_price, diamond_price, setting_price = calculate_price(
+            selected_shape, selected_carat, selected_color,
+            selected_clarity, selected_metal, selected_setting,
+            selected_certificate, side_stone_shapes, selected_diamond_type,
+            selected_currency, price_book
+        )
 
-with col2:
-    st.header(f"Estimated Price: ₪{total_price:,.0f}")
+    # Keep the URL pointing at the current design so it can be shared
+    design = RingConfig(selected_shape, selected_carat, selected_diamond_type, selected_color, selected_clarity,
+                        selected_metal, selected_certificate, selected_setting, side_stone_shapes)
+    st.query_params["ring"] = design.token
+
+    st.header(f"Estimated Price: {currency_symbol}{total_price:,.0f}")
     st.subheader("Your Selections:")
     
     selections_markdown = f"""
@@ -565,9 +191,188 @@ with col2:
         selections_markdown += f"\n    * **Side Stone 3 (Side):** {side_stone_shapes[2]}"
         
     st.markdown(selections_markdown)
+    st.caption(f"Design ID: `{design.token}` (this page's URL links to it)")
     
     st.subheader("Cost Breakdown (Demo):")
     st.markdown(f"""
-    * **Diamond Cost:** ₪{diamond_price:,.0f}
-    * **Setting & Metal Cost:** ₪{setting_price:,.0f}
+    * **Diamond Cost:** {currency_symbol}{diamond_price:,.0f}
+    * **Setting & Metal Cost:** {currency_symbol}{setting_price:,.0f}
     """)
+
+    # Save this design with the price it was quoted at
+    customer = st.text_input("Customer (optional):", key="quote_customer")
+    if st.button("Save quote"):
+        with capture(rerun_spans), span("quotes.save"):
+            quote_id = quote_store().save(design, (total_price, diamond_price, setting_price), selected_currency,
+                                          price_book.version, customer or None)
+        st.success(f"Saved quote #{quote_id}")
+
+
+# --- Budget Search (fragment) ---
+BUDGET_ORDERS = {
+    "Carat, then color, then clarity": ("carat", "color", "clarity"),
+    "Color, then clarity, then carat": ("color", "clarity", "carat"),
+    "Clarity, then color, then carat": ("clarity", "color", "carat"),
+}
+
+
+@st.fragment
+def budget_panel(selected_shape, selected_metal, selected_setting, side_stone_shapes):
+    run_counts["budget"] += 1
+    price_book = current_price_book()
+    selected_currency = st.session_state.get("currency", price_book.default_currency)
+    currency_symbol = price_book.symbol(selected_currency)
+    with st.expander("What's the best ring for my budget?"):
+        budget = st.number_input(f"Budget ({currency_symbol}):", min_value=1000, value=25000, step=1000)
+        order_label = st.selectbox("Rank by:", list(BUDGET_ORDERS))
+        keep_current = st.multiselect(
+            "Keep my current:", ["Shape", "Diamond Type", "Metal", "Certificate", "Setting"]
+        )
+        if st.button("Find rings"):
+            # NumPy is only imported once somebody actually searches
+            from ring_designer.budget import search_budget
+
+            current = {
+                "Shape": {"shape": selected_shape},
+                "Diamond Type": {"diamond_type": st.session_state.get("diamond_type", DIAMOND_TYPES[0])},
+                "Metal": {"metal": selected_metal},
+                "Certificate": {"certificate": st.session_state.get("certificate", CERTIFICATE_TYPES[0])},
+                "Setting": {"setting": selected_setting, "side_shapes": [side_stone_shapes]},
+            }
+            budget_filters = {}
+            for choice in keep_current:
+                budget_filters.update(current[choice])
+            with capture(rerun_spans), span("budget.search"):
+                matches = search_budget(budget, 20, BUDGET_ORDERS[order_label], budget_filters,
+                                        selected_currency)
+            if matches:
+                st.dataframe([
+                    {"design": match["id"], **match["config"],
+                     "side_stones": (", ".join(match["config"]["side_stones"])
+                                     if SETTINGS[match["config"]["setting"]] in ("three_stone", "seven_stone") else ""),
+                     f"price ({currency_symbol})": round(match["total"])}
+                    for match in matches
+                ], hide_index=True)
+            else:
+                st.info("No ring fits this budget with the options you kept.")
+
+
+# --- Saved Quotes (fragment) ---
+def quotes_csv(quote_filters):
+    """The CSV export of the filtered quotes (built only when Download is clicked)."""
+    export = io.StringIO()
+    quote_store().export_csv(export, **quote_filters)
+    return export.getvalue()
+
+
+@st.fragment
+def quotes_panel():
+    run_counts["quotes"] += 1
+    # Tracks its open state, so a collapsed panel runs no queries
+    quotes = st.expander("Saved quotes", key="quotes_open", on_change="rerun")
+    if not quotes.open:
+        return
+    with quotes:
+        store = quote_store()
+        filter_cols = st.columns(3)
+        quote_filters = {
+            "shape": filter_cols[0].multiselect("Shape:", DIAMOND_SHAPES, key="quotes_shape"),
+            "setting": filter_cols[1].multiselect("Setting:", list(SETTINGS), key="quotes_setting"),
+        }
+        since = filter_cols[2].date_input("Since:", value=None, key="quotes_since")
+        if since is not None:
+            quote_filters["since"] = since.isoformat()
+        with capture(rerun_spans), span("quotes.list"):
+            total_quotes = store.count(**quote_filters)
+            rows = store.list(200, **quote_filters)
+        st.caption(f"{total_quotes:,} quotes" + (" (newest 200 shown)" if total_quotes > 200 else ""))
+        if rows:
+            st.dataframe(rows, hide_index=True)
+            st.download_button("Download CSV", lambda: quotes_csv(quote_filters), "quotes.csv", "text/csv",
+                               on_click="ignore")
+
+
+# --- Sketch Panel (fragment) ---
+# Depends only on the sidebar options, so price-only edits never rerun it.
+@st.fragment
+def sketch_panel(sketch_args):
+    run_counts["sketch"] += 1
+    st.header("Your Sketch:")
+    sketch_slot = st.empty()
+    with capture(rerun_spans):
+        # 2. Look up the finished sketch (already encoded, so Streamlit never
+        # re-encodes it); on a miss the cheap preview goes out first
+        final_ring_image = cached_final_sketch_bytes(*sketch_args)
+        with span("ui.st_image"):
+            first_pass = final_ring_image if final_ring_image is not None else preview_sketch_bytes(*sketch_args)
+            sketch_slot.image(first_pass, width="stretch")
+
+        # --- Progressive Rendering (second pass) ---
+        # This panel is drawn last, so the price and summary are already on the
+        # page. If the user keeps scrubbing a control, the next rerun interrupts
+        # this one and the preview simply stays.
+        if final_ring_image is None:
+            final_ring_image = final_sketch_bytes(*sketch_args)
+            with span("ui.st_image"):
+                sketch_slot.image(final_ring_image, width="stretch")
+
+    # --- Print Export ---
+    # Drawn in strips and streamed through the PNG encoder, so only the
+    # compressed file (mostly flat colour, a few hundred KB) is ever held whole.
+    with st.expander("High-resolution print file"):
+        print_size = st.select_slider("Size (px):", options=[2000, 4000, 6000, 8000, 12000], value=6000,
+                                      key="print_size")
+        if st.button("Prepare print file"):
+            with st.spinner("Rendering..."), capture(rerun_spans), span("ui.print_export"):
+                print_file = b"".join(iter_print_export(*sketch_args, size=print_size))
+            st.download_button("Download PNG", print_file, f"ring-sketch-{print_size}px.png", "image/png")
+
+    # --- Animation Export ---
+    with st.expander("Animation"):
+        animation_kind = st.radio("Animate:", ["Carat sweep", "Metal cycle"], horizontal=True, key="animation_kind")
+        animation_format = st.selectbox("Format:", list(ANIMATION_FORMATS), key="animation_format")
+        if st.button("Make animation"):
+            shape, carat, metal_key, setting_key, side_shapes = sketch_args
+            with st.spinner("Rendering..."), capture(rerun_spans), span("ui.animation"):
+                if animation_kind == "Carat sweep":
+                    chunks = iter_carat_sweep(shape, metal_key, setting_key, side_shapes, animation_format)
+                else:
+                    chunks = iter_metal_cycle(shape, carat, setting_key, side_shapes, animation_format)
+                animation_file = b"".join(chunks)
+            mime, extension = ANIMATION_FORMATS[animation_format]
+            st.image(animation_file)
+            st.download_button("Download animation", animation_file, f"ring-animation.{extension}", mime)
+
+
+# --- Display Area (Main Page) ---
+col1, col2 = st.columns(2)
+budget_area = st.container()
+
+with col2:
+    price_panel(selected_shape, selected_carat, selected_metal, selected_setting, side_stone_shapes)
+with budget_area:
+    budget_panel(selected_shape, selected_metal, selected_setting, side_stone_shapes)
+    quotes_panel()
+with col1:
+    sketch_panel((
+        selected_shape,
+        selected_carat,
+        METALS[selected_metal],
+        SETTINGS[selected_setting],
+        side_stone_shapes
+    ))
+
+# --- Hidden Performance Panel (open the app with ?debug=1) ---
+if st.query_params.get("debug") == "1":
+    with st.sidebar.expander("Performance", expanded=True):
+        st.caption("Runs this session (page = full rerun, others = fragment runs)")
+        st.json(run_counts)
+        st.caption("This rerun (ms)")
+        st.table([{"stage": name, "ms": round(seconds * 1000, 3)} for name, seconds in rerun_spans.items()])
+        st.caption("Rolling percentiles, whole process (ms)")
+        st.table([{"stage": name, **stats} for name, stats in HISTOGRAMS.snapshot().items()])
+        st.caption("Caches")
+        st.json({"sketches": SKETCH_CACHE.stats(), "layers": LAYER_CACHE.stats(), "final": FINAL_CACHE.stats(),
+                 "encoded": ENCODED_CACHE.stats()})
+        st.caption("Encoders (time and output size)")
+        st.table([{"format": name, **stats} for name, stats in ENCODE_STATS.snapshot().items()])
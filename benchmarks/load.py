@@ -0,0 +1,490 @@
+"""Concurrent-session load test for app.py.
+
+Run:      python benchmarks/load.py [--sessions 8] [--duration 30] [--trace mixed] [--think-ms 250]
+Compare:  python benchmarks/load.py --compare baseline-load.json [--threshold 0.15]
+
+Starts one `streamlit run app.py` server and connects N simulated browser
+sessions to it over the Streamlit websocket protocol, so every session shares
+the one process's interpreter (and GIL), sketch, layer and encoded caches,
+exactly as real visitors do. The result shows how many sessions one app
+process serves. Each session replays an interaction trace (carat scrubbing,
+setting switches, price-only tweaks) in a loop, with a think time between
+steps, until the test duration is over. Like the browser, a session sends
+the widget states it has changed, reruns only the fragment a widget lives
+in, and fetches the images each rerun shows.
+
+Reports rerun latency percentiles (overall and per step kind), throughput
+(reruns per second), errors, and the server's memory: baseline RSS, RSS once
+every session has rendered its first page, peak RSS, and the per-session
+increment. A step's time runs from sending the rerun to the end of the
+script run plus fetching its images. Failed steps (script exceptions,
+timeouts, failed image fetches) are timed like the others and counted as
+errors; the run exits non-zero if any step failed. Results go to a JSON
+file; with --compare the run also exits non-zero when p95 latency or peak
+RSS grew by more than the threshold.
+
+All sessions are driven from one asyncio loop in this process, which only
+parses small protobuf messages; the rendering happens in the server.
+Browser layout and paint time are not included.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ring_designer import COLOR_GRADES, CLARITY_GRADES, DIAMOND_SHAPES, SETTINGS  # noqa: E402
+from ring_designer.config import CARAT_STEPS  # noqa: E402
+from ring_designer.timing import _percentile  # noqa: E402
+
+CARATS = list(CARAT_STEPS)
+MAX_ERROR_MESSAGES = 5 # Per session, so a broken build does not flood the report
+SERVER_START_TIMEOUT_S = 60
+
+# Interaction traces: (step kind, widget kind, label prefix, values to cycle through).
+# Labels are matched by prefix so the traces survive layout changes.
+TRACES = {
+    # Dragging the carat slider up and back: a full-page rerun per value
+    "carat_scrub": [("carat", "slider", "2.", CARATS + CARATS[-2:0:-1])],
+    # Flipping between settings, including the side-stone ones
+    "setting_switch": [("setting", "selectbox", "7.", list(SETTINGS))],
+    # Price-only options: these widgets live in the price fragment, so each
+    # step reruns only that fragment, as in the browser
+    "price_tweak": [
+        ("color", "select_slider", "Color", COLOR_GRADES),
+        ("clarity", "select_slider", "Clarity", CLARITY_GRADES),
+    ],
+    # Something like a real visitor: shape, a little scrubbing, settings, price options
+    "mixed": [
+        ("shape", "selectbox", "1.", DIAMOND_SHAPES),
+        ("carat", "slider", "2.", [1.0, 1.1, 1.2, 1.3, 1.2]),
+        ("setting", "selectbox", "7.", list(SETTINGS)),
+        ("color", "select_slider", "Color", COLOR_GRADES),
+    ],
+}
+
+
+def rss_bytes(pid):
+    """Current resident set size of a process (Linux /proc)."""
+    with open(f"/proc/{pid}/statm", encoding="ascii") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class MemorySampler(threading.Thread):
+    """Polls the server's RSS in the background and keeps the peak."""
+
+    def __init__(self, pid, interval=0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = rss_bytes(pid)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.peak = max(self.peak, rss_bytes(self.pid))
+            except OSError:
+                return # Server exited
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+# --- App server ---
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class AppServer:
+    """One `streamlit run app.py` process on a free local port."""
+
+    def __init__(self):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "app.py"),
+             "--server.headless", "true", "--server.address", "127.0.0.1", "--server.port", str(self.port),
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false",
+             "--global.developmentMode", "false"],
+            cwd=ROOT, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+
+    def wait_ready(self, timeout=SERVER_START_TIMEOUT_S):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                with urllib.request.urlopen(f"{self.url}/_stcore/health", timeout=1) as response:
+                    if response.read() == b"ok":
+                        return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"The app server did not start; is streamlit installed?\n{self.output()}")
+
+    def output(self, lines=20):
+        self.log.seek(0)
+        return "\n".join(self.log.read().decode("utf-8", "replace").splitlines()[-lines:])
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+
+
+# --- Simulated browser session ---
+def fetch(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return len(response.read())
+
+
+class Session:
+    """One simulated browser tab: a websocket to the app plus the trace it keeps replaying."""
+
+    def __init__(self, number, base_url, trace, think_s, timeout):
+        self.number = number
+        self.base_url = base_url
+        self.rng = random.Random(number)
+        self.think_s = think_s
+        self.timeout = timeout
+        # Each session starts at a different point of the trace, like real users
+        self.steps = itertools.cycle([
+            (kind, widget, label, value)
+            for kind, widget, label, values in trace
+            for value in values
+        ])
+        for _ in range(self.rng.randrange(sum(len(values) for *_, values in trace))):
+            next(self.steps)
+        self.socket = None
+        self.page_script_hash = ""
+        self.widgets = {} # label -> (widget kind, widget id, fragment id), as last drawn
+        self.states = {} # widget id -> WidgetState this session has set
+        self.samples = [] # (step kind, seconds), failed steps included
+        self.errors = 0
+        self.error_messages = []
+        self.broken = False # A step timed out or lost the connection: reconnect before the next one
+
+    async def connect(self):
+        import websockets
+
+        url = self.base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        self.socket = await websockets.connect(url, subprotocols=["streamlit"], max_size=None,
+                                               open_timeout=self.timeout)
+
+    async def close(self):
+        if self.socket is not None:
+            await self.socket.close()
+
+    async def reconnect(self):
+        """Opens a fresh session, like a browser reload; returns the first page's errors."""
+        await self.close()
+        self.page_script_hash, self.widgets, self.states, self.broken = "", {}, {}, False
+        await self.connect()
+        return await self.rerun()
+
+    def _widget_state(self, widget, label_prefix, value):
+        """(widget id, WidgetState, fragment id) for setting a drawn widget to value."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        label = next((label for label in self.widgets if label.startswith(label_prefix)), None)
+        if label is None:
+            raise RuntimeError(f"No widget labelled {label_prefix!r}...")
+        kind, widget_id, fragment_id = self.widgets[label]
+        if kind != widget:
+            raise RuntimeError(f"{label!r} is a {kind}, not a {widget}")
+        state = WidgetState(id=widget_id)
+        if kind == "slider":
+            state.double_array_value.data[:] = [float(value)]
+        elif kind == "select_slider":
+            state.string_array_value.data[:] = [str(value)]
+        else:
+            state.string_value = str(value)
+        return widget_id, state, fragment_id
+
+    def _read_delta(self, delta, path, images, errors):
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            errors.append(element.exception.message)
+        elif kind in ("slider", "selectbox"):
+            proto = getattr(element, kind)
+            if kind == "slider" and proto.options:
+                kind = "select_slider"
+            self.widgets[proto.label] = (kind, proto.id, delta.fragment_id)
+        elif kind == "imgs":
+            # A slot redrawn in the same run (the preview, then the final) keeps only its last image
+            images[path] = [image.url for image in element.imgs.imgs]
+
+    async def rerun(self, fragment_id=""):
+        """Sends one rerun like the browser does and waits for the run and its images; returns errors."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        client_state = message.rerun_script
+        client_state.page_script_hash = self.page_script_hash
+        client_state.fragment_id = fragment_id
+        live = {widget_id for _, widget_id, _ in self.widgets.values()}
+        client_state.widget_states.widgets.extend(state for widget_id, state in self.states.items()
+                                                  if widget_id in live)
+        await self.socket.send(message.SerializeToString())
+
+        images, errors = {}, []
+        while True:
+            forward = ForwardMsg.FromString(await self.socket.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+            elif kind == "delta":
+                self._read_delta(forward.delta, tuple(forward.metadata.delta_path), images, errors)
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    errors.append("script failed to compile")
+                if forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+        urls = [self.base_url + url for urls in images.values() for url in urls if url.startswith("/")]
+        await asyncio.gather(*(asyncio.to_thread(fetch, url, self.timeout) for url in urls))
+        return errors
+
+    async def _timed(self, kind, action):
+        start = time.perf_counter()
+        try:
+            errors = await asyncio.wait_for(action(), self.timeout)
+        except Exception as e:
+            # Replies to an abandoned run may still arrive, so the socket is out of step
+            errors, self.broken = [f"{type(e).__name__}: {e}"], True
+        self.samples.append((kind, time.perf_counter() - start))
+        if errors:
+            self.errors += 1
+            if len(self.error_messages) < MAX_ERROR_MESSAGES:
+                self.error_messages.append(f"{kind}: {errors[0]}")
+
+    async def first_page(self):
+        await self._timed("first_page", self.rerun)
+
+    async def step(self):
+        if self.broken:
+            await self._timed("reconnect", self.reconnect)
+            return
+        kind, widget, label, value = next(self.steps)
+
+        async def action():
+            widget_id, state, fragment_id = self._widget_state(widget, label, value)
+            self.states[widget_id] = state
+            return await self.rerun(fragment_id)
+
+        await self._timed(kind, action)
+
+    async def replay(self, duration):
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            await self.step()
+            if self.think_s:
+                # Jittered think time so sessions do not march in lockstep
+                await asyncio.sleep(self.think_s * self.rng.uniform(0.5, 1.5))
+
+
+async def run_session(session, duration, barrier):
+    """Runs one session; returns None, or the error if it could not connect."""
+    try:
+        await session.connect()
+    except Exception as e:
+        await barrier.abort() # Release the other sessions instead of leaving them waiting
+        return f"{type(e).__name__}: {e}"
+    try:
+        # Every session loads its first page at once (the cold-start burst)
+        await barrier.wait()
+        await session.first_page()
+        await barrier.wait()
+        await session.replay(duration)
+    except asyncio.BrokenBarrierError:
+        return "another session failed to connect"
+    finally:
+        await session.close()
+    return None
+
+
+def latency_stats(seconds):
+    ordered = sorted(seconds)
+    return {
+        "count": len(ordered),
+        "p50_ms": _percentile(ordered, 50) * 1000,
+        "p90_ms": _percentile(ordered, 90) * 1000,
+        "p95_ms": _percentile(ordered, 95) * 1000,
+        "p99_ms": _percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def _drive(server, sessions, trace_name, duration, think_ms, timeout):
+    users = [Session(i, server.url, TRACES[trace_name], think_ms / 1000, timeout) for i in range(sessions)]
+    barrier = asyncio.Barrier(sessions + 1)
+    tasks = [asyncio.create_task(run_session(user, duration, barrier)) for user in users]
+    memory = {}
+    try:
+        await barrier.wait() # Everyone connected
+        await barrier.wait() # Everyone has rendered their first page
+        memory["warm"] = rss_bytes(server.process.pid)
+    except asyncio.BrokenBarrierError:
+        pass
+    crashes = await asyncio.gather(*tasks)
+    return users, crashes, memory
+
+
+def run_load(sessions, trace_name, duration, think_ms, timeout):
+    server = AppServer()
+    try:
+        server.wait_ready()
+        pid = server.process.pid
+        baseline = rss_bytes(pid)
+        sampler = MemorySampler(pid)
+        sampler.start()
+        start = time.perf_counter()
+        users, crashes, memory = asyncio.run(_drive(server, sessions, trace_name, duration, think_ms, timeout))
+        elapsed = time.perf_counter() - start
+        final = rss_bytes(pid) if server.process.poll() is None else 0
+        peak = sampler.stop()
+        if server.process.poll() is not None:
+            raise RuntimeError(f"The app server exited during the run:\n{server.output()}")
+    finally:
+        server.stop()
+
+    crashes = [crash for crash in crashes if crash is not None]
+    by_kind = {}
+    for user in users:
+        for kind, seconds in user.samples:
+            by_kind.setdefault(kind, []).append(seconds)
+    reruns = [seconds for kind, values in by_kind.items() if kind not in ("first_page", "reconnect")
+              for seconds in values]
+    if not reruns:
+        raise RuntimeError("No rerun completed; does app.py run?\n" + "\n".join(crashes))
+    replay_s = min(duration, elapsed)
+    warm = memory.get("warm", final)
+    return {
+        "sessions": sessions,
+        "completed_sessions": sessions - len(crashes),
+        "trace": trace_name,
+        "duration_s": replay_s,
+        "think_ms": think_ms,
+        "reruns": len(reruns),
+        # A session that could not connect is an error too: its steps never ran
+        "errors": sum(user.errors for user in users) + len(crashes),
+        "error_messages": [message for user in users for message in user.error_messages] + crashes,
+        "throughput_rps": len(reruns) / replay_s,
+        "latency": latency_stats(reruns),
+        "latency_by_step": {kind: latency_stats(values) for kind, values in sorted(by_kind.items())},
+        "memory": {
+            "baseline_rss_mb": baseline / 2**20,
+            "warm_rss_mb": warm / 2**20,
+            "final_rss_mb": final / 2**20,
+            "peak_rss_mb": peak / 2**20,
+            "per_session_mb": (final - baseline) / sessions / 2**20,
+        },
+    }
+
+
+def print_report(result):
+    print(f"{result['sessions']} sessions ({result['completed_sessions']} completed), trace {result['trace']}, "
+          f"{result['duration_s']:.1f} s, think {result['think_ms']} ms")
+    print(f"  {result['reruns']} reruns, {result['throughput_rps']:.1f}/s, {result['errors']} errors")
+    for message in result["error_messages"]:
+        print(f"    {message}")
+    for kind, stats in [("all", result["latency"])] + list(result["latency_by_step"].items()):
+        print(f"  {kind:12s} p50 {stats['p50_ms']:8.1f}  p95 {stats['p95_ms']:8.1f}  "
+              f"p99 {stats['p99_ms']:8.1f}  max {stats['max_ms']:8.1f} ms  ({stats['count']})")
+    memory = result["memory"]
+    print(f"  Server RSS baseline {memory['baseline_rss_mb']:.1f} MB, warm {memory['warm_rss_mb']:.1f} MB, "
+          f"peak {memory['peak_rss_mb']:.1f} MB, {memory['per_session_mb']:.2f} MB per session")
+
+
+def compare(result, baseline, threshold):
+    """Returns the metrics that regressed beyond the threshold."""
+    regressions = []
+    for name, new, old in (
+        ("p95_ms", result["latency"]["p95_ms"], baseline["latency"]["p95_ms"]),
+        ("peak_rss_mb", result["memory"]["peak_rss_mb"], baseline["memory"]["peak_rss_mb"]),
+    ):
+        ratio = new / old
+        marker = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"{name:20s} {old:10.1f} -> {new:10.1f} ({ratio - 1:+.1%}){marker}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py.")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--trace", choices=sorted(TRACES), default="mixed")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to replay traces for.")
+    parser.add_argument("--think-ms", type=float, default=250, help="Mean pause between a session's steps.")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds one rerun may take.")
+    parser.add_argument("--output", default="load-results.json")
+    parser.add_argument("--compare", help="Baseline results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed growth (0.15 = 15%%).")
+    args = parser.parse_args(argv)
+
+    try:
+        import streamlit.proto.BackMsg_pb2  # noqa: F401
+        import websockets  # noqa: F401
+    except ImportError:
+        print("streamlit (and its websockets dependency) is required for the load test", file=sys.stderr)
+        return 2
+
+    result = run_load(args.sessions, args.trace, args.duration, args.think_ms, args.timeout)
+    print_report(result)
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "result": result,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    status = 0
+    if result["errors"]:
+        print(f"{result['errors']} step(s) failed", file=sys.stderr)
+        status = 1
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["result"]
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed more than {args.threshold:.0%}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Benchmark suite for sketch rendering, pricing and full-page reruns.
+
+Run:      python benchmarks/run.py [--output results.json] [--filter sketch/]
+Compare:  python benchmarks/run.py --compare baseline.json [--threshold 0.15]
+
+Every benchmark reports min/median/mean wall time per call (or of one
+timing span inside the call, e.g. the price fragment). Results are
+written as JSON; with --compare the run exits non-zero when any benchmark's
+median is slower than the baseline by more than the threshold.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ring_designer import (  # noqa: E402
+    METALS, SETTINGS, SIDE_STONE_SHAPES, DIAMOND_SHAPES, calculate_price,
+    create_ring_sketch, draw_prongs, draw_side_stone,
+)
+from ring_designer.timing import add_collector, remove_collector  # noqa: E402
+
+SIDE_VARIANTS = {
+    "solitaire": [("Round",)],
+    "halo": [("Round",)],
+    "three_stone": [(s,) for s in SIDE_STONE_SHAPES],
+    "seven_stone": [(s, s, s) for s in SIDE_STONE_SHAPES] + [("Marquise", "Pear", "Round")],
+}
+
+
+class SpanSamples:
+    """Timing collector keeping the durations of one span name."""
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = []
+
+    def record(self, name, seconds):
+        if name == self.name:
+            self.samples.append(seconds)
+
+
+def time_call(func, min_time, max_runs, span_name=None):
+    """Runs func until min_time seconds or max_runs calls; returns per-call seconds.
+
+    With span_name, returns the durations of that span recorded during the
+    calls instead, to time one stage of a larger call.
+    """
+    func() # Warm-up
+    samples = []
+    spans = SpanSamples(span_name)
+    if span_name:
+        add_collector(spans)
+    deadline = time.perf_counter() + min_time
+    try:
+        while len(samples) < max_runs and (len(samples) < 3 or time.perf_counter() < deadline):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+    finally:
+        remove_collector(spans)
+    if span_name:
+        if not spans.samples:
+            raise RuntimeError(f"No {span_name!r} span was recorded")
+        return spans.samples
+    return samples
+
+
+def sketch_benchmarks():
+    metal_key = METALS["Yellow Gold (14K)"]
+    for shape in DIAMOND_SHAPES:
+        for setting_key, variants in SIDE_VARIANTS.items():
+            for sides in variants:
+                name = f"sketch/{shape}/{setting_key}"
+                if setting_key in ("three_stone", "seven_stone"):
+                    name += "/" + "-".join(sides)
+                yield name, lambda shape=shape, setting_key=setting_key, sides=sides: create_ring_sketch(
+                    shape, 1.5, metal_key, setting_key, sides
+                )
+
+
+def pricing_benchmarks():
+    yield "price/solitaire", lambda: calculate_price(
+        "Round", 1.0, "G", "VS1", "Yellow Gold (14K)", "Solitaire (Single Diamond)", "GIA", ("Round",), "Natural"
+    )
+    yield "price/seven_stone", lambda: calculate_price(
+        "Pear", 2.3, "D", "FL", "Rose Gold (14K)", "Seven-Stone (Cluster Sides)", "CGL",
+        ("Marquise", "Pear", "Round"), "Lab-Grown"
+    )
+
+
+def helper_benchmarks():
+    from PIL import Image, ImageDraw
+
+    draw = ImageDraw.Draw(Image.new("RGB", (500, 500), "white"))
+    for shape in SIDE_STONE_SHAPES:
+        for orientation in ("up", "left"):
+            yield f"draw_side_stone/{shape}/{orientation}", lambda shape=shape, orientation=orientation: draw_side_stone(
+                draw, shape, 250, 250, 12, (245, 245, 245), (50, 50, 50), orientation=orientation
+            )
+    yield "draw_prongs", lambda: draw_prongs(draw, 250, 250, 20, 28, (212, 175, 55), base_size_px=52)
+
+
+def budget_benchmarks():
+    from ring_designer.budget import build_search_index, search_budget
+
+    build_search_index()
+    yield "budget/25000", lambda: search_budget(25000, 20)
+    yield "budget/80000/color_first", lambda: search_budget(80000, 20, ("color", "clarity", "carat"))
+    yield "budget/25000/filtered", lambda: search_budget(
+        25000, 20, filters={"shape": ["Oval", "Pear"], "metal": "Rose Gold (14K)"}
+    )
+
+
+def encode_benchmarks():
+    from ring_designer.encoding import FORMATS, encode_image
+
+    image = create_ring_sketch("Pear", 2.0, METALS["Rose Gold (14K)"], "seven_stone", ("Marquise", "Pear", "Round"))
+    for fmt, (_, _, _, highest) in FORMATS.items():
+        for level in sorted({1, highest // 2, highest}):
+            yield f"encode/{fmt}/{level}", lambda fmt=fmt, level=level: encode_image(image, fmt, level)
+
+
+def animation_benchmarks():
+    from ring_designer.animation import ANIMATION_FORMATS, carat_sweep_frames, iter_carat_sweep, sweep_carats
+
+    sides = ("Marquise", "Pear", "Round")
+    carats = sweep_carats()
+    # Redrawing every frame vs. redrawing only the region a carat change touches
+    yield "animation/carat_sweep/redraw", lambda: [
+        create_ring_sketch("Pear", carat, "rose_gold", "seven_stone", sides) for carat in carats
+    ]
+    yield "animation/carat_sweep/reuse", lambda: list(carat_sweep_frames("Pear", "rose_gold", "seven_stone", sides, carats))
+    for fmt in ANIMATION_FORMATS:
+        yield f"animation/carat_sweep/{fmt}", lambda fmt=fmt: b"".join(
+            iter_carat_sweep("Pear", "rose_gold", "seven_stone", sides, fmt)
+        )
+
+
+def rerun_benchmarks():
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("streamlit.testing not available; skipping rerun benchmarks", file=sys.stderr)
+        return
+
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=30)
+    app.run()
+
+    def widget(kind, label_prefix):
+        # Look widgets up by label so the benchmark survives layout changes
+        return next(w for w in getattr(app, kind) if w.label.startswith(label_prefix))
+
+    yield "rerun/unchanged", lambda: app.run()
+
+    carats = iter([1.0, 1.1] * 100000)
+    yield "rerun/carat_change", lambda: widget("slider", "2.").set_value(next(carats)).run()
+
+    # Price-only option. AppTest always reruns the whole script, so this is the
+    # full-page cost; the browser reruns only the price fragment, timed on its
+    # own (its ui.price_panel span) by rerun/color_change/fragment.
+    colors = iter(["F", "G"] * 100000)
+
+    def change_color():
+        widget("select_slider", "Color").set_value(next(colors)).run()
+
+    yield "rerun/color_change", change_color
+    yield "rerun/color_change/fragment", change_color, "ui.price_panel"
+
+    settings = iter(list(SETTINGS) * 100000)
+    yield "rerun/setting_change", lambda: widget("selectbox", "7.").set_value(next(settings)).run()
+
+
+# suite: (generator, prefixes of the benchmark names it yields)
+SUITES = {
+    "sketch": (sketch_benchmarks, ("sketch/",)),
+    "price": (pricing_benchmarks, ("price/",)),
+    "helpers": (helper_benchmarks, ("draw_side_stone/", "draw_prongs")),
+    "encode": (encode_benchmarks, ("encode/",)),
+    "budget": (budget_benchmarks, ("budget/",)),
+    "animation": (animation_benchmarks, ("animation/",)),
+    "rerun": (rerun_benchmarks, ("rerun/",)),
+}
+
+
+def suite_selected(prefixes, name_filter):
+    """Whether a suite can yield a name matching the filter, decided before its setup runs."""
+    if not name_filter:
+        return True
+    known = [prefix for _, suite_prefixes in SUITES.values() for prefix in suite_prefixes]
+    if not any(name_filter.startswith(prefix) or prefix.startswith(name_filter) for prefix in known):
+        return True # A plain substring such as "Round" can match inside any suite
+    return any(name_filter.startswith(prefix) or prefix.startswith(name_filter) for prefix in prefixes)
+
+
+def run(name_filter, min_time, max_runs):
+    results = {}
+    for suite, prefixes in SUITES.values():
+        # Skipped suites never run their setup (AppTest, budget index, fixtures) or import its dependencies
+        if not suite_selected(prefixes, name_filter):
+            continue
+        # A benchmark is (name, func) or (name, func, span name to time within func)
+        for name, func, *span_name in suite():
+            if name_filter and name_filter not in name:
+                continue
+            samples = time_call(func, min_time, max_runs, *span_name)
+            results[name] = {
+                "runs": len(samples),
+                "min_us": min(samples) * 1e6,
+                "median_us": statistics.median(samples) * 1e6,
+                "mean_us": statistics.fmean(samples) * 1e6,
+            }
+            print(f"{name:50s} {results[name]['median_us']:12.1f} us  ({len(samples)} runs)")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns the benchmarks whose median regressed beyond the threshold."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = result["median_us"] / base["median_us"]
+        marker = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"{name:50s} {base['median_us']:12.1f} -> {result['median_us']:12.1f} us ({ratio - 1:+.1%}){marker}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ring sketch benchmark suite.")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to spend per benchmark.")
+    parser.add_argument("--max-runs", type=int, default=1000)
+    parser.add_argument("--compare", help="Baseline results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed median slowdown (0.15 = 15%%).")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.min_time, args.max_runs)
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""Headless ring pricing and sketch engine.
+
+Importing this package never imports Streamlit, and Pillow is only loaded the
+first time a sketch is drawn, so batch jobs, workers and tests can use the
+pricing and drawing code without starting the UI. app.py is a thin Streamlit
+front end on top of it.
+"""
+from .config import RingConfig
+from .options import (
+    BASE_DIAMOND_PRICE_PER_CARAT, CERTIFICATE_MULTIPLIERS, CERTIFICATE_TYPES,
+    CLARITY_GRADES, CLARITY_MULTIPLIERS, COLOR_GRADES, COLOR_MULTIPLIERS,
+    DIAMOND_FILL, DIAMOND_OUTLINE, DIAMOND_SHAPES, DIAMOND_TYPE_MULTIPLIERS,
+    DIAMOND_TYPES, METAL_BASE_PRICE, METAL_COLORS_RGB, METALS, SETTING_BASE_PRICE,
+    SETTINGS, SHAPE_MULTIPLIERS, SIDE_STONE_MULTIPLIER, SIDE_STONE_SHAPES,
+    USD_TO_ILS_RATE,
+)
+from .price_book import PriceBook, PriceBookError, current_price_book
+from .pricing import calculate_price
+from .sketch import (
+    apply_metal_palette, create_ring_sketch, create_ring_sketch_indexed,
+    draw_prongs, draw_side_stone,
+)
+from .svg import SvgDraw, create_ring_sketch_svg
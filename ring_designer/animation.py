@@ -0,0 +1,275 @@
+"""Carat-sweep and metal-cycle animations with frame reuse.
+
+Animation frames differ in only a small part of the picture, so a frame is
+never drawn from scratch after the first one:
+
+carat sweep   Everything that grows with carat (the stone, the setting and
+              the gap the band leaves for them) stays inside one "dirty box".
+              That is the box at the largest carat of the sweep, found by
+              running the drawing stages against a draw object that only
+              records coordinates. The band outside it is the
+              same in every frame, so each later frame redraws only the box,
+              through TransformedDraw with the box origin as its offset, and
+              pastes it into the previous frame in place.
+metal cycle   The design is drawn once. Every metal is its own slot in a
+              shared palette, so a frame is a lookup-table remap of the
+              metal index (see sketch.apply_metal_palette for the same idea
+              on one image).
+
+Frames come out as (image, box) pairs, where box is the region that changed.
+GIF and APNG are streamed: each frame is emitted as soon as it is drawn,
+encoded as just its box, at an offset, on top of the previous frame. WebP
+is not streamed. Pillow's WebP encoder takes a frame list, so WebP frames
+(one byte per pixel) are held and the whole file comes out as one chunk at
+the end.
+
+Run:  python -m ring_designer.animation carat-sweep <design id> [--format apng] [--size 500]
+      python -m ring_designer.animation metal-cycle <design id> [--format webp]
+"""
+import argparse
+import io
+import os
+import struct
+import sys
+import zlib
+
+from .config import CARAT_STEPS, add_designs_argument
+from .encoding import FILE_FORMATS, PNG_SIGNATURE, png_chunk, png_scanlines
+from .options import METAL_COLORS_RGB, METALS
+from .sketch import (
+    IMG_SIZE, METAL_FALLBACK_RGB, PALETTE_BACKGROUND, PALETTE_METAL, REGION_PAD, TransformedDraw,
+    band_half_width, compute_sketch_geometry, draw_indexed_sketch, draw_main_stone, draw_setting, metal_palette,
+)
+from .timing import span
+
+ANIMATION_FORMATS = {fmt: FILE_FORMATS[fmt] for fmt in ("gif", "apng", "webp")}
+CARAT_FRAME_MS = 80
+METAL_FRAME_MS = 700
+MAX_ANIMATION_SIZE = 2000
+BAND_THICKNESS = 14 # As drawn by sketch.draw_band
+
+
+def sweep_carats(start=CARAT_STEPS[0], end=CARAT_STEPS[-1], bounce=True):
+    """Carat steps from start to end, and back again (without repeating the ends) if bounce."""
+    carats = [carat for carat in CARAT_STEPS if start <= carat <= end]
+    return carats + carats[-2:0:-1] if bounce else carats
+
+
+class _BoundsDraw:
+    """Stands in for an ImageDraw and only records the box of what would be drawn."""
+
+    def __init__(self):
+        self.box = None
+
+    def _add(self, xy, width=0):
+        if xy and isinstance(xy[0], (tuple, list)):
+            xs, ys = [x for x, _ in xy], [y for _, y in xy]
+        else:
+            xs, ys = xy[0::2], xy[1::2]
+        box = (min(xs) - width, min(ys) - width, max(xs) + width, max(ys) + width)
+        self.box = box if self.box is None else (min(self.box[0], box[0]), min(self.box[1], box[1]),
+                                                 max(self.box[2], box[2]), max(self.box[3], box[3]))
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        self._add(xy, width)
+
+    rectangle = polygon = ellipse
+
+    def rounded_rectangle(self, xy, radius=0, fill=None, outline=None, width=1):
+        self._add(xy, width)
+
+    def line(self, xy, fill=None, width=0):
+        self._add(xy, width or 1)
+
+
+def _dirty_box(shape, carats, setting_key, side_shapes_tuple, size):
+    """Output-pixel box that holds every pixel a carat change can touch."""
+    bounds = _BoundsDraw()
+    center = IMG_SIZE // 2
+    for carat in (min(carats), max(carats)): # Everything grows with carat; the ends bound the rest
+        geometry = compute_sketch_geometry(shape, carat, setting_key)
+        gap = band_half_width(geometry, shape, setting_key)
+        bounds.rectangle([(center - gap, center - BAND_THICKNESS // 2), (center + gap, center + BAND_THICKNESS // 2)])
+        draw_main_stone(bounds, geometry, shape)
+        draw_setting(bounds, geometry, shape, setting_key, side_shapes_tuple, PALETTE_METAL)
+    scale = size / IMG_SIZE
+    left, top, right, bottom = (value * scale for value in bounds.box)
+    margin = max(2, round(2 * scale)) # Rounding at the edges
+    return (max(0, int(left) - margin), max(0, int(top) - margin),
+            min(size, int(right) + 1 + margin), min(size, int(bottom) + 1 + margin))
+
+
+def _draw_region(shape, carat, setting_key, side_shapes_tuple, size, box):
+    """Index image of one region of the sketch (the whole sketch for box=(0, 0, size, size))."""
+    from PIL import Image, ImageDraw
+
+    geometry = compute_sketch_geometry(shape, carat, setting_key)
+    # Drawn with a margin around the box, cropped off again
+    pad = 0 if box == (0, 0, size, size) else REGION_PAD
+    region = Image.new("P", (box[2] - box[0] + 2 * pad, box[3] - box[1] + 2 * pad), PALETTE_BACKGROUND)
+    draw = TransformedDraw(ImageDraw.Draw(region), size / IMG_SIZE, (box[0] - pad, box[1] - pad))
+    draw_indexed_sketch(draw, geometry, shape, setting_key, side_shapes_tuple)
+    return region.crop((pad, pad, region.width - pad, region.height - pad)) if pad else region
+
+
+def carat_sweep_frames(shape, metal_key, setting_key, side_shapes_tuple, carats, size=IMG_SIZE):
+    """Yields (frame, changed box) for each carat; the frame image is updated in place."""
+    palette = metal_palette(metal_key)
+    full = (0, 0, size, size)
+    with span("animation.frame"):
+        frame = _draw_region(shape, carats[0], setting_key, side_shapes_tuple, size, full)
+        frame.putpalette(palette)
+        box = _dirty_box(shape, carats, setting_key, side_shapes_tuple, size)
+    yield frame, full
+    for carat in carats[1:]:
+        with span("animation.frame"):
+            frame.paste(_draw_region(shape, carat, setting_key, side_shapes_tuple, size, box), box[:2])
+        yield frame, box
+
+
+def metal_cycle_palette(metal_keys):
+    """Sketch palette plus one extra slot per metal after the first; returns (palette, slots)."""
+    palette = list(metal_palette(metal_keys[0]))
+    slots = {metal_keys[0]: PALETTE_METAL}
+    for metal_key in metal_keys[1:]:
+        slots[metal_key] = len(palette) // 3
+        palette += METAL_COLORS_RGB.get(metal_key, METAL_FALLBACK_RGB)
+    return palette, slots
+
+
+def metal_cycle_frames(shape, carat, setting_key, side_shapes_tuple, metal_keys, size=IMG_SIZE):
+    """Yields (frame, changed box) per metal; the design is drawn only once."""
+    palette, slots = metal_cycle_palette(metal_keys)
+    with span("animation.frame"):
+        base = _draw_region(shape, carat, setting_key, side_shapes_tuple, size, (0, 0, size, size))
+        # Only metal pixels change between frames
+        metal_box = base.point([255 if i == PALETTE_METAL else 0 for i in range(256)]).getbbox()
+    for i, metal_key in enumerate(metal_keys):
+        with span("animation.frame"):
+            lut = list(range(256))
+            lut[PALETTE_METAL] = slots[metal_key]
+            frame = base.point(lut)
+            frame.putpalette(palette)
+        yield frame, (0, 0, size, size) if i == 0 else metal_box
+
+
+def gif_stream(frames, frame_ms, loop=0):
+    """GIF bytes; every frame after the first only carries its changed box."""
+    from PIL import GifImagePlugin
+
+    first = True
+    for frame, box in frames:
+        with span("animation.encode"):
+            chunks = []
+            if first:
+                header, _ = GifImagePlugin.getheader(frame.copy(), info={"loop": loop, "duration": frame_ms})
+                chunks += header
+                first = False
+            # Disposal 1 keeps the previous frame under the next box
+            chunks += GifImagePlugin.getdata(frame.crop(box), offset=box[:2], duration=frame_ms, disposal=1)
+        yield b"".join(chunks)
+    yield b";"
+
+
+def apng_stream(frames, count, frame_ms, loop=0):
+    """Animated PNG bytes; later frames are fdAT chunks of just their changed box."""
+    sequence = 0
+    for index, (frame, box) in enumerate(frames):
+        with span("animation.encode"):
+            chunks = []
+            if index == 0:
+                width, height = frame.size
+                chunks.append(PNG_SIGNATURE)
+                chunks.append(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)))
+                chunks.append(png_chunk(b"acTL", struct.pack(">II", count, loop)))
+                chunks.append(png_chunk(b"PLTE", bytes(frame.getpalette())))
+            region = frame.crop(box)
+            stride = region.width
+            data = zlib.compress(png_scanlines(region.tobytes(), stride))
+            # dispose_op 0 (keep), blend_op 0 (source: the box replaces what was there)
+            chunks.append(png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", sequence, region.width, region.height,
+                                                          box[0], box[1], frame_ms, 1000, 0, 0)))
+            sequence += 1
+            if index == 0:
+                chunks.append(png_chunk(b"IDAT", data))
+            else:
+                chunks.append(png_chunk(b"fdAT", struct.pack(">I", sequence) + data))
+                sequence += 1
+        yield b"".join(chunks)
+    yield png_chunk(b"IEND", b"")
+
+
+def webp_file(frames, frame_ms, loop=0):
+    """Animated WebP bytes, as a single chunk once every frame has been drawn (not streamed)."""
+    images = [frame.copy() for frame, _ in frames] # Frames are updated in place
+    with span("animation.encode"):
+        out = io.BytesIO()
+        images[0].save(out, "WEBP", save_all=True, append_images=images[1:], duration=frame_ms, loop=loop,
+                       lossless=True)
+    yield out.getvalue()
+
+
+def _encode(frames, count, fmt, frame_ms):
+    if fmt == "gif":
+        return gif_stream(frames, frame_ms)
+    if fmt == "apng":
+        return apng_stream(frames, count, frame_ms)
+    if fmt == "webp":
+        return webp_file(frames, frame_ms)
+    raise ValueError(f"Unknown animation format: {fmt!r} (expected one of {', '.join(ANIMATION_FORMATS)})")
+
+
+def _check_size(size):
+    if not 1 <= size <= MAX_ANIMATION_SIZE:
+        raise ValueError(f"Animation size must be between 1 and {MAX_ANIMATION_SIZE} pixels")
+
+
+def iter_carat_sweep(shape, metal_key, setting_key, side_shapes_tuple, fmt="gif", size=IMG_SIZE,
+                     frame_ms=CARAT_FRAME_MS, carats=None):
+    """A carat-sweep animation (0.5 -> 3.0 -> 0.5 ct by default) as byte chunks (streamed unless WebP)."""
+    _check_size(size)
+    carats = list(carats or sweep_carats())
+    frames = carat_sweep_frames(shape, metal_key, setting_key, side_shapes_tuple, carats, size)
+    return _encode(frames, len(carats), fmt, frame_ms)
+
+
+def iter_metal_cycle(shape, carat, setting_key, side_shapes_tuple, fmt="gif", size=IMG_SIZE,
+                     frame_ms=METAL_FRAME_MS, metal_keys=None):
+    """An animation cycling the design through the metals as byte chunks (streamed unless WebP)."""
+    _check_size(size)
+    metal_keys = list(metal_keys or METALS.values())
+    frames = metal_cycle_frames(shape, carat, setting_key, side_shapes_tuple, metal_keys, size)
+    return _encode(frames, len(metal_keys), fmt, frame_ms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export carat-sweep and metal-cycle ring animations.")
+    parser.add_argument("kind", choices=["carat-sweep", "metal-cycle"])
+    add_designs_argument(parser)
+    parser.add_argument("--format", choices=sorted(ANIMATION_FORMATS), default="gif")
+    parser.add_argument("--size", type=int, default=IMG_SIZE)
+    parser.add_argument("--frame-ms", type=int, help="Time per frame.")
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    extension = ANIMATION_FORMATS[args.format][1]
+    for config in args.designs:
+        if args.kind == "carat-sweep":
+            chunks = iter_carat_sweep(config.shape, config.metal_key, config.setting_key, config.side_stones,
+                                      args.format, args.size, args.frame_ms or CARAT_FRAME_MS)
+        else:
+            chunks = iter_metal_cycle(config.shape, config.carat, config.setting_key, config.side_stones,
+                                      args.format, args.size, args.frame_ms or METAL_FRAME_MS)
+        path = os.path.join(args.output_dir, f"ring-{config.token}-{args.kind}.{extension}")
+        written = 0
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        print(f"{path}: {written / 1024:.0f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Offline pre-rendered sketch atlas.
+
+Build:  python -m ring_designer.atlas build [--output sketches.atlas] [--sizes 200 500 1000]
+Info:   python -m ring_designer.atlas info [--atlas sketches.atlas]
+
+The atlas is a single data file holding every encoded sketch back to back
+as a palette PNG (metal is applied at lookup via sketch.apply_metal_palette),
+plus a JSON index mapping "<sketch id>@<size>" (see config.sketch_id) to
+(offset, length). By default it is built at every size the app renders:
+the progressive preview, the final output and each supersampled final
+canvas (see progressive.atlas_sizes).
+The app memory-maps the data file, so pods on the same host share the page
+cache and a cold pod serves pre-rendered images immediately.
+"""
+import argparse
+import io
+import itertools
+import json
+import mmap
+import os
+import sys
+import threading
+
+from .cache import sketch_key
+from .config import CARAT_STEPS
+from .options import DIAMOND_SHAPES, SETTINGS, SIDE_STONE_SHAPES
+from .sketch import IMG_SIZE
+
+ATLAS_VERSION = 5 # 5: entries per (sketch id, size)
+ATLAS_FORMAT = "PNG"
+ATLAS_ENV = "RING_SKETCH_ATLAS"
+DEFAULT_ATLAS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sketches.atlas")
+
+
+def index_path(atlas_path):
+    return atlas_path + ".json"
+
+
+def encode_key(key):
+    """The JSON index name of a (sketch_id, size) sketch_key."""
+    sketch, size = key
+    return f"{sketch}@{size}"
+
+
+def iter_sketch_configs():
+    """Yields every reachable (shape, carat, setting_key, side_shapes_tuple)."""
+    for setting_key in SETTINGS.values():
+        if setting_key == "three_stone":
+            side_combos = [(s,) for s in SIDE_STONE_SHAPES]
+        elif setting_key == "seven_stone":
+            side_combos = list(itertools.product(SIDE_STONE_SHAPES, repeat=3))
+        else:
+            side_combos = [("Round",)]
+        for shape, carat, sides in itertools.product(DIAMOND_SHAPES, CARAT_STEPS, side_combos):
+            yield shape, carat, setting_key, sides
+
+
+class SketchAtlas:
+    """Read-only, mmap-backed view of a built atlas."""
+
+    def __init__(self, atlas_path):
+        with open(index_path(atlas_path), encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != ATLAS_VERSION:
+            raise ValueError(f"Unsupported atlas version: {index.get('version')}")
+        self.path = atlas_path
+        self.format = index["format"]
+        self.sizes = frozenset(index["sizes"])
+        self.entries = index["entries"]
+        self._file = open(atlas_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_bytes(self, key):
+        """Encoded image bytes for a sketch_key, or None if not in the atlas."""
+        entry = self.entries.get(encode_key(key))
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._map[offset:offset + length]
+
+    def get_image(self, key):
+        data = self.get_bytes(key)
+        if data is None:
+            return None
+        from PIL import Image
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_atlas_lock = threading.Lock()
+_loaded_atlas = {}
+
+
+def load_atlas(atlas_path=None):
+    """Opens the atlas once per process; returns None when no atlas is shipped."""
+    atlas_path = atlas_path or os.environ.get(ATLAS_ENV, DEFAULT_ATLAS_PATH)
+    with _atlas_lock:
+        if atlas_path not in _loaded_atlas:
+            if os.path.exists(atlas_path) and os.path.exists(index_path(atlas_path)):
+                _loaded_atlas[atlas_path] = SketchAtlas(atlas_path)
+            else:
+                _loaded_atlas[atlas_path] = None
+        return _loaded_atlas[atlas_path]
+
+
+def atlas_or_render(render):
+    """Wraps an indexed sketch renderer so atlas hits skip drawing."""
+    def lookup(shape, carat, setting_key, side_shapes_tuple, size=IMG_SIZE):
+        atlas = load_atlas()
+        if atlas is not None and size in atlas.sizes:
+            image = atlas.get_image(sketch_key(shape, carat, setting_key, side_shapes_tuple, size))
+            if image is not None:
+                return image
+        return render(shape, carat, setting_key, side_shapes_tuple, size=size)
+    return lookup
+
+
+def build_atlas(output_path, render, configs, sizes=(IMG_SIZE,)):
+    """Renders every configuration at every size and writes the atlas data file and index."""
+    entries = {}
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        for count, (shape, carat, setting_key, sides) in enumerate(configs, 1):
+            for size in sizes:
+                name = encode_key(sketch_key(shape, carat, setting_key, sides, size))
+                if name in entries:
+                    continue
+                buffer = io.BytesIO()
+                render(shape, carat, setting_key, sides, size=size).save(buffer, format=ATLAS_FORMAT,
+                                                                         optimize=True)
+                data = buffer.getvalue()
+                entries[name] = (out.tell(), len(data))
+                out.write(data)
+            if count % 1000 == 0:
+                print(f"  rendered {count} sketches", file=sys.stderr)
+
+    index = {"version": ATLAS_VERSION, "format": ATLAS_FORMAT, "sizes": sorted(set(sizes)), "entries": entries}
+    with open(index_path(tmp_path), "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    # Swap both files in only once they are complete
+    os.replace(tmp_path, output_path)
+    os.replace(index_path(tmp_path), index_path(output_path))
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the pre-rendered sketch atlas.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Render every sketch configuration into an atlas.")
+    build.add_argument("--output", default=DEFAULT_ATLAS_PATH)
+    build.add_argument("--sizes", type=int, nargs="+",
+                       help="Edge sizes to render (default: every size the app renders).")
+    info = sub.add_parser("info", help="Print atlas statistics.")
+    info.add_argument("--atlas", default=DEFAULT_ATLAS_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        from .progressive import atlas_sizes
+        from .sketch import create_ring_sketch_indexed
+        sizes = args.sizes or atlas_sizes()
+        count = build_atlas(args.output, create_ring_sketch_indexed, iter_sketch_configs(), sizes)
+        print(f"Wrote {count} sketches at sizes {', '.join(map(str, sizes))} to {args.output}")
+    else:
+        atlas = SketchAtlas(args.atlas)
+        size = os.path.getsize(args.atlas)
+        sizes = ", ".join(map(str, sorted(atlas.sizes)))
+        print(f"{len(atlas)} sketches at sizes {sizes}, {size / 1024 / 1024:.1f} MiB, format {atlas.format}")
+        atlas.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Vectorized pricing over whole option grids.
+
+calculate_price_batch() is the column-oriented twin of calculate_price:
+every option is passed as an array of indices into the option lists below and
+the three price arrays come back from a single NumPy pass. The lookup tables
+are compiled once per price book version from the same tables the scalar
+function uses, and the arithmetic is done in the same order so results match
+it bit for bit.
+"""
+import itertools
+from functools import lru_cache
+
+import numpy as np
+
+from . import config as cfg
+from . import options as opt
+from .price_book import TABLE_DEFAULTS, current_price_book
+
+
+def compile_price_tables(book=None):
+    """Index-addressable arrays for a price book (the live one if None)."""
+    return _compile_price_tables(book or current_price_book())
+
+
+@lru_cache(maxsize=2) # The live book and the one it is replacing
+def _compile_price_tables(book):
+    shapes = list(opt.DIAMOND_SHAPES)
+    diamond_types = list(opt.DIAMOND_TYPES)
+    colors = list(opt.COLOR_GRADES)
+    clarities = list(opt.CLARITY_GRADES)
+    metals = list(opt.METALS)
+    certificates = list(opt.CERTIFICATE_TYPES)
+    settings = list(opt.SETTINGS)
+    side_combos = [(s,) for s in opt.SIDE_STONE_SHAPES] + list(itertools.product(opt.SIDE_STONE_SHAPES, repeat=3))
+
+    def table(options, multipliers, default):
+        return np.array([multipliers.get(o, default) for o in options], dtype=np.float64)
+
+    # Same expression as calculate_price so the float result is identical
+    side_factor = np.array(
+        [sum(book.side_stone.get(s, 1.0) for s in combo) / len(combo) for combo in side_combos],
+        dtype=np.float64,
+    )
+    return {
+        "options": {
+            "shape": shapes,
+            "diamond_type": diamond_types,
+            "color": colors,
+            "clarity": clarities,
+            "metal": metals,
+            "certificate": certificates,
+            "setting": settings,
+            "side_shapes": side_combos,
+        },
+        "book": book,
+        "base_per_carat": book.base_per_carat,
+        "rate": book.rate(),
+        "shape": table(shapes, book.shape, 1.0),
+        "diamond_type": table(diamond_types, book.diamond_type, 1.0),
+        "color": table(colors, book.color, 1.0),
+        "clarity": table(clarities, book.clarity, 1.0),
+        "certificate": table(certificates, book.certificate, 1.0),
+        "metal": table(metals, book.metal, TABLE_DEFAULTS["metal"]),
+        "setting": table(settings, book.setting, TABLE_DEFAULTS["setting"]),
+        "has_side_stones": np.array([opt.SETTINGS[s] in ("three_stone", "seven_stone") for s in settings]),
+        "side_factor": side_factor,
+    }
+
+
+def option_index(field, value):
+    """Index of an option label (or side-stone tuple) in the compiled tables."""
+    return compile_price_tables()["options"][field].index(value)
+
+
+def calculate_price_batch(shape, carat, color, clarity, metal, setting, certificate, side_shapes, diamond_type,
+                          currency=None, book=None):
+    """Prices many configurations at once.
+
+    All arguments except carat are integer index arrays into
+    compile_price_tables()["options"]; carat is a float array. Returns
+    (total, diamond, setting) float64 arrays in `currency`.
+    """
+    t = compile_price_tables(book)
+    carat = np.asarray(carat, dtype=np.float64)
+    setting = np.asarray(setting)
+
+    diamond_usd = (t["base_per_carat"] * carat * t["diamond_type"][diamond_type] * t["shape"][shape]
+                   * t["color"][color] * t["clarity"][clarity] * t["certificate"][certificate])
+
+    side_factor = np.where(t["has_side_stones"][setting], t["side_factor"][side_shapes], 1.0)
+    setting_usd = t["metal"][metal] + (t["setting"][setting] * side_factor)
+
+    total_usd = diamond_usd + setting_usd
+    rate = t["book"].rate(currency)
+    return total_usd * rate, diamond_usd * rate, setting_usd * rate
+
+
+@lru_cache(maxsize=1)
+def setting_side_pairs():
+    """(setting, side_shapes) index pairs the sidebar can produce, as an (n, 2) array.
+
+    Side-stone combinations are only expanded for the settings that use them.
+    """
+    t = compile_price_tables()
+    options = t["options"]
+    pairs = []
+    for setting_idx, setting in enumerate(options["setting"]):
+        if t["has_side_stones"][setting_idx]:
+            length = 1 if setting == "Three-Stone" else 3
+            pairs += [(setting_idx, i) for i, combo in enumerate(options["side_shapes"]) if len(combo) == length]
+        else:
+            pairs.append((setting_idx, 0))
+    return np.array(pairs, dtype=np.int16)
+
+
+def config_columns(config_ids):
+    """Decodes RingConfig ids (an int array) into calculate_price_batch columns.
+
+    Returns a dict with the same keys as option_grid().
+    """
+    config_ids = np.asarray(config_ids, dtype=np.int64)
+    rest, side_digit = np.divmod(config_ids, cfg.SIDE_RADIX)
+    columns = {}
+    for field, options in reversed(cfg.FIELDS):
+        rest, columns[field] = np.divmod(rest, len(options))
+    columns["carat"] = np.asarray(cfg.CARAT_STEPS, dtype=np.float64)[columns["carat"]]
+
+    # Side digits -> side_combos index: singles first, then the 27 triples in product order
+    t = compile_price_tables()
+    setting_keys = np.array([opt.SETTINGS[s] for s in t["options"]["setting"]])[columns["setting"]]
+    columns["side_shapes"] = np.select(
+        [setting_keys == "three_stone", setting_keys == "seven_stone"],
+        [side_digit // 9, len(opt.SIDE_STONE_SHAPES) + side_digit],
+        0,
+    )
+    return columns
+
+
+def option_grid(carats):
+    """Index columns for the full catalog: every option combination at the given carats."""
+    options = compile_price_tables()["options"]
+    pairs = setting_side_pairs()
+
+    carats = np.asarray(carats, dtype=np.float64)
+    grids = np.meshgrid(
+        np.arange(len(options["shape"]), dtype=np.int16),
+        np.arange(len(carats), dtype=np.int16),
+        np.arange(len(options["diamond_type"]), dtype=np.int16),
+        np.arange(len(options["color"]), dtype=np.int16),
+        np.arange(len(options["clarity"]), dtype=np.int16),
+        np.arange(len(options["metal"]), dtype=np.int16),
+        np.arange(len(options["certificate"]), dtype=np.int16),
+        np.arange(len(pairs), dtype=np.int16),
+        indexing="ij",
+    )
+    shape, carat_idx, diamond_type, color, clarity, metal, certificate, pair = (g.ravel() for g in grids)
+    return {
+        "shape": shape,
+        "carat": carats[carat_idx],
+        "diamond_type": diamond_type,
+        "color": color,
+        "clarity": clarity,
+        "metal": metal,
+        "certificate": certificate,
+        "setting": pairs[pair, 0],
+        "side_shapes": pairs[pair, 1],
+    }
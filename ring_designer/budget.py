@@ -0,0 +1,190 @@
+"""Budget search: the best configurations under a price cap.
+
+Enumerating every option combination at every carat step (millions of
+rows) is too slow for an interactive page. Instead, build_search_index()
+precomputes, once per price book version, one row per combination of
+everything except carat with its diamond cost per carat and its fixed
+setting cost, sorted by the price of that combination at the smallest
+carat. A search then
+
+1. cuts the index at the budget with a binary search (rows that are
+   unaffordable even at the smallest carat are never looked at),
+2. applies the option filters to what is left,
+3. solves for the largest affordable carat of each row in closed form and
+   re-prices those rows with calculate_price_batch, so results agree with
+   calculate_price exactly,
+4. ranks rows by the requested quality ordering (cheaper first on ties)
+   with a partial sort for the top N.
+
+Every row is returned at the largest carat the budget allows; smaller carats
+of the same combination rank lower on every ordering and are left out.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from .batch_pricing import calculate_price_batch, compile_price_tables, setting_side_pairs
+from .config import CARAT_STEP, MAX_CARAT, MIN_CARAT, RingConfig
+from .price_book import current_price_book
+
+MAX_STEPS = int(round((MAX_CARAT - MIN_CARAT) / CARAT_STEP))
+
+# Fields a search can be ranked by; higher multiplier = better, carat = bigger
+RANK_FIELDS = ("carat", "color", "clarity", "certificate", "diamond_type")
+DEFAULT_ORDER = ("carat", "color", "clarity")
+FILTER_FIELDS = ("shape", "diamond_type", "color", "clarity", "metal", "certificate", "setting", "side_shapes")
+INDEX_FIELDS = ("shape", "diamond_type", "color", "clarity", "certificate", "metal", "setting", "side_shapes")
+
+
+def build_search_index(book=None):
+    """Every non-carat combination, sorted by its price at MIN_CARAT."""
+    return _build_search_index(book or current_price_book())
+
+
+@lru_cache(maxsize=2) # The live book and the one it is replacing
+def _build_search_index(book):
+    t = compile_price_tables(book)
+    options = t["options"]
+    pairs = setting_side_pairs()
+
+    grids = np.meshgrid(
+        np.arange(len(options["shape"]), dtype=np.int16),
+        np.arange(len(options["diamond_type"]), dtype=np.int16),
+        np.arange(len(options["color"]), dtype=np.int16),
+        np.arange(len(options["clarity"]), dtype=np.int16),
+        np.arange(len(options["certificate"]), dtype=np.int16),
+        np.arange(len(options["metal"]), dtype=np.int16),
+        np.arange(len(pairs), dtype=np.int16),
+        indexing="ij",
+    )
+    shape, diamond_type, color, clarity, certificate, metal, pair = (g.ravel() for g in grids)
+    setting, side_shapes = pairs[pair, 0], pairs[pair, 1]
+
+    per_carat_usd = (t["base_per_carat"] * t["diamond_type"][diamond_type] * t["shape"][shape]
+                     * t["color"][color] * t["clarity"][clarity] * t["certificate"][certificate])
+    side_factor = np.where(t["has_side_stones"][setting], t["side_factor"][side_shapes], 1.0)
+    fixed_usd = t["metal"][metal] + t["setting"][setting] * side_factor
+    entry_usd = per_carat_usd * MIN_CARAT + fixed_usd
+
+    order = np.argsort(entry_usd, kind="stable")
+    columns = dict(zip(INDEX_FIELDS, (shape, diamond_type, color, clarity, certificate, metal, setting, side_shapes)))
+    index = {field: column[order] for field, column in columns.items()}
+    index["per_carat_usd"] = per_carat_usd[order]
+    index["fixed_usd"] = fixed_usd[order]
+    index["entry_usd"] = entry_usd[order]
+    # Quality rank of every option: its position when sorted by price multiplier
+    index["ranks"] = {
+        field: np.argsort(np.argsort(t[field], kind="stable"), kind="stable")
+        for field in RANK_FIELDS if field != "carat"
+    }
+    return index
+
+
+def _allowed_indices(field, values):
+    options = compile_price_tables()["options"][field]
+    if isinstance(values, (str, tuple)):
+        values = [values]
+    indices = []
+    for value in values:
+        value = tuple(value) if field == "side_shapes" else value
+        if value not in options:
+            raise ValueError(f"Invalid {field}: {value!r}")
+        indices.append(options.index(value))
+    return np.array(indices, dtype=np.int16)
+
+
+def search_budget(budget, top_n=20, order=DEFAULT_ORDER, filters=None, currency=None):
+    """Top configurations with a total price <= budget, best first.
+
+    budget and the returned prices are in `currency` (the price book's
+    default if None). order lists RANK_FIELDS from most to least important.
+    filters maps a FILTER_FIELDS name to the allowed label (or list of
+    labels), plus optional "min_carat"/"max_carat". Returns a list of
+    {"id": RingConfig token, "config": {...}, "total": ..., "diamond": ..., "setting": ...}.
+    """
+    if math.isnan(budget):
+        raise ValueError("budget must be a number")
+    filters = dict(filters or {})
+    for field in order:
+        if field not in RANK_FIELDS:
+            raise ValueError(f"Cannot rank by {field!r} (expected one of {', '.join(RANK_FIELDS)})")
+    unknown = set(filters) - set(FILTER_FIELDS) - {"min_carat", "max_carat"}
+    if unknown:
+        raise ValueError(f"Unknown filter: {', '.join(sorted(unknown))}")
+
+    book = current_price_book() # One book for the whole search, even if it is swapped meanwhile
+    t = compile_price_tables(book)
+    index = build_search_index(book)
+    budget_usd = budget / book.rate(currency)
+    # 1. Everything past this point is over budget even at the smallest carat
+    end = int(np.searchsorted(index["entry_usd"], budget_usd * (1 + 1e-9), side="right"))
+    rows = np.arange(end)
+
+    # 2. Option filters
+    for field in FILTER_FIELDS:
+        if field in filters:
+            rows = rows[np.isin(index[field][rows], _allowed_indices(field, filters[field]))]
+    min_steps = int(round((max(MIN_CARAT, filters.get("min_carat", MIN_CARAT)) - MIN_CARAT) / CARAT_STEP))
+    max_steps = int(round((min(MAX_CARAT, filters.get("max_carat", MAX_CARAT)) - MIN_CARAT) / CARAT_STEP))
+
+    # 3. Largest affordable carat per row, confirmed with the exact pricing arithmetic
+    affordable = (budget_usd - index["fixed_usd"][rows]) / index["per_carat_usd"][rows]
+    # Clamped to the slider range first, so a huge (or infinite) budget cannot overflow the int cast
+    affordable = np.clip(affordable, MIN_CARAT - CARAT_STEP, MAX_CARAT)
+    steps = np.floor((affordable - MIN_CARAT) / CARAT_STEP + 1e-9).astype(np.int64)
+    steps = np.minimum(steps, max_steps)
+    columns = {field: index[field][rows] for field in INDEX_FIELDS}
+
+    def price(steps):
+        carat = np.round(MIN_CARAT + steps * CARAT_STEP, 1)
+        return calculate_price_batch(
+            columns["shape"], carat, columns["color"], columns["clarity"], columns["metal"],
+            columns["setting"], columns["certificate"], columns["side_shapes"], columns["diamond_type"],
+            currency, book,
+        )
+
+    prices = price(steps)
+    over = prices[0] > budget
+    if over.any():
+        # Rounding in the closed form can overshoot by one step
+        steps = np.where(over, steps - 1, steps)
+        prices = price(steps)
+    keep = (steps >= min_steps) & (prices[0] <= budget)
+    steps = steps[keep]
+    columns = {field: column[keep] for field, column in columns.items()}
+    total, diamond, setting = (p[keep] for p in prices)
+    if not len(steps):
+        return []
+
+    # 4. Mixed-radix quality score, then a partial sort for the top N
+    score = np.zeros(len(steps), dtype=np.int64)
+    for field in order:
+        if field == "carat":
+            score = score * (MAX_STEPS + 1) + steps
+        else:
+            ranks = index["ranks"][field]
+            score = score * len(ranks) + ranks[columns[field]]
+    if len(score) > top_n:
+        threshold = np.partition(score, len(score) - top_n)[len(score) - top_n]
+        candidates = np.flatnonzero(score >= threshold)
+    else:
+        candidates = np.arange(len(score))
+    best = candidates[np.lexsort((total[candidates], -score[candidates]))][:top_n]
+
+    options = t["options"]
+    results = []
+    for i in best:
+        labels = {field: options[field][columns[field][i]] for field in INDEX_FIELDS}
+        config = RingConfig(
+            labels["shape"], MIN_CARAT + int(steps[i]) * CARAT_STEP, labels["diamond_type"], labels["color"],
+            labels["clarity"], labels["metal"], labels["certificate"], labels["setting"], labels["side_shapes"],
+        )
+        results.append({
+            "id": config.token,
+            "config": config.as_dict(),
+            "total": float(total[i]),
+            "diamond": float(diamond[i]),
+            "setting": float(setting[i]),
+        })
+    return results
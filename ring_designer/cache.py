@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import OrderedDict
+
+from .config import sketch_id, snap_carat
+from .sketch import IMG_SIZE
+
+# --- Process-wide render cache ---
+# Streamlit re-executes app.py on every rerun, so anything defined there is
+# rebuilt per interaction. Imported modules stay in sys.modules, which makes
+# this module the place for state shared by every session in the process.
+
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+CACHE_BYTES_ENV = "RING_SKETCH_CACHE_BYTES"
+
+SIDE_STONE_SETTINGS = ("three_stone", "seven_stone")
+
+
+def sketch_key(shape, carat, setting_key, side_shapes_tuple, size=IMG_SIZE):
+    """Normalizes sketch arguments into a cheap (sketch_id, size) cache key.
+
+    Metal is deliberately not part of the key: cached sketches are palette
+    images and the metal colour is applied per request. sketch_id snaps the
+    carat to the 0.1 slider grid (folding float noise like 1.2000000000000002)
+    and ignores side stones for settings that do not draw them.
+    """
+    return (sketch_id(shape, carat, setting_key, side_shapes_tuple), size)
+
+
+def image_nbytes(image):
+    """Approximate in-memory size of a PIL image."""
+    return image.width * image.height * len(image.getbands())
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by a byte budget."""
+
+    def __init__(self, max_bytes, sizeof=len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if size > self.max_bytes:
+                # Never let a single oversized entry flush the whole cache
+                return
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._items[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_create(self, key, factory):
+        """Returns the cached value for key, calling factory() on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Counters for scraping/monitoring."""
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+SKETCH_CACHE = LRUCache(
+    int(os.environ.get(CACHE_BYTES_ENV, DEFAULT_CACHE_BYTES)),
+    sizeof=image_nbytes,
+)
+
+
+def cached_sketch(render, shape, carat, setting_key, side_shapes_tuple, size=IMG_SIZE):
+    """Returns the indexed sketch from the shared cache, rendering it on a miss.
+
+    The returned image is shared between sessions and must not be mutated;
+    colour it with sketch.apply_metal_palette, which works on a copy.
+    """
+    carat = snap_carat(carat) # Render exactly what the key says
+    key = sketch_key(shape, carat, setting_key, side_shapes_tuple, size)
+    return SKETCH_CACHE.get_or_create(
+        key, lambda: render(shape, carat, setting_key, side_shapes_tuple, size=size)
+    )
@@ -0,0 +1,150 @@
+"""Parallel catalog build into sprite sheets.
+
+Run:  python -m ring_designer.catalog --output catalog/ [--workers N] [--tile-size 96]
+
+Every reachable sketch is rendered into one sprite sheet per shape/setting
+(columns are carat steps, rows are side-stone x metal combinations) and a
+manifest.json maps each configuration to its sheet and pixel offset. Sheets
+are split across a process pool; each worker streams one sheet at a time to
+disk in bands of rows, so memory stays bounded by a single band per worker. The manifest is
+rewritten after every finished sheet, and re-running the command skips sheets
+that are already recorded, so an interrupted build resumes where it stopped.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from .atlas import iter_sketch_configs
+from .config import CARAT_STEPS
+from .options import METALS, SETTINGS
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2 # 2: rows grouped by side stones, then metal
+DEFAULT_TILE_SIZE = 96
+
+
+def sheet_name(shape, setting_key):
+    return f"{shape.lower()}_{setting_key}.png"
+
+
+def plan_sheets():
+    """Groups every reachable configuration by (shape, setting_key)."""
+    sheets = {}
+    for shape, carat, setting_key, sides in iter_sketch_configs():
+        sheets.setdefault((shape, setting_key), set()).add(sides)
+    return [(shape, setting_key, sorted(sides)) for (shape, setting_key), sides in sheets.items()]
+
+
+def render_sheet(job):
+    """Worker: renders one sheet to disk and returns its manifest entries.
+
+    The sheet is written through the streaming PNG writer one band at a time
+    (one side-stone combination: a row per metal), so only a band is ever in
+    memory; a whole sheet at large tile sizes would be well over a gigabyte.
+    """
+    from PIL import Image
+
+    from .cache import SIDE_STONE_SETTINGS
+    from .compositor import compose_indexed_sketch
+    from .export import png_stream
+    from .sketch import IMG_SIZE, apply_metal_palette
+
+    shape, setting_key, side_combos, output_dir, tile_size = job
+    metals = list(METALS.items())
+    width, band_height = tile_size * len(CARAT_STEPS), tile_size * len(metals)
+    setting_label = next(label for label, key in SETTINGS.items() if key == setting_key)
+    name = sheet_name(shape, setting_key)
+
+    entries = []
+
+    def bands():
+        for sides_index, sides in enumerate(side_combos):
+            band = Image.new("RGB", (width, band_height), "white")
+            for column, carat in enumerate(CARAT_STEPS):
+                # One indexed render per carat/side combo, recoloured for each metal
+                indexed = compose_indexed_sketch(shape, carat, setting_key, sides)
+                for metal_index, (metal_label, metal_key) in enumerate(metals):
+                    tile = apply_metal_palette(indexed, metal_key).convert("RGB")
+                    if tile_size != IMG_SIZE:
+                        tile = tile.resize((tile_size, tile_size), Image.LANCZOS)
+                    x = column * tile_size
+                    band.paste(tile, (x, metal_index * tile_size))
+                    entries.append({
+                        "shape": shape,
+                        "carat": carat,
+                        "metal": metal_label,
+                        "setting": setting_label,
+                        "side_stones": list(sides) if setting_key in SIDE_STONE_SETTINGS else [],
+                        "sheet": name,
+                        "x": x, "y": sides_index * band_height + metal_index * tile_size,
+                        "w": tile_size, "h": tile_size,
+                    })
+            yield band.tobytes()
+
+    tmp_path = os.path.join(output_dir, name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        for chunk in png_stream(width, band_height * len(side_combos), bands(), level=9):
+            f.write(chunk)
+    os.replace(tmp_path, os.path.join(output_dir, name))
+    return name, entries
+
+
+def load_manifest(output_dir, tile_size):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "tile_size": tile_size, "sheets": {}}
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("tile_size") != tile_size:
+        raise SystemExit(f"{path} was built with different settings; use a fresh output directory.")
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def build_catalog(output_dir, workers=None, tile_size=DEFAULT_TILE_SIZE):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir, tile_size)
+    done = {name for name in manifest["sheets"] if os.path.exists(os.path.join(output_dir, name))}
+    jobs = [
+        (shape, setting_key, side_combos, output_dir, tile_size)
+        for shape, setting_key, side_combos in plan_sheets()
+        if sheet_name(shape, setting_key) not in done
+    ]
+    total = len(jobs) + len(done)
+    if not jobs:
+        print(f"All {total} sheets already built in {output_dir}")
+        return manifest
+
+    print(f"Building {len(jobs)} of {total} sheets ({len(done)} already done)", file=sys.stderr)
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for finished, (name, entries) in enumerate(pool.imap_unordered(render_sheet, jobs), len(done) + 1):
+            manifest["sheets"][name] = entries
+            save_manifest(output_dir, manifest)
+            elapsed = time.perf_counter() - start
+            print(f"  [{finished}/{total}] {name}: {len(entries)} tiles ({elapsed:.1f}s elapsed)", file=sys.stderr)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render every ring variant into sprite sheets.")
+    parser.add_argument("--output", default="catalog")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE)
+    args = parser.parse_args(argv)
+    manifest = build_catalog(args.output, args.workers, args.tile_size)
+    count = sum(len(entries) for entries in manifest["sheets"].values())
+    print(f"{count} variants across {len(manifest['sheets'])} sheets in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Layered sketch compositor.
+
+Each drawing stage of create_ring_sketch is rendered to its own palette-index
+layer ("L" mode, 0 = transparent) and cached under a key built only from the
+inputs that stage depends on. The final sketch is the layers pasted in stage
+order onto the background, so changing one sidebar control only redraws the
+layers it invalidates:
+
+    band       band gap width, basket on/off
+    main stone shape, carat
+    setting    shape, carat, setting, side stones
+
+(plus the output size, for supersampled renders).
+
+Metal is not part of any key: it is a palette slot applied after composition
+(see sketch.apply_metal_palette).
+"""
+import os
+
+from .cache import LRUCache, image_nbytes, sketch_key
+from .config import snap_carat
+from .sketch import (
+    IMG_SIZE, PALETTE_BACKGROUND, PALETTE_FILL, PALETTE_METAL, PALETTE_OUTLINE,
+    apply_metal_palette, band_half_width, compute_sketch_geometry,
+    draw_band, draw_main_stone, draw_setting, metal_palette, sketch_draw,
+)
+from .timing import span
+
+DEFAULT_LAYER_CACHE_BYTES = 32 * 1024 * 1024
+LAYER_CACHE_BYTES_ENV = "RING_LAYER_CACHE_BYTES"
+
+LAYER_CACHE = LRUCache(
+    int(os.environ.get(LAYER_CACHE_BYTES_ENV, DEFAULT_LAYER_CACHE_BYTES)),
+    sizeof=image_nbytes,
+)
+
+# Any non-background index is opaque when pasting a layer
+_OPAQUE_LUT = [0] + [255] * 255
+
+
+def _render_layer(name, paint, size):
+    from PIL import Image
+
+    # Only misses reach this point, so these spans measure real redraws
+    with span(f"sketch.{name}"):
+        layer = Image.new("L", (size, size), PALETTE_BACKGROUND)
+        paint(sketch_draw(layer, size))
+    return layer
+
+
+def band_layer(shape, carat, setting_key, size=IMG_SIZE):
+    carat = snap_carat(carat)
+    geometry = compute_sketch_geometry(shape, carat, setting_key)
+    # The band only sees how wide a gap to leave, so shapes and settings
+    # with the same gap share one layer.
+    key = ("band", band_half_width(geometry, shape, setting_key), setting_key != "solitaire", size)
+    return LAYER_CACHE.get_or_create(
+        key,
+        lambda: _render_layer(
+            "band", lambda draw: draw_band(draw, geometry, shape, setting_key, PALETTE_METAL), size
+        ),
+    )
+
+
+def main_stone_layer(shape, carat, size=IMG_SIZE):
+    # Snapped once so the key and the drawn geometry always agree
+    carat = snap_carat(carat)
+    key = ("main_stone", shape, carat, size)
+    # The main stone does not depend on the setting; any setting key gives the same stone geometry
+    geometry = compute_sketch_geometry(shape, carat, "solitaire")
+    return LAYER_CACHE.get_or_create(
+        key,
+        lambda: _render_layer(
+            "main_stone",
+            lambda draw: draw_main_stone(draw, geometry, shape, outline=PALETTE_OUTLINE, fill=PALETTE_FILL),
+            size,
+        ),
+    )
+
+
+def setting_layer(shape, carat, setting_key, side_shapes_tuple, size=IMG_SIZE):
+    carat = snap_carat(carat)
+    key = ("setting", *sketch_key(shape, carat, setting_key, side_shapes_tuple, size))
+    geometry = compute_sketch_geometry(shape, carat, setting_key)
+    return LAYER_CACHE.get_or_create(
+        key,
+        lambda: _render_layer(
+            "setting",
+            lambda draw: draw_setting(draw, geometry, shape, setting_key, side_shapes_tuple, PALETTE_METAL,
+                                      outline=PALETTE_OUTLINE, fill=PALETTE_FILL),
+            size,
+        ),
+    )
+
+
+def compose_indexed_sketch(shape, carat, setting_key, side_shapes_tuple, size=IMG_SIZE):
+    """Metal-independent "P" mode sketch built from cached layers."""
+    from PIL import Image
+
+    layers = (band_layer(shape, carat, setting_key, size),
+              main_stone_layer(shape, carat, size),
+              setting_layer(shape, carat, setting_key, side_shapes_tuple, size))
+    with span("sketch.composite"):
+        canvas = Image.new("L", (size, size), PALETTE_BACKGROUND)
+        for layer in layers:
+            canvas.paste(layer, mask=layer.point(_OPAQUE_LUT))
+        # Attaching a palette turns the index map into a "P" image in place
+        canvas.putpalette(metal_palette(None))
+    return canvas
+
+
+def compose_ring_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple):
+    """Drop-in replacement for create_ring_sketch built from cached layers."""
+    return apply_metal_palette(compose_indexed_sketch(shape, carat, setting_key, side_shapes_tuple), metal_key)
@@ -0,0 +1,208 @@
+"""Compact ring configuration with a mixed-radix integer ID.
+
+A RingConfig holds the nine options of a ring. Every option is an index
+into its option list, and the ID packs those indices into one integer:
+
+    id = ((shape * 26 + carat_step) * 2 + diamond_type) * ... * 27 + side_stones
+
+Side stones take three base-3 digits: a three-stone ring uses the first,
+and settings without side stones use zeros. Every design therefore has exactly
+one ID. That makes IDs cheap cache keys (one small int), short share links
+(RingConfig.token is the ID in base 36, five characters) and compact
+storage. encode and decode are a handful of dict lookups and divmods.
+
+sketch_id() packs only what the sketch depends on (shape, carat, setting,
+side stones; not metal, which is a palette swap) and is what the sketch
+caches key on.
+"""
+import argparse
+
+from .options import (
+    CERTIFICATE_TYPES, CLARITY_GRADES, COLOR_GRADES, DIAMOND_SHAPES, DIAMOND_TYPES,
+    METALS, SETTINGS, SIDE_STONE_SHAPES,
+)
+
+MIN_CARAT = 0.5
+MAX_CARAT = 3.0
+CARAT_STEP = 0.1
+CARAT_STEPS = [round(MIN_CARAT + step * CARAT_STEP, 1)
+               for step in range(int(round((MAX_CARAT - MIN_CARAT) / CARAT_STEP)) + 1)] # Slider range 0.5 - 3.0
+SIDE_STONE_COUNTS = {"three_stone": 1, "seven_stone": 3}
+
+METAL_LABELS = list(METALS)
+SETTING_LABELS = list(SETTINGS)
+SETTING_KEYS = list(SETTINGS.values())
+
+# (field, options) from the most to the least significant digit
+FIELDS = (
+    ("shape", DIAMOND_SHAPES),
+    ("carat", CARAT_STEPS),
+    ("diamond_type", DIAMOND_TYPES),
+    ("color", COLOR_GRADES),
+    ("clarity", CLARITY_GRADES),
+    ("metal", METAL_LABELS),
+    ("certificate", CERTIFICATE_TYPES),
+    ("setting", SETTING_LABELS),
+)
+SIDE_RADIX = len(SIDE_STONE_SHAPES) ** 3
+CONFIG_ID_LIMIT = SIDE_RADIX
+for _, _options in FIELDS:
+    CONFIG_ID_LIMIT *= len(_options)
+
+_INDEX = {field: {value: i for i, value in enumerate(options)} for field, options in FIELDS}
+_SIDE_INDEX = {shape: i for i, shape in enumerate(SIDE_STONE_SHAPES)}
+_SETTING_KEY_INDEX = {key: i for i, key in enumerate(SETTING_KEYS)}
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def carat_step(carat):
+    """Index of a carat value on the slider grid."""
+    step = round((float(carat) - MIN_CARAT) / CARAT_STEP)
+    if not 0 <= step < len(CARAT_STEPS):
+        raise ValueError(f"carat must be between {MIN_CARAT} and {MAX_CARAT}")
+    return step
+
+
+def snap_carat(carat):
+    """The slider grid value for a carat, with float noise (1.9999999999999998) folded away."""
+    return CARAT_STEPS[carat_step(carat)]
+
+
+def side_digit(setting_key, side_shapes_tuple):
+    """Packs the side stones that a setting actually uses into one 0..26 digit."""
+    count = SIDE_STONE_COUNTS.get(setting_key, 0)
+    if len(side_shapes_tuple) < count:
+        raise ValueError(f"{setting_key} needs {count} side stone shapes")
+    digit = 0
+    for position in range(3):
+        shape = side_shapes_tuple[position] if position < count else SIDE_STONE_SHAPES[0]
+        digit = digit * 3 + _SIDE_INDEX[shape]
+    return digit
+
+
+def side_shapes_from_digit(setting_key, digit):
+    shapes = (SIDE_STONE_SHAPES[digit // 9], SIDE_STONE_SHAPES[digit // 3 % 3], SIDE_STONE_SHAPES[digit % 3])
+    count = SIDE_STONE_COUNTS.get(setting_key, 0)
+    return shapes[:count] if count else (SIDE_STONE_SHAPES[0],) # Same default tuple as the sidebar
+
+
+def sketch_id(shape, carat, setting_key, side_shapes_tuple):
+    """Integer key of everything a sketch depends on (metal excluded)."""
+    return (((_INDEX["shape"][shape] * len(CARAT_STEPS) + carat_step(carat)) * len(SETTING_KEYS)
+             + _SETTING_KEY_INDEX[setting_key]) * SIDE_RADIX + side_digit(setting_key, side_shapes_tuple))
+
+
+class RingConfig:
+    """One ring design; immutable, hashable and packable into an integer ID."""
+
+    __slots__ = ("shape", "carat", "diamond_type", "color", "clarity", "metal", "certificate", "setting",
+                 "side_stones", "id")
+
+    def __init__(self, shape, carat, diamond_type, color, clarity, metal, certificate, setting,
+                 side_stones=("Round",)):
+        values = {"shape": shape, "carat": snap_carat(carat), "diamond_type": diamond_type,
+                  "color": color, "clarity": clarity, "metal": metal, "certificate": certificate,
+                  "setting": setting}
+        config_id = 0
+        for field, options in FIELDS:
+            index = _INDEX[field].get(values[field])
+            if index is None:
+                raise ValueError(f"Invalid {field}: {values[field]!r}")
+            config_id = config_id * len(options) + index
+            object.__setattr__(self, field, values[field])
+        setting_key = SETTINGS[setting]
+        try:
+            digit = side_digit(setting_key, tuple(side_stones))
+        except KeyError as e:
+            raise ValueError(f"Invalid side stone shape: {e.args[0]!r}") from None
+        object.__setattr__(self, "side_stones", side_shapes_from_digit(setting_key, digit))
+        object.__setattr__(self, "id", config_id * SIDE_RADIX + digit)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RingConfig is immutable")
+
+    @classmethod
+    def from_id(cls, config_id):
+        config_id = int(config_id)
+        if not 0 <= config_id < CONFIG_ID_LIMIT:
+            raise ValueError(f"Invalid configuration id: {config_id}")
+        config = object.__new__(cls)
+        object.__setattr__(config, "id", config_id)
+        rest, digit = divmod(config_id, SIDE_RADIX)
+        for field, options in reversed(FIELDS):
+            rest, index = divmod(rest, len(options))
+            object.__setattr__(config, field, options[index])
+        setting_key = SETTINGS[config.setting]
+        side_stones = side_shapes_from_digit(setting_key, digit)
+        # Digits a setting does not use must be zero, or one design would have several IDs
+        if side_digit(setting_key, side_stones) != digit:
+            raise ValueError(f"Invalid configuration id: {config_id}")
+        object.__setattr__(config, "side_stones", side_stones)
+        return config
+
+    def __reduce__(self):
+        # __slots__ and the immutable __setattr__ defeat default pickling
+        return (RingConfig.from_id, (self.id,))
+
+    @property
+    def token(self):
+        """The ID in base 36, for URLs."""
+        value, digits = self.id, []
+        while True:
+            value, digit = divmod(value, 36)
+            digits.append(_BASE36[digit])
+            if not value:
+                return "".join(reversed(digits))
+
+    @classmethod
+    def from_token(cls, token):
+        try:
+            return cls.from_id(int(token, 36))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid configuration token: {token!r}") from None
+
+    @property
+    def setting_key(self):
+        return SETTINGS[self.setting]
+
+    @property
+    def metal_key(self):
+        return METALS[self.metal]
+
+    @property
+    def sketch_id(self):
+        return sketch_id(self.shape, self.carat, self.setting_key, self.side_stones)
+
+    def price_args(self):
+        """Positional arguments for calculate_price."""
+        return (self.shape, self.carat, self.color, self.clarity, self.metal, self.setting,
+                self.certificate, self.side_stones, self.diamond_type)
+
+    def sketch_args(self):
+        """Positional arguments for create_ring_sketch and the progressive renderers."""
+        return (self.shape, self.carat, self.metal_key, self.setting_key, self.side_stones)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__ if field != "id"}
+
+    def __eq__(self, other):
+        return isinstance(other, RingConfig) and other.id == self.id
+
+    def __hash__(self):
+        return self.id
+
+    def __repr__(self):
+        return f"<RingConfig {self.token}: {self.shape} {self.carat} ct, {self.setting}>"
+
+
+def _design_argument(token):
+    try:
+        return RingConfig.from_token(token)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def add_designs_argument(parser):
+    """Adds the positional design IDs of the command-line tools; they parse to RingConfigs."""
+    parser.add_argument("designs", nargs="+", type=_design_argument,
+                        help="Design IDs (as shown in the app and its ?ring= links).")
@@ -0,0 +1,148 @@
+"""Encoded sketch bytes with a selectable codec and compression level.
+
+Handing Streamlit a PIL image makes it re-encode the sketch to PNG on every
+rerun. The app instead passes bytes encoded once here and kept in
+ENCODED_CACHE, so an unchanged sketch is never encoded twice.
+
+Formats:
+    png     RGB PNG; level is the zlib level (0-9), 9 also enables optimize
+    png8    palette PNG (quantized if needed); same levels as png
+    webp    lossless WebP; level is the encoder effort (0-6)
+
+Each encode records its time (span "encode.<format>") and output size in
+ENCODE_STATS, so formats can be compared on real traffic.
+
+FILE_FORMATS and the raw PNG helpers (png_chunk, png_scanlines) are shared
+by the streaming writers of the print export and the animations.
+
+Configuration (environment):
+    RING_SKETCH_FORMAT         format used by the app (default png8)
+    RING_SKETCH_LEVEL          compression level (default: the format's own)
+    RING_ENCODED_CACHE_BYTES   byte budget of the encoded cache (default 16 MiB)
+"""
+import io
+import os
+import struct
+import threading
+import time
+import zlib
+
+from .cache import LRUCache
+from .timing import span
+
+FORMATS = {
+    # name: (Pillow format, MIME type, default level, highest level)
+    "png": ("PNG", "image/png", 9, 9),
+    "png8": ("PNG", "image/png", 9, 9),
+    "webp": ("WEBP", "image/webp", 4, 6),
+}
+
+# Files written by the print export and the animations
+FILE_FORMATS = {
+    # name: (MIME type, file extension)
+    "png": ("image/png", "png"),
+    "tiff": ("image/tiff", "tif"),
+    "gif": ("image/gif", "gif"),
+    "apng": ("image/apng", "png"),
+    "webp": ("image/webp", "webp"),
+}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+SKETCH_FORMAT = os.environ.get("RING_SKETCH_FORMAT", "png8")
+SKETCH_LEVEL = int(os.environ["RING_SKETCH_LEVEL"]) if os.environ.get("RING_SKETCH_LEVEL") else None
+
+ENCODED_CACHE = LRUCache(int(os.environ.get("RING_ENCODED_CACHE_BYTES", 16 * 1024 * 1024)))
+
+
+def resolve_level(fmt, level=None):
+    """Validates a format and returns the compression level to use for it."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown image format: {fmt!r} (expected one of {', '.join(FORMATS)})")
+    _, _, default, highest = FORMATS[fmt]
+    if level is None:
+        return default
+    return max(0, min(highest, int(level)))
+
+
+def mime_type(fmt):
+    return FORMATS[fmt][1]
+
+
+def png_chunk(kind, data):
+    """One PNG chunk: length, type, data and CRC."""
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)))
+
+
+def png_scanlines(raw, stride):
+    """Raw pixel rows as PNG scanlines, with filter type 0 (None) in front of every row."""
+    return b"".join(b"\0" + raw[i:i + stride] for i in range(0, len(raw), stride))
+
+
+class EncodeStats:
+    """Running encode time and output size per (format, level)."""
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, fmt, level, seconds, nbytes):
+        with self._lock:
+            totals = self._totals.setdefault((fmt, level), [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += nbytes
+
+    def snapshot(self):
+        """{"format/level": {"count", "mean_ms", "mean_bytes"}}."""
+        with self._lock:
+            items = sorted(self._totals.items())
+        return {
+            f"{fmt}/{level}": {
+                "count": count,
+                "mean_ms": seconds / count * 1000,
+                "mean_bytes": nbytes / count,
+            }
+            for (fmt, level), (count, seconds, nbytes) in items
+        }
+
+    def clear(self):
+        with self._lock:
+            self._totals.clear()
+
+
+ENCODE_STATS = EncodeStats()
+
+
+def encode_image(image, fmt=SKETCH_FORMAT, level=SKETCH_LEVEL):
+    """Encodes a PIL image; returns the bytes."""
+    from PIL import Image
+
+    level = resolve_level(fmt, level)
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    with span(f"encode.{fmt}"):
+        if fmt == "webp":
+            image.save(buffer, format="WEBP", lossless=True, quality=100, method=level)
+        else:
+            if fmt == "png8" and image.mode != "P":
+                image = image.convert("RGB").convert("P", palette=Image.ADAPTIVE, colors=256)
+            elif fmt == "png" and image.mode != "RGB":
+                image = image.convert("RGB")
+            image.save(buffer, format="PNG", compress_level=level, optimize=level >= 9)
+    data = buffer.getvalue()
+    ENCODE_STATS.record(fmt, level, time.perf_counter() - start, len(data))
+    return data
+
+
+def encoded_key(key, fmt=SKETCH_FORMAT, level=SKETCH_LEVEL):
+    """The ENCODED_CACHE key cached_encode stores the image identified by key under."""
+    return (key, fmt, resolve_level(fmt, level))
+
+
+def cached_encode(key, render, fmt=SKETCH_FORMAT, level=SKETCH_LEVEL):
+    """Encoded bytes for the image render() would return, cached under key.
+
+    key must identify the image; the format and level are added to it.
+    """
+    return ENCODED_CACHE.get_or_create(encoded_key(key, fmt, level),
+                                       lambda: encode_image(render(), fmt, level))
@@ -0,0 +1,211 @@
+"""High-resolution print export in strips, with bounded memory.
+
+Print sizes (6000px and up) are far too big to draw on one canvas: a 6000px
+RGB sketch is about 100 MB, and more with supersampling. The export draws
+the same geometry as the on-screen sketch, one horizontal strip at a time,
+through TransformedDraw: the scale maps the 500px design space to the target
+size, and the offset shifts every strip into place. Each strip goes straight
+to a streaming PNG or TIFF writer and is then dropped. By default strips
+get fewer rows as the image gets wider, so each strip stays within
+STRIP_BYTES of supersampled RGB. Peak memory is therefore the same whatever
+the output size.
+
+Edges are anti-aliased by drawing each strip at `supersample` times the size
+and box-reducing it. Strip boundaries are multiples of the factor, and each
+strip is drawn with REGION_PAD extra rows above and below that are cropped
+off. TransformedDraw shifts whole pixels, so the strips join into exactly
+the image one canvas would hold.
+
+Both writers are generators of byte chunks, so the output can go to a file,
+an HTTP response or a download without being assembled first.
+PNG is deflate-compressed and small, because the sketch is mostly flat
+colour. TIFF is uncompressed RGB in strips, which every print workflow
+reads. Both carry the DPI.
+
+Run:  python -m ring_designer.export <design id> [<design id> ...] [--size 6000] [--format tiff] [--dpi 300]
+"""
+import argparse
+import os
+import struct
+import sys
+import zlib
+
+from .config import add_designs_argument
+from .encoding import FILE_FORMATS, PNG_SIGNATURE, png_chunk, png_scanlines
+from .sketch import (
+    IMG_SIZE, PALETTE_BACKGROUND, REGION_PAD, TransformedDraw, compute_sketch_geometry, draw_indexed_sketch,
+    metal_palette,
+)
+from .timing import span
+
+EXPORT_FORMATS = {fmt: FILE_FORMATS[fmt] for fmt in ("png", "tiff")}
+DEFAULT_PRINT_SIZE = 6000
+MAX_PRINT_SIZE = 20000
+STRIP_BYTES = 8 * 1024 * 1024 # Supersampled RGB pixels drawn per strip
+DEFAULT_DPI = 300
+DEFAULT_SUPERSAMPLE = 2
+IDAT_CHUNK_BYTES = 256 * 1024
+
+
+def strip_rows_for(size, supersample=DEFAULT_SUPERSAMPLE, strip_bytes=STRIP_BYTES):
+    """Rows per strip that keep one supersampled RGB strip within strip_bytes."""
+    return max(1, min(size, strip_bytes // (size * supersample * supersample * 3)))
+
+
+def render_strips(shape, carat, metal_key, setting_key, side_shapes_tuple, size, strip_rows,
+                  supersample=DEFAULT_SUPERSAMPLE):
+    """Yields the sketch at `size` pixels as raw RGB bytes, strip_rows rows at a time."""
+    from PIL import Image, ImageDraw
+
+    geometry = compute_sketch_geometry(shape, carat, setting_key)
+    palette = metal_palette(metal_key)
+    scale = size * supersample / IMG_SIZE
+    for top in range(0, size, strip_rows):
+        rows = min(strip_rows, size - top)
+        with span("export.strip"):
+            canvas = Image.new("P", (size * supersample, rows * supersample + 2 * REGION_PAD), PALETTE_BACKGROUND)
+            canvas.putpalette(palette)
+            draw = TransformedDraw(ImageDraw.Draw(canvas), scale, (0, top * supersample - REGION_PAD))
+            draw_indexed_sketch(draw, geometry, shape, setting_key, side_shapes_tuple)
+            strip = canvas.crop((0, REGION_PAD, canvas.width, REGION_PAD + rows * supersample)).convert("RGB")
+            if supersample > 1:
+                strip = strip.reduce(supersample)
+            data = strip.tobytes()
+        yield data
+
+
+def png_stream(width, height, strips, dpi=DEFAULT_DPI, level=6):
+    """PNG file bytes for RGB strips, one IDAT chunk at a time."""
+    yield PNG_SIGNATURE
+    yield png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    pixels_per_metre = round(dpi / 0.0254)
+    yield png_chunk(b"pHYs", struct.pack(">IIB", pixels_per_metre, pixels_per_metre, 1))
+
+    compressor = zlib.compressobj(level)
+    stride = width * 3
+    pending = []
+    pending_bytes = 0
+    for strip in strips:
+        with span("export.encode"):
+            compressed = compressor.compress(png_scanlines(strip, stride))
+        if compressed:
+            pending.append(compressed)
+            pending_bytes += len(compressed)
+        if pending_bytes >= IDAT_CHUNK_BYTES:
+            yield png_chunk(b"IDAT", b"".join(pending))
+            pending, pending_bytes = [], 0
+    pending.append(compressor.flush())
+    yield png_chunk(b"IDAT", b"".join(pending))
+    yield png_chunk(b"IEND", b"")
+
+
+def tiff_stream(width, height, strips, strip_rows, dpi=DEFAULT_DPI):
+    """Uncompressed RGB TIFF bytes; every strip is written as it arrives.
+
+    Strip sizes are known up front, so the directory (with all strip offsets)
+    goes at the start and nothing has to be seeked back and patched.
+    """
+    stride = width * 3
+    strip_heights = [min(strip_rows, height - top) for top in range(0, height, strip_rows)]
+    count = len(strip_heights)
+
+    # Little-endian header, then one directory of 12 entries, then the out-of-line values
+    entries_offset = 8
+    extra_offset = entries_offset + 2 + 12 * 12 + 4
+    bits_offset = extra_offset
+    resolution_offset = bits_offset + 6
+    offsets_offset = resolution_offset + 8
+    counts_offset = offsets_offset + 4 * count
+    data_offset = counts_offset + 4 * count
+
+    byte_counts = [rows * stride for rows in strip_heights]
+    strip_offsets = []
+    position = data_offset
+    for size in byte_counts:
+        strip_offsets.append(position)
+        position += size
+
+    def entry(tag, kind, values_count, value):
+        if kind == 3 and values_count == 1:
+            return struct.pack("<HHIHH", tag, kind, values_count, value, 0)
+        return struct.pack("<HHII", tag, kind, values_count, value)
+
+    # With a single strip the offset and count fit inline in the entry
+    single = count == 1
+    header = [
+        b"II*\0", struct.pack("<I", entries_offset),
+        struct.pack("<H", 12),
+        entry(256, 4, 1, width),  # ImageWidth
+        entry(257, 4, 1, height),  # ImageLength
+        entry(258, 3, 3, bits_offset),  # BitsPerSample 8,8,8
+        entry(259, 3, 1, 1),  # Compression: none
+        entry(262, 3, 1, 2),  # PhotometricInterpretation: RGB
+        entry(273, 4, count, strip_offsets[0] if single else offsets_offset),  # StripOffsets
+        entry(277, 3, 1, 3),  # SamplesPerPixel
+        entry(278, 4, 1, strip_rows),  # RowsPerStrip
+        entry(279, 4, count, byte_counts[0] if single else counts_offset),  # StripByteCounts
+        entry(282, 5, 1, resolution_offset),  # XResolution
+        entry(283, 5, 1, resolution_offset),  # YResolution (same value)
+        entry(296, 3, 1, 2),  # ResolutionUnit: inch
+        struct.pack("<I", 0),  # No further directories
+        struct.pack("<HHH", 8, 8, 8),
+        struct.pack("<II", int(dpi), 1),
+        struct.pack(f"<{count}I", *strip_offsets),
+        struct.pack(f"<{count}I", *byte_counts),
+    ]
+    yield b"".join(header)
+    for strip, size in zip(strips, byte_counts):
+        if len(strip) != size:
+            raise ValueError(f"TIFF strip has {len(strip)} bytes, expected {size}")
+        yield strip
+
+
+def iter_print_export(shape, carat, metal_key, setting_key, side_shapes_tuple, size=DEFAULT_PRINT_SIZE,
+                      fmt="png", dpi=DEFAULT_DPI, supersample=DEFAULT_SUPERSAMPLE, strip_rows=None):
+    """Streams a size x size print file as byte chunks."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    if not 1 <= size <= MAX_PRINT_SIZE:
+        raise ValueError(f"Export size must be between 1 and {MAX_PRINT_SIZE} pixels")
+    if supersample < 1:
+        raise ValueError("supersample must be at least 1")
+    strip_rows = strip_rows or strip_rows_for(size, supersample)
+    strips = render_strips(shape, carat, metal_key, setting_key, side_shapes_tuple, size, strip_rows, supersample)
+    if fmt == "png":
+        return png_stream(size, size, strips, dpi)
+    return tiff_stream(size, size, strips, strip_rows, dpi)
+
+
+def write_print_export(path, *sketch_args, **options):
+    """Writes a print file chunk by chunk; returns its size in bytes."""
+    written = 0
+    with open(path, "wb") as f:
+        for chunk in iter_print_export(*sketch_args, **options):
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export ring sketches as high-resolution print files.")
+    add_designs_argument(parser)
+    parser.add_argument("--size", type=int, default=DEFAULT_PRINT_SIZE, help="Edge length in pixels.")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="png")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    parser.add_argument("--supersample", type=int, default=DEFAULT_SUPERSAMPLE)
+    parser.add_argument("--strip-rows", type=int, help="Rows per strip (default: sized to the memory budget).")
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    extension = EXPORT_FORMATS[args.format][1]
+    for config in args.designs:
+        path = os.path.join(args.output_dir, f"ring-{config.token}-{args.size}px.{extension}")
+        written = write_print_export(path, *config.sketch_args(), size=args.size, fmt=args.format, dpi=args.dpi,
+                                     supersample=args.supersample, strip_rows=args.strip_rows)
+        print(f"{path}: {written / 2**20:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
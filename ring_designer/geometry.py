@@ -0,0 +1,204 @@
+"""Normalized vector templates for stones, halos and prongs.
+
+Every diamond outline is described once, at import, in a unit box
+(-1..1 on both axes). place_template() scales and translates a template to a
+stone's centre and half extents, and place_prongs() does the same for prong
+layouts; both are memoized. The results are drawing primitives,
+
+    ("ellipse", box) ("rectangle", box) ("rounded_rectangle", box, radius)
+    ("polygon", points) ("line", points)
+
+which draw_primitives() hands to any ImageDraw-like object in one dispatch
+per primitive. Adding a shape means adding a template entry, not new
+drawing code.
+"""
+from functools import lru_cache
+
+HALO_PADDING = 8
+
+# --- Stone proportions: (across, along) as a fraction of the nominal radius ---
+MAIN_STONE_PROPORTIONS = {
+    "Oval": (1.0, 1.4),
+    "Pear": (1.0, 1.3),
+    "Marquise": (0.8, 1.5), # "Fatter" marquise
+}
+SIDE_STONE_PROPORTIONS = {
+    "Round": (1.0, 1.0),
+    "Marquise": (0.8, 1.5),
+    "Pear": (1.0, 1.3),
+}
+
+# --- Normalized outlines ---
+PEAR_UP = ((0, -1), (1, 0), (0.5, 1), (-0.5, 1), (-1, 0)) # Point on top, flat bottom
+PEAR_LEFT = ((-1, 0), (0, -1), (0.8, -0.5), (0.8, 0.5), (0, 1)) # Point on the left
+MARQUISE = ((0, -1), (1, 0), (0, 1), (-1, 0))
+# Octagon corners as (x, y, cut_x, cut_y): point = centre + (x, y) * half + (cut_x, cut_y) * cut
+CHAMFERED_SQUARE = (
+    (-1, -1, 1, 0), (1, -1, -1, 0), (1, -1, 0, 1), (1, 1, 0, -1),
+    (1, 1, -1, 0), (-1, 1, 1, 0), (-1, 1, 0, -1), (-1, -1, 0, 1),
+)
+
+
+def _mirror(points, mirror_x=False, mirror_y=False):
+    return tuple((-x if mirror_x else x, -y if mirror_y else y) for x, y in points)
+
+
+# Template parts:
+#   ("ellipse",) ("rectangle",)     fill the stone's box
+#   ("rounded_rectangle", divisor)  corner radius = half width // divisor
+#   ("rounded_rectangle_px", px)    fixed corner radius
+#   ("chamfer", divisor)            CHAMFERED_SQUARE with cut = half width // divisor
+#   ("polygon", points) ("line", points)
+TEMPLATES = {
+    ("stone", "Round"): (("ellipse",),),
+    ("stone", "Oval"): (("ellipse",),),
+    ("stone", "Princess"): (("rectangle",), ("line", ((-1, -1), (1, 1))), ("line", ((-1, 1), (1, -1)))),
+    ("stone", "Emerald"): (("chamfer", 4),),
+    ("stone", "Radiant"): (("chamfer", 4),),
+    ("stone", "Cushion"): (("rounded_rectangle", 3),),
+    ("stone", "Pear"): (("polygon", PEAR_UP),),
+    ("stone", "Marquise"): (("polygon", MARQUISE),),
+    ("stone", "Asscher"): (("rectangle",),),
+
+    ("halo", "Round"): (("ellipse",),),
+    ("halo", "Oval"): (("ellipse",),),
+    ("halo", "Pear"): (("polygon", PEAR_UP),),
+    ("halo", "Marquise"): (("polygon", MARQUISE),),
+
+    ("side", "Pear", "up"): (("polygon", PEAR_UP),),
+    ("side", "Pear", "down"): (("polygon", _mirror(PEAR_UP, mirror_y=True)),),
+    ("side", "Pear", "left"): (("polygon", PEAR_LEFT),),
+    ("side", "Pear", "right"): (("polygon", _mirror(PEAR_LEFT, mirror_x=True)),),
+}
+for _shape in ("Princess", "Cushion", "Emerald", "Radiant", "Asscher"):
+    TEMPLATES[("halo", _shape)] = (("rounded_rectangle_px", HALO_PADDING),)
+for _orientation in ("up", "down", "left", "right"):
+    TEMPLATES[("side", "Round", _orientation)] = (("ellipse",),)
+    TEMPLATES[("side", "Marquise", _orientation)] = (("polygon", MARQUISE),)
+
+# --- Prong layouts ---
+# Elements are anchored on the stone's extents (ux, uy in -1..1):
+#   ("dot", ux, uy, kx, ky)  round prong pushed out by (kx, ky) * pad
+#   ("vee", ux, uy, dir)     V-prong opening up (dir -1) or down (dir 1)
+#   ("claw", sx, sy)         corner claw on the (sx, sy) corner
+PRONG_LAYOUTS = {
+    "four": ("standard", (("dot", -1, 0, -1, 0), ("dot", 1, 0, 1, 0), ("dot", 0, -1, 0, -1), ("dot", 0, 1, 0, 1))),
+    "marquise_tips": ("tips", (("dot", -1, 0, -1, 0), ("dot", 1, 0, 1, 0), ("vee", 0, -1, -1), ("vee", 0, 1, 1))),
+    "pear_tips": ("tips", (("dot", -1, 0, -1, 0), ("dot", 1, 0, 1, 0), ("vee", 0, -1, -1),
+                           ("dot", -0.5, 1, 0, 1), ("dot", 0.5, 1, 0, 1))),
+    "corner_claws": ("claws", (("claw", -1, -1), ("claw", 1, -1), ("claw", -1, 1), ("claw", 1, 1))),
+    "cut_corner_claws": ("cut_claws", (("claw", -1, -1), ("claw", 1, -1), ("claw", -1, 1), ("claw", 1, 1))),
+}
+SOLITAIRE_PRONGS = {
+    "Marquise": "marquise_tips",
+    "Pear": "pear_tips",
+    "Princess": "corner_claws",
+    "Cushion": "corner_claws",
+    "Emerald": "cut_corner_claws",
+    "Radiant": "cut_corner_claws",
+    "Asscher": "cut_corner_claws",
+}
+
+
+def main_stone_extents(shape, half_size):
+    """(half_width, half_height) of the main stone for a nominal half size."""
+    across, along = MAIN_STONE_PROPORTIONS.get(shape, (1.0, 1.0))
+    return max(1, int(half_size * across)), int(half_size * along)
+
+
+def side_stone_extents(shape, radius, orientation):
+    """(half_width, half_height) of a side stone; left/right lie on their side."""
+    across, along = SIDE_STONE_PROPORTIONS.get(shape, (1.0, 1.0))
+    across, along = max(1, int(radius * across)), int(radius * along)
+    if orientation in ("left", "right"):
+        return along, across
+    return across, along
+
+
+@lru_cache(maxsize=4096)
+def place_template(name, cx, cy, half_width, half_height):
+    """Scales and translates the template `name` to a stone; returns primitives."""
+    box = (cx - half_width, cy - half_height, cx + half_width, cy + half_height)
+    primitives = []
+    for part in TEMPLATES[name]:
+        kind = part[0]
+        if kind in ("ellipse", "rectangle"):
+            primitives.append((kind, box))
+        elif kind == "rounded_rectangle":
+            primitives.append((kind, box, max(1, half_width // part[1])))
+        elif kind == "rounded_rectangle_px":
+            primitives.append(("rounded_rectangle", box, part[1]))
+        elif kind == "chamfer":
+            cut = max(1, half_width // part[1])
+            primitives.append(("polygon", tuple(
+                (cx + x * half_width + cut_x * cut, cy + y * half_height + cut_y * cut)
+                for x, y, cut_x, cut_y in CHAMFERED_SQUARE
+            )))
+        else: # polygon / line
+            primitives.append((kind, tuple((cx + x * half_width, cy + y * half_height) for x, y in part[1])))
+    return tuple(primitives)
+
+
+def _prong_sizes(sizing, base_size_px, half_width):
+    if sizing == "standard":
+        prong_size = max(2, int(base_size_px * 0.05))
+        half_prong = max(1, prong_size // 2)
+        return {"size": half_prong, "pad": half_prong}
+    if sizing == "tips":
+        prong_size = max(2, int(base_size_px * 0.05)) * 2 # Make V-prongs more visible
+        half_prong = max(1, prong_size // 2)
+        return {"size": half_prong, "pad": half_prong // 2}
+    return {
+        "width": max(3, int(base_size_px * 0.1)),
+        "length": max(3, int(base_size_px * 0.15)),
+        # Emerald/Radiant/Asscher corners are cut, so the claws move inwards
+        "inset": max(1, half_width // 4) if sizing == "cut_claws" else 0,
+    }
+
+
+@lru_cache(maxsize=4096)
+def place_prongs(layout, cx, cy, radius_x, radius_y, base_size_px):
+    """Primitives for a prong layout around a stone with the given extents."""
+    sizing, elements = PRONG_LAYOUTS[layout]
+    sizes = _prong_sizes(sizing, base_size_px, radius_x)
+    primitives = []
+    for element in elements:
+        kind = element[0]
+        if kind == "dot":
+            _, ux, uy, kx, ky = element
+            x = cx + ux * radius_x + kx * sizes["pad"]
+            y = cy + uy * radius_y + ky * sizes["pad"]
+            size = sizes["size"]
+            primitives.append(("ellipse", (x - size, y - size, x + size, y + size)))
+        elif kind == "vee":
+            _, ux, uy, direction = element
+            x, y = cx + ux * radius_x, cy + uy * radius_y
+            size = sizes["size"]
+            primitives.append(("polygon", (
+                (x, y), (x - size, y + direction * 2 * size), (x + size, y + direction * 2 * size)
+            )))
+        else: # claw
+            _, sx, sy = element
+            x = cx + sx * (radius_x - sizes["inset"])
+            y = cy + sy * radius_y
+            length, width = sizes["length"], sizes["width"]
+            primitives.append(("polygon", (
+                (x + sx * length, y), (x, y + sy * length), (x - sx * width, y), (x, y - sy * width)
+            )))
+    return tuple(primitives)
+
+
+def draw_primitives(draw, primitives, outline=None, fill=None, width=2):
+    """Draws placed primitives; facet lines use the outline colour."""
+    for primitive in primitives:
+        kind, coords = primitive[0], primitive[1]
+        if kind == "ellipse":
+            draw.ellipse(coords, outline=outline, fill=fill, width=width)
+        elif kind == "rectangle":
+            draw.rectangle(coords, outline=outline, fill=fill, width=width)
+        elif kind == "rounded_rectangle":
+            draw.rounded_rectangle(coords, radius=primitive[2], outline=outline, fill=fill, width=width)
+        elif kind == "polygon":
+            draw.polygon(coords, outline=outline, fill=fill, width=width)
+        elif kind == "line":
+            draw.line(coords, fill=outline)
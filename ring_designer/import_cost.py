@@ -0,0 +1,62 @@
+"""Measures the cold-start cost of importing the headless core.
+
+Usage: python -m ring_designer.import_cost [--runs 5] [--max-ms 50] [--max-kib 512]
+
+Each run imports the package in a fresh interpreter and reports wall time,
+allocated memory and whether Streamlit or Pillow were pulled in. Exits
+non-zero when a budget is exceeded so it can guard CI.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_PROBE = """
+import json, sys, time, tracemalloc
+tracemalloc.start()
+start = time.perf_counter()
+import ring_designer
+elapsed = time.perf_counter() - start
+current, peak = tracemalloc.get_traced_memory()
+print(json.dumps({
+    "ms": elapsed * 1000,
+    "kib": peak / 1024,
+    "streamlit": "streamlit" in sys.modules,
+    "pillow": "PIL" in sys.modules,
+}))
+"""
+
+
+def measure(runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _PROBE], check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import cost of ring_designer.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the median import time exceeds this.")
+    parser.add_argument("--max-kib", type=float, default=None, help="Fail if the median allocation exceeds this.")
+    args = parser.parse_args(argv)
+
+    results = measure(args.runs)
+    median_ms = statistics.median(r["ms"] for r in results)
+    median_kib = statistics.median(r["kib"] for r in results)
+    heavy = sorted({name for r in results for name in ("streamlit", "pillow") if r[name]})
+    print(f"import ring_designer: {median_ms:.1f} ms, {median_kib:.0f} KiB (median of {args.runs})")
+    print(f"heavy dependencies loaded: {', '.join(heavy) or 'none'}")
+
+    failed = bool(heavy)
+    if args.max_ms is not None and median_ms > args.max_ms:
+        failed = True
+    if args.max_kib is not None and median_kib > args.max_kib:
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+# --- Constants & Options ---
+DIAMOND_SHAPES = [
+    "Round", "Princess", "Oval", "Emerald",
+    "Cushion", "Pear", "Marquise",
+    "Asscher", "Radiant"
+]
+DIAMOND_TYPES = ["Natural", "Lab-Grown"]
+METALS = {
+    "Yellow Gold (14K)": "yellow_gold",
+    "White Gold (14K)": "white_gold",
+    "Rose Gold (14K)": "rose_gold"
+}
+SETTINGS = {
+    "Solitaire (Single Diamond)": "solitaire",
+    "Halo": "halo",
+    "Three-Stone": "three_stone",
+    "Seven-Stone (Cluster Sides)": "seven_stone"
+}
+SIDE_STONE_SHAPES = ["Round", "Marquise", "Pear"]
+CERTIFICATE_TYPES = ["GIA", "CGL"]
+USD_TO_ILS_RATE = 3.7
+
+# --- Color definitions for drawing ---
+METAL_COLORS_RGB = {
+    "yellow_gold": (212, 175, 55),
+    "white_gold": (220, 220, 220),
+    "rose_gold": (230, 180, 170)
+}
+DIAMOND_OUTLINE = (50, 50, 50)
+DIAMOND_FILL = (245, 245, 245)
+COLOR_GRADES = ["J", "I", "H", "G", "F", "E", "D"]
+CLARITY_GRADES = ["SI2", "SI1", "VS2", "VS1", "VVS2", "VVS1", "IF", "FL"]
+
+# --- Pricing Tables (Demo) ---
+# Built-in price book, used when no price_book.json is deployed (see price_book.py)
+BASE_DIAMOND_PRICE_PER_CARAT = 5000
+DIAMOND_TYPE_MULTIPLIERS = {"Natural": 1.0, "Lab-Grown": 0.5} 
+SHAPE_MULTIPLIERS = {
+    "Round": 1.0, "Princess": 0.9, "Oval": 0.95,
+    "Emerald": 0.9, "Cushion": 0.85, "Pear": 0.9,
+    "Marquise": 0.8, "Asscher": 0.85, "Radiant": 0.88
+}
+COLOR_MULTIPLIERS = {"J": 0.8, "I": 0.9, "H": 1.0, "G": 1.1, "F": 1.3, "E": 1.5, "D": 2.0}
+CLARITY_MULTIPLIERS = {"SI2": 0.8, "SI1": 0.9, "VS2": 1.0, "VS1": 1.1, "VVS2": 1.3, "VVS1": 1.5, "IF": 1.8, "FL": 2.2}
+METAL_BASE_PRICE = {"Yellow Gold (14K)": 500, "White Gold (14K)": 550, "Rose Gold (14K)": 520}
+SETTING_BASE_PRICE = {
+    "Solitaire (Single Diamond)": 200,
+    "Halo": 800,
+    "Three-Stone": 600,
+    "Seven-Stone (Cluster Sides)": 1400
+}
+CERTIFICATE_MULTIPLIERS = {"GIA": 1.15, "CGL": 1.0}
+SIDE_STONE_MULTIPLIER = {"Round": 1.0, "Marquise": 1.2, "Pear": 1.25}
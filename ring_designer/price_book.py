@@ -0,0 +1,208 @@
+"""Externalized price book with hot reload.
+
+Prices live in a versioned file instead of code, so a price change is an
+edit to that file rather than a redeploy. JSON layout (see price_book.json):
+
+    {
+      "version": "1",
+      "default_currency": "ILS",
+      "currencies": {"USD": {"rate": 1.0, "symbol": "$"}, "ILS": {"rate": 3.7, "symbol": "₪"}},
+      "base_per_carat": 5000,
+      "diamond_type": {...}, "shape": {...}, "color": {...}, "clarity": {...},
+      "certificate": {...}, "side_stone": {...},
+      "metal": {...}, "setting": {...}
+    }
+
+All amounts are in USD; currency rates convert from USD. A CSV file with
+`table,key,value` rows works too: "meta" rows hold version and
+default_currency, "base_per_carat" has an empty key, "currency" rows hold
+rates and "currency_symbol" rows the symbols.
+
+current_price_book() is what pricing code calls. It stats the file at most
+once per poll interval and re-reads it only when mtime or size changed; a new
+PriceBook is built only when the content hash changed, and is swapped in with
+a single assignment so readers see either the old book or the new one. A
+broken edit is logged and the previous book stays live. Caches derived from
+prices key on PriceBook.key, so they turn over only when the book does.
+
+Without a file the built-in tables in options.py are used;
+builtin_price_book_data() is also what the shipped price_book.json was
+written from.
+
+Configuration (environment):
+    RING_PRICE_BOOK          path of the price book (default: price_book.json in the repo root, if present)
+    RING_PRICE_BOOK_POLL_S   seconds between change checks (default 2)
+"""
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+
+from . import options as opt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRICE_BOOK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "price_book.json")
+PRICE_BOOK_PATH = os.environ.get("RING_PRICE_BOOK", DEFAULT_PRICE_BOOK_PATH)
+POLL_INTERVAL_S = float(os.environ.get("RING_PRICE_BOOK_POLL_S", 2))
+
+FACTOR_TABLES = ("diamond_type", "shape", "color", "clarity", "certificate", "side_stone")
+AMOUNT_TABLES = ("metal", "setting")
+# Prices for options a table does not list (same fallbacks calculate_price always used)
+TABLE_DEFAULTS = {"metal": 500, "setting": 200}
+
+
+class PriceBookError(ValueError):
+    pass
+
+
+class PriceBook:
+    """One immutable, validated version of the price book."""
+
+    __slots__ = ("version", "digest", "default_currency", "currencies", "symbols", "base_per_carat",
+                 "diamond_type", "shape", "color", "clarity", "certificate", "side_stone", "metal", "setting")
+
+    def __init__(self, data, digest):
+        try:
+            self.version = str(data["version"])
+            self.default_currency = data["default_currency"]
+            currencies = data["currencies"]
+            self.currencies = {code: float(entry["rate"]) for code, entry in currencies.items()}
+            self.symbols = {code: entry.get("symbol", code) for code, entry in currencies.items()}
+            self.base_per_carat = float(data["base_per_carat"])
+            for table in FACTOR_TABLES + AMOUNT_TABLES:
+                setattr(self, table, {key: float(value) for key, value in data[table].items()})
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise PriceBookError(f"Invalid price book: {e!r}") from None
+        if self.default_currency not in self.currencies:
+            raise PriceBookError(f"Default currency {self.default_currency!r} has no rate")
+        self.digest = digest
+
+    @property
+    def key(self):
+        """Identifies this book in cache keys; changes with any edit to the file."""
+        return (self.version, self.digest)
+
+    def rate(self, currency=None):
+        """USD -> currency conversion rate (default currency if None)."""
+        currency = currency or self.default_currency
+        try:
+            return self.currencies[currency]
+        except KeyError:
+            raise PriceBookError(f"Unknown currency: {currency!r}") from None
+
+    def symbol(self, currency=None):
+        return self.symbols[currency or self.default_currency]
+
+
+def builtin_price_book_data():
+    """The tables in options.py in price book layout."""
+    return {
+        "version": "builtin",
+        "default_currency": "ILS",
+        "currencies": {"USD": {"rate": 1.0, "symbol": "$"}, "ILS": {"rate": opt.USD_TO_ILS_RATE, "symbol": "₪"}},
+        "base_per_carat": opt.BASE_DIAMOND_PRICE_PER_CARAT,
+        "diamond_type": dict(opt.DIAMOND_TYPE_MULTIPLIERS),
+        "shape": dict(opt.SHAPE_MULTIPLIERS),
+        "color": dict(opt.COLOR_MULTIPLIERS),
+        "clarity": dict(opt.CLARITY_MULTIPLIERS),
+        "certificate": dict(opt.CERTIFICATE_MULTIPLIERS),
+        "side_stone": dict(opt.SIDE_STONE_MULTIPLIER),
+        "metal": dict(opt.METAL_BASE_PRICE),
+        "setting": dict(opt.SETTING_BASE_PRICE),
+    }
+
+
+def _parse_csv(text):
+    data = {table: {} for table in FACTOR_TABLES + AMOUNT_TABLES}
+    data["currencies"] = {}
+    for row in csv.DictReader(io.StringIO(text)):
+        table, key, value = row["table"].strip(), row["key"].strip(), row["value"].strip()
+        if table == "meta":
+            data[key] = value
+        elif table == "base_per_carat":
+            data["base_per_carat"] = value
+        elif table == "currency":
+            data["currencies"].setdefault(key, {})["rate"] = value
+        elif table == "currency_symbol":
+            data["currencies"].setdefault(key, {})["symbol"] = value
+        elif table in data:
+            data[table][key] = value
+        else:
+            raise PriceBookError(f"Unknown price book table: {table!r}")
+    return data
+
+
+def parse_price_book(raw, path):
+    """Builds a PriceBook from the file bytes (format picked by extension)."""
+    import hashlib
+
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    try:
+        text = raw.decode("utf-8")
+        data = _parse_csv(text) if path.lower().endswith(".csv") else json.loads(text)
+    except (ValueError, KeyError, AttributeError, csv.Error) as e: # UnicodeDecodeError is a ValueError
+        raise PriceBookError(f"Cannot parse {path}: {e}") from None
+    return PriceBook(data, digest)
+
+
+def load_price_book(path):
+    with open(path, "rb") as f:
+        return parse_price_book(f.read(), path)
+
+
+class _PriceBookSource:
+    """Polls one file and keeps the current PriceBook."""
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._stat = None
+        self.book = None
+
+    def get(self):
+        if time.monotonic() >= self._next_check:
+            self._check()
+        return self.book
+
+    def _check(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_check and self.book is not None:
+                return # Another thread just checked
+            self._next_check = now + self.interval
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                if self.book is None:
+                    self.book = PriceBook(builtin_price_book_data(), "builtin")
+                return
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._stat:
+                return
+            try:
+                book = load_price_book(self.path)
+            except (OSError, PriceBookError) as e:
+                if self.book is None:
+                    raise
+                logger.warning("Keeping price book %s: %s", self.book.version, e)
+                return
+            self._stat = signature
+            if self.book is None or book.key != self.book.key:
+                if self.book is not None:
+                    logger.info("Price book %s -> %s", self.book.version, book.version)
+                self.book = book # Atomic swap
+
+
+_source = _PriceBookSource(PRICE_BOOK_PATH, POLL_INTERVAL_S)
+
+
+def current_price_book():
+    """The live PriceBook, reloaded when the file changes."""
+    return _source.get()
+
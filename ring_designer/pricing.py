@@ -0,0 +1,38 @@
+from .options import SETTINGS
+from .price_book import TABLE_DEFAULTS, current_price_book
+from .timing import span
+
+# --- Price Calculation Logic (Demo) ---
+def calculate_price(shape, carat, color, clarity, metal, setting, certificate, side_shapes_tuple, diamond_type,
+                    currency=None, book=None):
+    """Returns (total, diamond, setting) prices in `currency` (the price book's default if None)."""
+    book = book or current_price_book()
+    with span("price.diamond"):
+        base_price = book.base_per_carat * carat
+    
+        type_factor = book.diamond_type.get(diamond_type, 1.0)
+        shape_factor = book.shape.get(shape, 1.0)
+        color_factor = book.color.get(color, 1.0)
+        clarity_factor = book.clarity.get(clarity, 1.0)
+        cert_factor = book.certificate.get(certificate, 1.0)
+    
+        diamond_price_usd = base_price * type_factor * shape_factor * color_factor * clarity_factor * cert_factor
+
+    with span("price.setting"):
+        setting_base = book.setting.get(setting, TABLE_DEFAULTS["setting"])
+    
+        side_stone_factor = 1.0
+        if SETTINGS[setting] in ["three_stone", "seven_stone"]:
+            total_multiplier = sum(book.side_stone.get(s, 1.0) for s in side_shapes_tuple)
+            side_stone_factor = total_multiplier / len(side_shapes_tuple)
+
+        setting_price_usd = book.metal.get(metal, TABLE_DEFAULTS["metal"]) + (setting_base * side_stone_factor)
+
+    total_price_usd = diamond_price_usd + setting_price_usd
+    
+    rate = book.rate(currency)
+    total_price = total_price_usd * rate
+    diamond_price = diamond_price_usd * rate
+    setting_price = setting_price_usd * rate
+    
+    return total_price, diamond_price, setting_price
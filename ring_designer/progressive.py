@@ -0,0 +1,164 @@
+"""Two-pass progressive sketch rendering.
+
+preview_sketch() is a cheap low-resolution render shown while the user is
+still changing controls; final_sketch() is the anti-aliased render shown once
+input settles: the sketch is composed at `supersample` times the output size
+and downsampled with a Lanczos filter. Both passes have their own caches.
+
+Final renders are limited by a per-render time budget. The cost per pixel of
+recent final renders is tracked, and the supersampling factor is lowered
+whenever the estimate for the requested one would exceed the budget.
+
+The *_bytes variants return the same renders encoded once through
+encoding.cached_encode, which is what the app hands to st.image.
+
+Configuration (environment):
+    RING_PREVIEW_SIZE        preview edge in pixels (default 200)
+    RING_SKETCH_SIZE         final output edge in pixels (default 500)
+    RING_SKETCH_SUPERSAMPLE  supersampling factor for the final pass (default 2)
+    RING_RENDER_BUDGET_MS    time budget for one final render (default 150)
+    RING_FINAL_CACHE_BYTES   byte budget of the final-render cache (default 64 MiB)
+"""
+import os
+import threading
+import time
+
+from .atlas import atlas_or_render
+from .cache import LRUCache, cached_sketch, image_nbytes, sketch_key
+from .compositor import compose_indexed_sketch
+from .encoding import ENCODED_CACHE, SKETCH_FORMAT, SKETCH_LEVEL, cached_encode, encode_image, encoded_key
+from .sketch import apply_metal_palette, create_ring_sketch_indexed
+from .timing import span
+
+PREVIEW_SIZE = int(os.environ.get("RING_PREVIEW_SIZE", 200))
+OUTPUT_SIZE = int(os.environ.get("RING_SKETCH_SIZE", 500))
+SUPERSAMPLE = int(os.environ.get("RING_SKETCH_SUPERSAMPLE", 2))
+RENDER_BUDGET_S = int(os.environ.get("RING_RENDER_BUDGET_MS", 150)) / 1000
+
+FINAL_CACHE = LRUCache(
+    int(os.environ.get("RING_FINAL_CACHE_BYTES", 64 * 1024 * 1024)),
+    sizeof=image_nbytes,
+)
+
+_cost_lock = threading.Lock()
+_seconds_per_pixel = None # Moving average over recent final renders
+
+
+def _record_cost(seconds, pixels):
+    global _seconds_per_pixel
+    sample = seconds / pixels
+    with _cost_lock:
+        _seconds_per_pixel = sample if _seconds_per_pixel is None else 0.8 * _seconds_per_pixel + 0.2 * sample
+
+
+def affordable_supersample(size, supersample, budget_s=RENDER_BUDGET_S):
+    """Largest factor <= supersample whose estimated render time fits the budget."""
+    if _seconds_per_pixel is None:
+        return supersample # No measurements yet
+    while supersample > 1 and _seconds_per_pixel * (size * supersample) ** 2 > budget_s:
+        supersample -= 1
+    return supersample
+
+
+def atlas_sizes():
+    """Every canvas size the two passes render, i.e. what the atlas should hold."""
+    return sorted({PREVIEW_SIZE} | {OUTPUT_SIZE * factor for factor in range(1, SUPERSAMPLE + 1)})
+
+
+def preview_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple, size=PREVIEW_SIZE):
+    """Fast low-resolution pass (palette image, no anti-aliasing)."""
+    with span("sketch.preview"):
+        indexed = cached_sketch(atlas_or_render(create_ring_sketch_indexed),
+                                shape, carat, setting_key, side_shapes_tuple, size)
+        return apply_metal_palette(indexed, metal_key)
+
+
+def _final_key(shape, carat, metal_key, setting_key, side_shapes_tuple, size, supersample):
+    return (sketch_key(shape, carat, setting_key, side_shapes_tuple, size), metal_key, supersample)
+
+
+def cached_final_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple,
+                        size=OUTPUT_SIZE, supersample=SUPERSAMPLE):
+    """The final render if it is already cached, else None (never renders)."""
+    return FINAL_CACHE.get(_final_key(shape, carat, metal_key, setting_key, side_shapes_tuple, size, supersample))
+
+
+def _render_final(shape, carat, metal_key, setting_key, side_shapes_tuple, size, supersample, budget_s):
+    """Renders the final pass; returns (image, factor actually used)."""
+    from PIL import Image
+
+    factor = affordable_supersample(size, supersample, budget_s)
+    start = time.perf_counter()
+    with span("sketch.final"):
+        indexed = cached_sketch(atlas_or_render(compose_indexed_sketch),
+                                shape, carat, setting_key, side_shapes_tuple, size * factor)
+        image = apply_metal_palette(indexed, metal_key)
+        if factor > 1:
+            image = image.convert("RGB").resize((size, size), Image.LANCZOS)
+    # Factor-1 renders are sampled too, so one slow render cannot pin the
+    # estimate (and every later sketch) below the requested quality
+    _record_cost(time.perf_counter() - start, (size * factor) ** 2)
+    return image, factor
+
+
+def _final_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple, size, supersample, budget_s):
+    """final_sketch with one FINAL_CACHE lookup; returns (image, whether it is the cached full-quality render)."""
+    key = _final_key(shape, carat, metal_key, setting_key, side_shapes_tuple, size, supersample)
+    image = FINAL_CACHE.get(key)
+    if image is not None:
+        return image, True
+    image, factor = _render_final(shape, carat, metal_key, setting_key, side_shapes_tuple, size, supersample,
+                                  budget_s)
+    if factor != supersample:
+        return image, False
+    FINAL_CACHE.put(key, image)
+    return image, True
+
+
+def final_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple,
+                 size=OUTPUT_SIZE, supersample=SUPERSAMPLE, budget_s=RENDER_BUDGET_S):
+    """High-quality pass: supersampled, anti-aliased and cached.
+
+    A render degraded to a lower factor by the time budget is returned but
+    not cached, so the next request can render it at full quality.
+    """
+    return _final_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple, size, supersample, budget_s)[0]
+
+
+# --- Encoded variants ---
+# Each cache is looked up once per call, so the hit/miss counters count requests
+def preview_sketch_bytes(shape, carat, metal_key, setting_key, side_shapes_tuple,
+                         size=PREVIEW_SIZE, fmt=SKETCH_FORMAT, level=SKETCH_LEVEL):
+    key = ("preview", sketch_key(shape, carat, setting_key, side_shapes_tuple, size), metal_key)
+    return cached_encode(
+        key, lambda: preview_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple, size), fmt, level
+    )
+
+
+def cached_final_sketch_bytes(shape, carat, metal_key, setting_key, side_shapes_tuple,
+                              size=OUTPUT_SIZE, supersample=SUPERSAMPLE, fmt=SKETCH_FORMAT, level=SKETCH_LEVEL):
+    """Encoded final render if the render is already cached, else None (never renders)."""
+    key = encoded_key(("final", _final_key(shape, carat, metal_key, setting_key, side_shapes_tuple, size,
+                                           supersample)), fmt, level)
+    data = ENCODED_CACHE.get(key)
+    if data is None:
+        image = cached_final_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple, size, supersample)
+        if image is not None:
+            data = encode_image(image, fmt, level)
+            ENCODED_CACHE.put(key, data)
+    return data
+
+
+def final_sketch_bytes(shape, carat, metal_key, setting_key, side_shapes_tuple,
+                       size=OUTPUT_SIZE, supersample=SUPERSAMPLE, budget_s=RENDER_BUDGET_S,
+                       fmt=SKETCH_FORMAT, level=SKETCH_LEVEL):
+    key = encoded_key(("final", _final_key(shape, carat, metal_key, setting_key, side_shapes_tuple, size,
+                                           supersample)), fmt, level)
+    data = ENCODED_CACHE.get(key)
+    if data is None:
+        image, full_quality = _final_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple, size,
+                                            supersample, budget_s)
+        data = encode_image(image, fmt, level)
+        if full_quality: # Degraded renders are not cached as final
+            ENCODED_CACHE.put(key, data)
+    return data
@@ -0,0 +1,260 @@
+"""Saved designs and quotes in SQLite.
+
+A quote is a RingConfig plus the calculate_price breakdown at the time it
+was saved: currency, price book version, and a reference to the cached
+sketch (its sketch id and metal, i.e. the sketch cache/atlas key). Options
+are stored both as the packed config id, which restores the design, and as
+plain columns for filtering and export.
+
+Each process shares one connection per database between its threads (behind
+a lock), reopened after a fork. Exports read on their own connection.
+Connections run in WAL mode, so the app's reads never block on a
+writer. Bulk saves go through one executemany in one transaction. Listing
+uses indexes on total, shape, setting and created_at, with keyset pagination
+(before_id), so paging through thousands of quotes stays cheap. CSV export
+streams rows from a cursor in batches instead of loading the table.
+
+Run:  python -m ring_designer.quotes export [--output quotes.csv] [--shape Oval] [--since 2024-01-01]
+      python -m ring_designer.quotes stats
+
+Configuration (environment):
+    RING_QUOTES_DB   database path (default: quotes.sqlite3 in the repo root)
+"""
+import argparse
+import contextlib
+import csv
+import datetime
+import os
+import sqlite3
+import sys
+import threading
+
+from .config import RingConfig
+
+DEFAULT_QUOTES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "quotes.sqlite3")
+QUOTES_PATH = os.environ.get("RING_QUOTES_DB", DEFAULT_QUOTES_PATH)
+EXPORT_BATCH_ROWS = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    config_id INTEGER NOT NULL,
+    shape TEXT NOT NULL,
+    carat REAL NOT NULL,
+    diamond_type TEXT NOT NULL,
+    color TEXT NOT NULL,
+    clarity TEXT NOT NULL,
+    metal TEXT NOT NULL,
+    certificate TEXT NOT NULL,
+    setting TEXT NOT NULL,
+    side_stones TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    total REAL NOT NULL,
+    diamond REAL NOT NULL,
+    setting_price REAL NOT NULL,
+    price_book TEXT NOT NULL,
+    sketch_id INTEGER NOT NULL,
+    customer TEXT,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS quotes_total ON quotes (total);
+CREATE INDEX IF NOT EXISTS quotes_shape ON quotes (shape, total);
+CREATE INDEX IF NOT EXISTS quotes_setting ON quotes (setting, total);
+CREATE INDEX IF NOT EXISTS quotes_created_at ON quotes (created_at);
+"""
+
+COLUMNS = ("id", "created_at", "config_id", "shape", "carat", "diamond_type", "color", "clarity", "metal",
+           "certificate", "setting", "side_stones", "currency", "total", "diamond", "setting_price",
+           "price_book", "sketch_id", "customer", "note")
+_INSERT_COLUMNS = COLUMNS[1:]
+_INSERT = f"INSERT INTO quotes ({', '.join(_INSERT_COLUMNS)}) VALUES ({', '.join('?' * len(_INSERT_COLUMNS))})"
+
+
+def _utc_now():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def quote_row(config, prices, currency, price_book, customer=None, note=None, created_at=None):
+    """Insert parameters for one quote (prices is calculate_price's result)."""
+    total, diamond, setting_price = prices
+    return (
+        created_at or _utc_now(), config.id, config.shape, config.carat, config.diamond_type, config.color,
+        config.clarity, config.metal, config.certificate, config.setting, ",".join(config.side_stones),
+        currency, total, diamond, setting_price, price_book, config.sketch_id, customer, note,
+    )
+
+
+class QuoteStore:
+    """Quote table in one SQLite file; safe to share between threads."""
+
+    def __init__(self, path=QUOTES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL") # Durable enough with WAL, far fewer fsyncs
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL") # Persists in the database file
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """The process's shared connection, held exclusively for the block.
+
+        Streamlit runs each rerun on a new thread, so a per-thread connection
+        would be reopened on almost every interaction. One connection is
+        opened per process (again after a fork, with a fresh lock in case the
+        parent's was held) and the schema is set up once.
+        """
+        if self._pid != os.getpid():
+            self._lock, self._conn, self._pid = threading.Lock(), None, os.getpid()
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            yield self._conn
+
+    def save(self, config, prices, currency, price_book, customer=None, note=None):
+        """Saves one quote; returns its id."""
+        row = quote_row(config, prices, currency, price_book, customer, note)
+        with self.connection() as conn:
+            return conn.execute(_INSERT, row).lastrowid
+
+    def save_many(self, rows):
+        """Inserts many quote_row() tuples in one transaction; returns the count."""
+        rows = list(rows)
+        with self.connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(_INSERT, rows)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return len(rows)
+
+    def _where(self, filters):
+        clauses, params = [], []
+        for column in ("shape", "setting", "metal", "customer"):
+            values = filters.get(column)
+            if values:
+                values = [values] if isinstance(values, str) else list(values)
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params += values
+        for key, clause in (("min_total", "total >= ?"), ("max_total", "total <= ?"),
+                            ("since", "created_at >= ?"), ("until", "created_at < ?"),
+                            ("before_id", "id < ?")):
+            if filters.get(key) is not None:
+                clauses.append(clause)
+                params.append(filters[key])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def list(self, limit=100, **filters):
+        """Newest quotes first, as dicts.
+
+        Filters: shape/setting/metal/customer (a value or list of values),
+        min_total/max_total, since/until (ISO dates or timestamps, UTC) and
+        before_id for the next page (pass the last id of the previous page).
+        """
+        where, params = self._where(filters)
+        with self.connection() as conn:
+            cursor = conn.execute(f"SELECT * FROM quotes{where} ORDER BY id DESC LIMIT ?", params + [limit])
+            return [dict(row) for row in cursor]
+
+    def count(self, **filters):
+        where, params = self._where(filters)
+        with self.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM quotes{where}", params).fetchone()[0]
+
+    def get(self, quote_id):
+        with self.connection() as conn:
+            row = conn.execute("SELECT * FROM quotes WHERE id = ?", (quote_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def design(self, quote_id):
+        """The RingConfig of a saved quote, or None."""
+        with self.connection() as conn:
+            row = conn.execute("SELECT config_id FROM quotes WHERE id = ?", (quote_id,)).fetchone()
+        return RingConfig.from_id(row[0]) if row is not None else None
+
+    def export_csv(self, out, **filters):
+        """Streams matching quotes (oldest first) to a text file object; returns the row count.
+
+        Runs on its own short-lived connection so a long export does not hold
+        the shared one; in WAL mode it reads a snapshot without blocking saves.
+        """
+        where, params = self._where(filters)
+        with self.connection():
+            pass # Make sure the schema exists
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM quotes{where} ORDER BY id", params)
+            writer = csv.writer(out)
+            writer.writerow(COLUMNS)
+            count = 0
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+                if not rows:
+                    return count
+                writer.writerows(rows)
+                count += len(rows)
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def quote_store(path=None):
+    """The process-wide QuoteStore for a database path."""
+    path = path or QUOTES_PATH
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = QuoteStore(path)
+        return _stores[path]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or inspect saved ring quotes.")
+    parser.add_argument("--db", default=QUOTES_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Stream quotes to CSV.")
+    export.add_argument("--output", default="-")
+    export.add_argument("--shape", action="append")
+    export.add_argument("--setting", action="append")
+    export.add_argument("--since", help="UTC date, e.g. 2024-01-01")
+    export.add_argument("--until")
+    commands.add_parser("stats", help="Print the number of saved quotes.")
+    args = parser.parse_args(argv)
+
+    store = QuoteStore(args.db)
+    if args.command == "stats":
+        print(f"{args.db}: {store.count()} quotes")
+        return 0
+
+    filters = {"shape": args.shape, "setting": args.setting, "since": args.since, "until": args.until}
+    if args.output == "-":
+        count = store.export_csv(sys.stdout, **filters)
+    else:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            count = store.export_csv(f, **filters)
+    print(f"Exported {count} quotes", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""Standalone HTTP render/pricing service (standard library only).
+
+Run:  python -m ring_designer.server [--host 127.0.0.1] [--port 8080] [--workers 2]
+
+    GET /price?shape=Oval&carat=1.5&color=F&clarity=VS1&metal=Rose Gold (14K)
+              &certificate=GIA&setting=Three-Stone&side_stones=Pear&diamond_type=Natural[&currency=USD]
+    GET /sketch?shape=Oval&carat=1.5&metal=Rose Gold (14K)&setting=Three-Stone&side_stones=Pear
+               [&format=png8|png|webp|svg]
+    GET /price?id=4mq80     GET /sketch?id=4mq80     (RingConfig.token share ids)
+    GET /budget?budget=25000&top=20&order=carat,color,clarity[&shape=Round,Oval&metal=...][&currency=USD]
+
+Options use the same labels as the Streamlit sidebar and default to its
+initial values, or come from a configuration id (see ring_designer.config);
+side_stones is a comma separated list (one shape for
+Three-Stone, three for Seven-Stone). /budget returns the best configurations
+under a price cap (see ring_designer.budget); any option can be restricted
+with a comma separated list of labels, side_stones combinations are given one
+per parameter, and min_carat/max_carat bound the carat. Prices are in the
+price book's default currency unless currency is given.
+
+Responses carry a strong ETag derived from the normalized configuration (and,
+for prices, the price book version), so If-None-Match requests get a 304, and
+encoded bytes are kept in an in-memory LRU cache. Price responses must be
+revalidated since the price book can change under them. Drawing runs on a process
+pool so it never blocks the event loop; SVG sketches (format=svg) are only
+string formatting and are built inline. Raster formats are those of
+ring_designer.encoding, defaulting to RING_SKETCH_FORMAT.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import math
+import os
+from urllib.parse import parse_qs, urlsplit
+
+from .cache import LRUCache, cached_sketch
+from .config import RingConfig
+from .options import (
+    CERTIFICATE_TYPES, CLARITY_GRADES, COLOR_GRADES, DIAMOND_SHAPES,
+    DIAMOND_TYPES, METALS, SETTINGS, SIDE_STONE_SHAPES,
+)
+from .encoding import FORMATS, SKETCH_FORMAT, encode_image, mime_type
+from .price_book import current_price_book
+from .pricing import calculate_price
+from .svg import SVG_CONTENT_TYPE, create_ring_sketch_svg
+
+DEFAULT_RESPONSE_CACHE_BYTES = 32 * 1024 * 1024
+RESPONSE_CACHE_BYTES_ENV = "RING_RESPONSE_CACHE_BYTES"
+MAX_HEADER_BYTES = 16 * 1024
+
+logger = logging.getLogger(__name__)
+
+# Initial values of the sidebar widgets
+DEFAULTS = {
+    "shape": DIAMOND_SHAPES[0],
+    "carat": 1.0,
+    "diamond_type": DIAMOND_TYPES[0],
+    "color": "G",
+    "clarity": "VS1",
+    "metal": list(METALS)[0],
+    "certificate": CERTIFICATE_TYPES[0],
+    "setting": list(SETTINGS)[0],
+    "side_stones": None,
+}
+
+_STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                500: "Internal Server Error"}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _choice(query, field, options):
+    value = query.get(field, [DEFAULTS[field]])[0]
+    if value not in options:
+        raise BadRequest(f"Invalid {field}: {value!r}")
+    return value
+
+
+def normalize_config(query):
+    """Validates query parameters (or an id) into a RingConfig."""
+    if "id" in query:
+        try:
+            return RingConfig.from_token(query["id"][0])
+        except ValueError as e:
+            raise BadRequest(str(e)) from None
+    config = {
+        "shape": _choice(query, "shape", DIAMOND_SHAPES),
+        "diamond_type": _choice(query, "diamond_type", DIAMOND_TYPES),
+        "color": _choice(query, "color", COLOR_GRADES),
+        "clarity": _choice(query, "clarity", CLARITY_GRADES),
+        "metal": _choice(query, "metal", METALS),
+        "certificate": _choice(query, "certificate", CERTIFICATE_TYPES),
+        "setting": _choice(query, "setting", SETTINGS),
+    }
+    try:
+        carat = round(float(query.get("carat", [DEFAULTS["carat"]])[0]), 1)
+    except ValueError:
+        raise BadRequest("Invalid carat") from None
+    if not 0.5 <= carat <= 3.0:
+        raise BadRequest("carat must be between 0.5 and 3.0")
+    config["carat"] = carat
+
+    setting_key = SETTINGS[config["setting"]]
+    expected = {"three_stone": 1, "seven_stone": 3}.get(setting_key)
+    if expected is None:
+        sides = ("Round",) # Same default tuple as the sidebar
+    else:
+        raw = query.get("side_stones", [",".join(["Round"] * expected)])[0]
+        sides = tuple(s.strip() for s in raw.split(","))
+        if len(sides) != expected or any(s not in SIDE_STONE_SHAPES for s in sides):
+            raise BadRequest(f"side_stones must be {expected} of {', '.join(SIDE_STONE_SHAPES)}")
+    config["side_stones"] = sides
+    return RingConfig(**config)
+
+
+def _currency(query, book):
+    currency = query.get("currency", [book.default_currency])[0]
+    if currency not in book.currencies:
+        raise BadRequest(f"Invalid currency: {currency!r} (expected one of {', '.join(book.currencies)})")
+    return currency
+
+
+def config_etag(kind, config):
+    payload = json.dumps([kind, config], sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def render_sketch_bytes(shape, carat, metal_key, setting_key, side_shapes_tuple, fmt=SKETCH_FORMAT):
+    """Worker-side render: returns the encoded image for one configuration."""
+    from .compositor import compose_indexed_sketch
+    from .sketch import apply_metal_palette
+
+    indexed = cached_sketch(compose_indexed_sketch, shape, carat, setting_key, side_shapes_tuple)
+    return encode_image(apply_metal_palette(indexed, metal_key), fmt)
+
+
+class RingService:
+    def __init__(self, workers=None, cache_bytes=None):
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        self.cache = LRUCache(
+            cache_bytes or int(os.environ.get(RESPONSE_CACHE_BYTES_ENV, DEFAULT_RESPONSE_CACHE_BYTES)),
+            sizeof=lambda entry: len(entry[1]),
+        )
+        # Renders in flight, so concurrent requests for one sketch share a single job
+        self._pending = {}
+
+    async def price(self, query):
+        config = normalize_config(query)
+        book = current_price_book()
+        currency = _currency(query, book)
+        # A new price book version changes every key, so stale prices are never served
+        etag = config_etag("price", [config.id, currency, book.key])
+        cached = self.cache.get(etag)
+        if cached is None:
+            total, diamond, setting = calculate_price(*config.price_args(), currency, book)
+            body = json.dumps({
+                "id": config.token,
+                "config": config.as_dict(),
+                "currency": currency,
+                "price_book": book.version,
+                "total": total,
+                "diamond": diamond,
+                "setting": setting,
+            }).encode("utf-8")
+            cached = ("application/json", body)
+            self.cache.put(etag, cached)
+        return etag, cached
+
+    async def sketch(self, query):
+        config = normalize_config(query)
+        image_format = query.get("format", [SKETCH_FORMAT])[0]
+        if image_format != "svg" and image_format not in FORMATS:
+            raise BadRequest(f"Invalid format: {image_format!r}")
+        # Price-only options do not change the picture, so they are not part of the key
+        etag = config_etag(f"sketch.{image_format}", [config.sketch_id, config.metal_key])
+        cached = self.cache.get(etag)
+        if cached is None and image_format == "svg":
+            body = create_ring_sketch_svg(*config.sketch_args())
+            cached = (SVG_CONTENT_TYPE, body.encode("utf-8"))
+            self.cache.put(etag, cached)
+        if cached is None:
+            future = self._pending.get(etag)
+            if future is None:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(self.pool, render_sketch_bytes, *config.sketch_args(), image_format)
+                self._pending[etag] = future
+                future.add_done_callback(lambda _: self._pending.pop(etag, None))
+            cached = (mime_type(image_format), await asyncio.shield(future))
+            self.cache.put(etag, cached)
+        return etag, cached
+
+    async def budget(self, query):
+        from .budget import DEFAULT_ORDER, FILTER_FIELDS, search_budget
+
+        try:
+            budget = float(query["budget"][0])
+            top_n = int(query.get("top", ["20"])[0])
+            filters = {
+                field: float(query[field][0]) for field in ("min_carat", "max_carat") if field in query
+            }
+        except (KeyError, ValueError):
+            raise BadRequest("budget is required; budget, top and min/max_carat must be numbers") from None
+        if not all(map(math.isfinite, [budget, *filters.values()])):
+            raise BadRequest("budget and min/max_carat must be finite")
+        if budget <= 0 or not 1 <= top_n <= 100:
+            raise BadRequest("budget must be positive and top between 1 and 100")
+        order = tuple(query.get("order", [",".join(DEFAULT_ORDER)])[0].split(","))
+        for field in FILTER_FIELDS:
+            if field == "side_shapes":
+                if "side_stones" in query:
+                    filters[field] = [tuple(s.strip() for s in value.split(",")) for value in query["side_stones"]]
+            elif field in query:
+                filters[field] = [v.strip() for value in query[field] for v in value.split(",")]
+
+        book = current_price_book()
+        currency = _currency(query, book)
+        etag = config_etag("budget", [budget, top_n, order, sorted(filters.items()), currency, book.key])
+        cached = self.cache.get(etag)
+        if cached is None:
+            try:
+                results = search_budget(budget, top_n, order, filters, currency)
+            except ValueError as e:
+                raise BadRequest(str(e)) from None
+            body = json.dumps({"currency": currency, "price_book": book.version, "budget": budget,
+                               "order": order, "results": results})
+            cached = ("application/json", body.encode("utf-8"))
+            self.cache.put(etag, cached)
+        return etag, cached
+
+    async def handle(self, method, target, headers):
+        """Returns (status, headers, body) for one request."""
+        if method not in ("GET", "HEAD"):
+            return 405, {"Allow": "GET, HEAD"}, b""
+        url = urlsplit(target)
+        routes = {"/price": self.price, "/sketch": self.sketch, "/budget": self.budget}
+        if url.path == "/stats":
+            body = json.dumps(self.cache.stats()).encode("utf-8")
+            return 200, {"Content-Type": "application/json"}, body
+        if url.path not in routes:
+            return 404, {"Content-Type": "application/json"}, b'{"error": "not found"}'
+        try:
+            # Blank values are kept so that e.g. "id=" is rejected instead of meaning "no id"
+            etag, (content_type, body) = await routes[url.path](parse_qs(url.query, keep_blank_values=True))
+        except BadRequest as e:
+            return 400, {"Content-Type": "application/json"}, json.dumps({"error": str(e)}).encode("utf-8")
+        except Exception:
+            # A broken price book or a failed render must not drop the connection
+            logger.exception("Error handling %s", target)
+            return 500, {"Content-Type": "application/json"}, b'{"error": "internal error"}'
+
+        cache_control = "public, max-age=86400" if url.path == "/sketch" else "no-cache"
+        response_headers = {"ETag": etag, "Cache-Control": cache_control}
+        if_none_match = headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return 304, response_headers, b""
+        response_headers["Content-Type"] = content_type
+        return 200, response_headers, body
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                status, response_headers, body = await self.handle(method, target, headers)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                response_headers["Content-Length"] = str(len(body))
+                response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+                head_lines = [f"HTTP/1.1 {status} {_STATUS_TEXT[status]}"]
+                head_lines += [f"{name}: {value}" for name, value in response_headers.items()]
+                writer.write(("\r\n".join(head_lines) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def serve(host, port, workers=None):
+    service = RingService(workers=workers)
+    server = await asyncio.start_server(service.serve_connection, host, port, limit=MAX_HEADER_BYTES)
+    print(f"Serving ring sketches on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve ring prices and sketches over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count).")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import math
+from functools import lru_cache
+
+from .geometry import (
+    HALO_PADDING, SOLITAIRE_PRONGS, TEMPLATES, draw_primitives, main_stone_extents,
+    place_prongs, place_template, side_stone_extents,
+)
+from .options import DIAMOND_FILL, DIAMOND_OUTLINE, METAL_COLORS_RGB
+from .timing import span
+
+# --- Helper function for drawing prongs ---
+def draw_prongs(draw, center_x, center_y, radius_x, radius_y, color, base_size_px):
+    """Draws 4 small prongs outside a stone, respecting x and y radius."""
+    draw_primitives(draw, place_prongs("four", center_x, center_y, radius_x, radius_y, base_size_px), fill=color)
+
+# --- Helper functions for drawing side stones ---
+def draw_side_stone(draw, shape, center_x, center_y, radius, color, outline, orientation='up'):
+    """Draws one side stone; returns its (horizontal, vertical) radius for the prongs."""
+    return draw_stones(draw, [(shape, center_x, center_y, radius, orientation)], color, outline)[0]
+
+
+def draw_stones(draw, stones, color, outline):
+    """Draws many (shape, center_x, center_y, radius, orientation) side stones in one pass.
+
+    Returns the (horizontal, vertical) radius of each stone, in order.
+    """
+    extents = []
+    for shape, center_x, center_y, radius, orientation in stones:
+        if radius <= 0:
+            extents.append((0, 0))
+            continue
+        h_radius, v_radius = side_stone_extents(shape, radius, orientation)
+        extents.append((h_radius, v_radius))
+        name = ("side", shape, orientation)
+        if name in TEMPLATES:
+            draw_primitives(draw, place_template(name, center_x, center_y, h_radius, v_radius),
+                            outline=outline, fill=color)
+    return extents
+
+
+# --- Drawing at other resolutions ---
+# Pixels drawn around a strip or region and cropped off again, so its edges
+# never depend on how Pillow clips shapes at the canvas border
+REGION_PAD = 16
+
+
+class TransformedDraw:
+    """Wraps an ImageDraw so sketch coordinates (IMG_SIZE space) land scaled and shifted.
+
+    All stages draw in the 500px design space; this maps them to any output
+    size, or to one strip of a larger image via offset (in output pixels).
+
+    Points are snapped to whole pixels the way Pillow would snap them on a
+    full canvas. Pillow truncates float coordinates toward zero, so a shape
+    that starts above a strip (negative coordinates) would otherwise land a
+    pixel off; snapped, an integer offset moves every pixel exactly.
+    """
+
+    def __init__(self, draw, scale=1.0, offset=(0, 0)):
+        self.draw = draw
+        self.scale = scale
+        self.offset = offset
+
+    def _points(self, xy, snap=math.floor):
+        scale, (offset_x, offset_y) = self.scale, self.offset
+        if xy and isinstance(xy[0], (tuple, list)):
+            return [(snap(x * scale) - offset_x, snap(y * scale) - offset_y) for x, y in xy]
+        return [(snap(xy[i] * scale) - offset_x, snap(xy[i + 1] * scale) - offset_y) for i in range(0, len(xy), 2)]
+
+    def _width(self, width):
+        return max(1, round(width * self.scale)) if width else width
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        self.draw.ellipse(self._points(xy), fill=fill, outline=outline, width=self._width(width))
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        self.draw.rectangle(self._points(xy), fill=fill, outline=outline, width=self._width(width))
+
+    def rounded_rectangle(self, xy, radius=0, fill=None, outline=None, width=1):
+        # Pillow rounds this box rather than truncating it, and a fractional
+        # radius would put its corner arcs back on fractional coordinates
+        self.draw.rounded_rectangle(self._points(xy, round), radius=round(radius * self.scale), fill=fill,
+                                    outline=outline, width=self._width(width))
+
+    def polygon(self, xy, fill=None, outline=None, width=1):
+        self.draw.polygon(self._points(xy), fill=fill, outline=outline, width=self._width(width))
+
+    def line(self, xy, fill=None, width=0):
+        # Width 0 is Pillow's one-pixel line; keep its weight relative to the sketch
+        self.draw.line(self._points(xy), fill=fill, width=self._width(width or 1))
+
+
+def sketch_draw(image, size=None):
+    """ImageDraw for a canvas of `size` pixels that accepts IMG_SIZE coordinates."""
+    from PIL import ImageDraw
+
+    draw = ImageDraw.Draw(image)
+    if size is None or size == IMG_SIZE:
+        return draw
+    return TransformedDraw(draw, size / IMG_SIZE)
+
+
+# --- Image SKETCHING Logic (Top-Down "On-Hand" View) ---
+# The sketch is drawn in four stages. Each stage is its own function so the
+# compositor can render and cache them as separate layers; create_ring_sketch
+# simply runs all of them on one canvas. Stone, halo and prong outlines come
+# from the normalized templates in geometry.py.
+IMG_SIZE = 500
+
+
+@lru_cache(maxsize=1024)
+def compute_sketch_geometry(shape, carat, setting_key):
+    """Step A: pixel dimensions shared by every drawing stage (read-only)."""
+    CENTER = (IMG_SIZE // 2, IMG_SIZE // 2)
+
+    base_size_px = int(carat * 35) 
+    half_size = max(1, base_size_px // 2)
+
+    half_width, half_height = main_stone_extents(shape, half_size)
+    main_stone_extents_px = {'half_width': half_width, 'half_height': half_height}
+
+    side_stone_radius = 0
+    if "halo" in setting_key:
+        # Adjust total setting width to accommodate halo around different shapes
+        total_setting_width = (half_width + HALO_PADDING) * 2
+    elif "three_stone" in setting_key:
+        side_stone_radius = max(4, int(base_size_px / 4.0)) 
+        # Total width is main stone + 2 side stones
+        total_setting_width = (half_width * 2) + (side_stone_radius * 4) # Approximation
+    elif "seven_stone" in setting_key:
+        side_stone_radius = max(3, int(base_size_px / 6.0))
+        # Total width is main stone + 2 clusters (each approx 3 stones wide)
+        total_setting_width = (half_width * 2) + (side_stone_radius * 8) # Approximation
+    else: # Solitaire
+        total_setting_width = half_width * 2
+
+    return {
+        'img_size': IMG_SIZE,
+        'center': CENTER,
+        'base_size_px': base_size_px,
+        'half_size': half_size,
+        'main_stone_extents': main_stone_extents_px,
+        'side_stone_radius': side_stone_radius,
+        'total_setting_width': total_setting_width,
+    }
+
+
+def band_half_width(geometry, shape, setting_key):
+    """Half width of the gap the band shoulders leave for the setting."""
+    # Calculate the effective width of the entire setting
+    effective_setting_half_width = geometry['total_setting_width'] // 2
+
+    # *** FIX ***: For Solitaire, the band connects to the stone's *actual* width.
+    # For other settings, it connects to the *total setting* width (which includes halo/side stones).
+    if setting_key == "solitaire":
+        effective_setting_half_width = geometry['main_stone_extents']['half_width']
+    return effective_setting_half_width
+
+
+def draw_band(draw, geometry, shape, setting_key, band_color):
+    IMG_SIZE = geometry['img_size']
+    CENTER = geometry['center']
+
+    # --- Step B: Draw the Ring Band "Shoulders" (FIRST) ---
+    # === THIS BLOCK IS CORRECTED ===
+    band_thickness = 14
+    band_y_start = CENTER[1] - (band_thickness // 2)
+    band_y_end = CENTER[1] + (band_thickness // 2)
+
+    effective_setting_half_width = band_half_width(geometry, shape, setting_key)
+
+    # Draw the main parts of the band, connecting to the effective width
+    draw.rectangle(
+        [(0, band_y_start), (CENTER[0] - effective_setting_half_width, band_y_end)],
+        fill=band_color
+    )
+    draw.rectangle(
+        [(CENTER[0] + effective_setting_half_width, band_y_start), (IMG_SIZE, band_y_end)],
+        fill=band_color
+    )
+
+    # For settings that aren't solitaire, draw a connecting piece (basket/base)
+    if setting_key in ["halo", "three_stone", "seven_stone"]:
+        draw.rectangle(
+            [(CENTER[0] - effective_setting_half_width, band_y_start),
+             (CENTER[0] + effective_setting_half_width, band_y_end)],
+            fill=band_color
+        )
+    # === END OF CORRECTED BLOCK B ===
+
+
+def draw_main_stone(draw, geometry, shape, outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL):
+    # --- Step C: Draw Main Diamond (SECOND) ---
+    center_x, center_y = geometry['center']
+    extents = geometry['main_stone_extents']
+    name = ("stone", shape) if ("stone", shape) in TEMPLATES else ("stone", "Asscher") # Square fallback
+    draw_primitives(draw, place_template(name, center_x, center_y, extents['half_width'], extents['half_height']),
+                    outline=outline, fill=fill)
+
+
+def draw_setting(draw, geometry, shape, setting_key, side_shapes_tuple, band_color,
+                 outline=DIAMOND_OUTLINE, fill=DIAMOND_FILL):
+    # --- Step D: Draw the Setting (Prongs, Halo, Side Stones) (LAST) ---
+    center_x, center_y = geometry['center']
+    base_size_px = geometry['base_size_px']
+    main_radius_x = geometry['main_stone_extents']['half_width']
+    main_radius_y = geometry['main_stone_extents']['half_height']
+
+    if "solitaire" in setting_key:
+        layout = SOLITAIRE_PRONGS.get(shape, "four")
+        draw_primitives(draw, place_prongs(layout, center_x, center_y, main_radius_x, main_radius_y, base_size_px),
+                        fill=band_color)
+
+    elif "halo" in setting_key:
+        # No prongs for halo, just the halo frame
+        name = ("halo", shape)
+        if name in TEMPLATES:
+            halo = place_template(name, center_x, center_y, main_radius_x + HALO_PADDING, main_radius_y + HALO_PADDING)
+            draw_primitives(draw, halo, outline=band_color, width=6)
+
+    elif setting_key in ("three_stone", "seven_stone"):
+        side_stone_radius = geometry['side_stone_radius']
+        h_offset_1 = main_radius_x + side_stone_radius
+
+        if setting_key == "three_stone":
+            side_stone_shape = side_shapes_tuple[0]
+            stones = [
+                (side_stone_shape, center_x - h_offset_1, center_y, side_stone_radius, 'right'),
+                (side_stone_shape, center_x + h_offset_1, center_y, side_stone_radius, 'left'),
+            ]
+        else:
+            shape_1, shape_2, shape_3 = side_shapes_tuple
+            v_offset_1 = side_stone_radius + 1 # 1px buffer between the stacked stones
+            h_offset_2 = h_offset_1 + (side_stone_radius * 2)
+            stones = [
+                # Left Cluster
+                (shape_1, center_x - h_offset_1, center_y - v_offset_1, side_stone_radius, 'right'),
+                (shape_2, center_x - h_offset_1, center_y + v_offset_1, side_stone_radius, 'right'),
+                (shape_3, center_x - h_offset_2, center_y, side_stone_radius, 'left'),
+                # Right Cluster
+                (shape_1, center_x + h_offset_1, center_y - v_offset_1, side_stone_radius, 'left'),
+                (shape_2, center_x + h_offset_1, center_y + v_offset_1, side_stone_radius, 'left'),
+                (shape_3, center_x + h_offset_2, center_y, side_stone_radius, 'right'),
+            ]
+
+        # Each stone, then its prongs: the next stone may cover part of them
+        for stone in stones:
+            (radius_x, radius_y), = draw_stones(draw, [stone], fill, outline)
+            draw_prongs(draw, stone[1], stone[2], radius_x, radius_y, band_color, base_size_px=base_size_px)
+        draw_prongs(draw, center_x, center_y, main_radius_x, main_radius_y, band_color, base_size_px=base_size_px)
+
+
+def create_ring_sketch(shape, carat, metal_key, setting_key, side_shapes_tuple, backend="raster"):
+    """Draws the sketch as a PIL image, or as an SVG string with backend="svg"."""
+    if backend == "svg":
+        from .svg import create_ring_sketch_svg
+
+        return create_ring_sketch_svg(shape, carat, metal_key, setting_key, side_shapes_tuple)
+    if backend != "raster":
+        raise ValueError(f"Unknown sketch backend: {backend!r}")
+
+    # Pillow is only needed once something is actually drawn, so importing
+    # the package for pricing alone stays cheap.
+    from PIL import Image, ImageDraw
+
+    with span("sketch.geometry"):
+        geometry = compute_sketch_geometry(shape, carat, setting_key)
+    canvas = Image.new("RGB", (IMG_SIZE, IMG_SIZE), "white")
+    draw = ImageDraw.Draw(canvas)
+    
+    band_color = METAL_COLORS_RGB.get(metal_key, "grey")
+
+    with span("sketch.band"):
+        draw_band(draw, geometry, shape, setting_key, band_color)
+    with span("sketch.main_stone"):
+        draw_main_stone(draw, geometry, shape)
+    with span("sketch.setting"):
+        draw_setting(draw, geometry, shape, setting_key, side_shapes_tuple, band_color)
+
+    return canvas
+
+
+# --- Palette ("P" mode) rendering ---
+# Metal only changes the band and prong colour, so the indexed sketch draws
+# it as a palette slot. Switching metal is then a palette swap on a cached
+# one-byte-per-pixel image instead of a redraw of a three-byte RGB canvas.
+PALETTE_BACKGROUND = 0
+PALETTE_METAL = 1
+PALETTE_OUTLINE = 2
+PALETTE_FILL = 3
+METAL_FALLBACK_RGB = (128, 128, 128) # "grey"
+
+
+@lru_cache(maxsize=None)
+def metal_palette(metal_key):
+    """Flat RGB palette for the indexed sketch in the given metal."""
+    return [
+        255, 255, 255, # Background
+        *METAL_COLORS_RGB.get(metal_key, METAL_FALLBACK_RGB),
+        *DIAMOND_OUTLINE,
+        *DIAMOND_FILL,
+    ]
+
+
+def apply_metal_palette(indexed_image, metal_key):
+    """Returns a copy of an indexed sketch coloured for the given metal."""
+    with span("sketch.recolor"):
+        image = indexed_image.copy()
+        image.putpalette(metal_palette(metal_key))
+    return image
+
+
+def create_ring_sketch_indexed(shape, carat, setting_key, side_shapes_tuple, size=IMG_SIZE):
+    """Metal-independent "P" mode sketch; colour it with apply_metal_palette."""
+    from PIL import Image
+
+    with span("sketch.geometry"):
+        geometry = compute_sketch_geometry(shape, carat, setting_key)
+    canvas = Image.new("P", (size, size), PALETTE_BACKGROUND)
+    canvas.putpalette(metal_palette(None))
+    draw_indexed_sketch(sketch_draw(canvas, size), geometry, shape, setting_key, side_shapes_tuple)
+    return canvas
+
+
+def draw_indexed_sketch(draw, geometry, shape, setting_key, side_shapes_tuple):
+    """Runs every stage with palette colours on any (possibly transformed) draw."""
+    with span("sketch.band"):
+        draw_band(draw, geometry, shape, setting_key, PALETTE_METAL)
+    with span("sketch.main_stone"):
+        draw_main_stone(draw, geometry, shape, outline=PALETTE_OUTLINE, fill=PALETTE_FILL)
+    with span("sketch.setting"):
+        draw_setting(draw, geometry, shape, setting_key, side_shapes_tuple, PALETTE_METAL,
+                     outline=PALETTE_OUTLINE, fill=PALETTE_FILL)
@@ -0,0 +1,116 @@
+"""SVG backend for ring sketches.
+
+SvgDraw implements the subset of the ImageDraw interface the drawing stages
+use (ellipse, rectangle, rounded_rectangle, polygon, line), so the same
+geometry, templates and stage functions emit vector elements instead of
+pixels. The document uses the 500px design space as its viewBox and has no
+fixed size, so the browser scales it to any width.
+
+Pillow boxes are inclusive of their last pixel and outlines are drawn inside
+the shape, while SVG strokes are centred on the path; the element writers
+below compensate for both (boxes are inset, wide polygon strokes clipped to
+the polygon) so the two backends line up when rasterized.
+"""
+from .options import METAL_COLORS_RGB
+from .sketch import IMG_SIZE, compute_sketch_geometry, draw_band, draw_main_stone, draw_setting
+from .timing import span
+
+SVG_CONTENT_TYPE = "image/svg+xml"
+SVG_FALLBACK_COLOR = "grey"
+
+
+def _num(value):
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _color(color):
+    if color is None:
+        return "none"
+    if isinstance(color, str):
+        return color
+    return "#%02x%02x%02x" % tuple(color[:3])
+
+
+def _points(xy):
+    if xy and isinstance(xy[0], (tuple, list)):
+        return [(x, y) for x, y in xy]
+    return [(xy[i], xy[i + 1]) for i in range(0, len(xy), 2)]
+
+
+class SvgDraw:
+    """Collects sketch primitives as SVG elements (ImageDraw-compatible calls)."""
+
+    def __init__(self):
+        self.elements = []
+
+    def _paint(self, fill, outline, width):
+        attrs = f'fill="{_color(fill)}"'
+        if outline is not None and width:
+            attrs += f' stroke="{_color(outline)}" stroke-width="{_num(width)}"'
+        return attrs
+
+    def _box(self, xy, outline, width):
+        (x0, y0), (x1, y1) = _points(xy)
+        # Inclusive pixel box, shrunk by half the stroke so it stays inside like Pillow's
+        inset = width / 2 if outline is not None and width else 0
+        return x0 + inset, y0 + inset, x1 + 1 - inset, y1 + 1 - inset
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = self._box(xy, outline, width)
+        self.elements.append(
+            f'<ellipse cx="{_num((x0 + x1) / 2)}" cy="{_num((y0 + y1) / 2)}" '
+            f'rx="{_num((x1 - x0) / 2)}" ry="{_num((y1 - y0) / 2)}" {self._paint(fill, outline, width)}/>'
+        )
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        self.rounded_rectangle(xy, 0, fill=fill, outline=outline, width=width)
+
+    def rounded_rectangle(self, xy, radius=0, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = self._box(xy, outline, width)
+        corner = f' rx="{_num(radius)}"' if radius else ""
+        self.elements.append(
+            f'<rect x="{_num(x0)}" y="{_num(y0)}" width="{_num(x1 - x0)}" height="{_num(y1 - y0)}"{corner} '
+            f'{self._paint(fill, outline, width)}/>'
+        )
+
+    def polygon(self, xy, fill=None, outline=None, width=1):
+        # Vertices sit on pixel centres in Pillow
+        points = " ".join(f"{_num(x + 0.5)},{_num(y + 0.5)}" for x, y in _points(xy))
+        if outline is None or width <= 1:
+            self.elements.append(f'<polygon points="{points}" {self._paint(fill, outline, width)}/>')
+            return
+        # Pillow draws wide polygon outlines inside the shape: stroke twice as
+        # wide and clip the outer half away
+        clip_id = f"clip{len(self.elements)}"
+        self.elements.append(
+            f'<clipPath id="{clip_id}"><polygon points="{points}"/></clipPath>'
+            f'<polygon points="{points}" {self._paint(fill, outline, width * 2)} clip-path="url(#{clip_id})"/>'
+        )
+
+    def line(self, xy, fill=None, width=0):
+        points = " ".join(f"{_num(x + 0.5)},{_num(y + 0.5)}" for x, y in _points(xy))
+        self.elements.append(
+            f'<polyline points="{points}" fill="none" stroke="{_color(fill)}" stroke-width="{_num(width or 1)}"/>'
+        )
+
+    def document(self, size=IMG_SIZE, background="white"):
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" stroke-linejoin="round">'
+            f'<rect width="100%" height="100%" fill="{_color(background)}"/>'
+            + "".join(self.elements)
+            + "</svg>"
+        )
+
+
+def create_ring_sketch_svg(shape, carat, metal_key, setting_key, side_shapes_tuple):
+    """Same drawing as create_ring_sketch, returned as an SVG document string."""
+    with span("sketch.geometry"):
+        geometry = compute_sketch_geometry(shape, carat, setting_key)
+    draw = SvgDraw()
+    band_color = METAL_COLORS_RGB.get(metal_key, SVG_FALLBACK_COLOR)
+
+    with span("sketch.svg"):
+        draw_band(draw, geometry, shape, setting_key, band_color)
+        draw_main_stone(draw, geometry, shape)
+        draw_setting(draw, geometry, shape, setting_key, side_shapes_tuple, band_color)
+        return draw.document(geometry["img_size"])
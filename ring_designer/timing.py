@@ -0,0 +1,131 @@
+"""Lightweight timing spans with pluggable collectors.
+
+    with span("sketch.band"):
+        draw_band(...)
+
+Every finished span is handed to the registered collectors (see
+add_collector). HISTOGRAMS is registered by default and keeps rolling
+p50/p95/p99 per span name; LoggingCollector writes spans to the standard
+logging module. capture() additionally records the spans of the current
+thread, which the app uses for a per-session breakdown since Streamlit runs
+each session's script in its own thread.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+_collectors = []
+_local = threading.local()
+
+
+class span:
+    """Context manager timing one stage."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def record(name, seconds):
+    for collector in _collectors:
+        collector.record(name, seconds)
+    captured = getattr(_local, "captured", None)
+    if captured is not None:
+        captured[name] = captured.get(name, 0.0) + seconds
+
+
+class capture:
+    """Collects the spans recorded by this thread into a {name: seconds} dict.
+
+    Pass an existing dict to keep adding to an earlier capture.
+    """
+
+    def __init__(self, spans=None):
+        self.spans = {} if spans is None else spans
+
+    def __enter__(self):
+        self.previous = getattr(_local, "captured", None)
+        _local.captured = self.spans
+        return self.spans
+
+    def __exit__(self, *exc_info):
+        _local.captured = self.previous
+        if self.previous is not None:
+            for name, seconds in self.spans.items():
+                self.previous[name] = self.previous.get(name, 0.0) + seconds
+        return False
+
+
+def add_collector(collector):
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def remove_collector(collector):
+    if collector in _collectors:
+        _collectors.remove(collector)
+
+
+class HistogramCollector:
+    """Rolling window of the most recent samples per span name."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def snapshot(self):
+        """{name: {"count", "p50_ms", "p95_ms", "p99_ms"}} over the current window."""
+        with self._lock:
+            windows = {name: sorted(samples) for name, samples in self._samples.items()}
+        return {
+            name: {
+                "count": len(samples),
+                "p50_ms": _percentile(samples, 50) * 1000,
+                "p95_ms": _percentile(samples, 95) * 1000,
+                "p99_ms": _percentile(samples, 99) * 1000,
+            }
+            for name, samples in sorted(windows.items()) if samples
+        }
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+class LoggingCollector:
+    """Writes every span to a logger, e.g. for shipping to a log pipeline."""
+
+    def __init__(self, logger="ring_designer.timing", level=logging.DEBUG):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+
+    def record(self, name, seconds):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "span %s %.3f ms", name, seconds * 1000)
+
+
+def _percentile(sorted_samples, percent):
+    index = min(len(sorted_samples) - 1, int(round(percent / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+HISTOGRAMS = HistogramCollector()
+add_collector(HISTOGRAMS)
@@ -0,0 +1,48 @@
+"""Both progressive passes read their canvases from the atlas when one is shipped."""
+import pytest
+
+pytest.importorskip("PIL")
+
+from ring_designer import atlas, progressive  # noqa: E402
+from ring_designer.cache import SKETCH_CACHE  # noqa: E402
+from ring_designer.sketch import create_ring_sketch_indexed  # noqa: E402
+
+CONFIG = ("Pear", 2.0, "halo", ("Round",))
+
+
+def _no_render(*args, **kwargs):
+    raise AssertionError("rendered instead of reading the atlas")
+
+
+@pytest.fixture
+def shipped_atlas(tmp_path, monkeypatch):
+    path = str(tmp_path / "sketches.atlas")
+    atlas.build_atlas(path, create_ring_sketch_indexed, [CONFIG], progressive.atlas_sizes())
+    monkeypatch.setenv(atlas.ATLAS_ENV, path)
+    monkeypatch.setattr(progressive, "_seconds_per_pixel", None)
+    monkeypatch.setattr(progressive, "create_ring_sketch_indexed", _no_render)
+    monkeypatch.setattr(progressive, "compose_indexed_sketch", _no_render)
+    SKETCH_CACHE.clear()
+    progressive.FINAL_CACHE.clear()
+    yield atlas.load_atlas(path)
+    SKETCH_CACHE.clear()
+    progressive.FINAL_CACHE.clear()
+
+
+def test_atlas_holds_every_size_the_app_renders(shipped_atlas):
+    assert shipped_atlas.sizes == set(progressive.atlas_sizes())
+    assert len(shipped_atlas) == len(progressive.atlas_sizes())
+
+
+def test_preview_and_final_come_from_the_atlas(shipped_atlas):
+    shape, carat, setting_key, sides = CONFIG
+    preview = progressive.preview_sketch(shape, carat, "rose_gold", setting_key, sides)
+    assert preview.size == (progressive.PREVIEW_SIZE,) * 2
+    final = progressive.final_sketch(shape, carat, "rose_gold", setting_key, sides)
+    assert final.size == (progressive.OUTPUT_SIZE,) * 2
+
+
+def test_sizes_missing_from_the_atlas_are_rendered(shipped_atlas):
+    shape, carat, setting_key, sides = CONFIG
+    with pytest.raises(AssertionError, match="rendered"):
+        progressive.preview_sketch(shape, carat, "rose_gold", setting_key, sides, size=123)
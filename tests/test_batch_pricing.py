@@ -0,0 +1,67 @@
+"""calculate_price_batch must agree with calculate_price bit for bit."""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ring_designer.batch_pricing import (  # noqa: E402
+    calculate_price_batch, compile_price_tables, config_columns, option_grid,
+)
+from ring_designer.config import CARAT_STEPS, CONFIG_ID_LIMIT, RingConfig  # noqa: E402
+from ring_designer.pricing import calculate_price  # noqa: E402
+from ring_designer.price_book import current_price_book  # noqa: E402
+
+SAMPLE_SIZE = 20000
+
+
+def sample_configs(rng, count):
+    """Random valid designs; ids with non-canonical side digits are rejected by from_id."""
+    configs = []
+    while len(configs) < count:
+        try:
+            configs.append(RingConfig.from_id(rng.randrange(CONFIG_ID_LIMIT)))
+        except ValueError:
+            continue
+    return configs
+
+
+def batch_prices(columns, currency=None):
+    return calculate_price_batch(
+        columns["shape"], columns["carat"], columns["color"], columns["clarity"], columns["metal"],
+        columns["setting"], columns["certificate"], columns["side_shapes"], columns["diamond_type"], currency,
+    )
+
+
+@pytest.mark.parametrize("currency", [None, "USD"])
+def test_batch_matches_scalar_on_sampled_configs(currency):
+    rng = random.Random(1234)
+    configs = sample_configs(rng, SAMPLE_SIZE)
+    total, diamond, setting = batch_prices(config_columns([c.id for c in configs]), currency)
+
+    for i, config in enumerate(configs):
+        expected = calculate_price(*config.price_args(), currency)
+        assert (total[i], diamond[i], setting[i]) == expected, config
+
+
+def test_batch_matches_scalar_on_option_grid_sample():
+    columns = option_grid(CARAT_STEPS)
+    rows = np.random.default_rng(1234).choice(len(columns["shape"]), SAMPLE_SIZE, replace=False)
+    total, diamond, setting = batch_prices(columns)
+
+    options = compile_price_tables()["options"]
+    for row in rows:
+        labels = {field: options[field][columns[field][row]] for field in options}
+        expected = calculate_price(
+            labels["shape"], columns["carat"][row], labels["color"], labels["clarity"], labels["metal"],
+            labels["setting"], labels["certificate"], labels["side_shapes"], labels["diamond_type"],
+        )
+        assert (total[row], diamond[row], setting[row]) == expected
+
+
+def test_batch_uses_price_book_currencies():
+    book = current_price_book()
+    for currency in book.currencies:
+        config = RingConfig("Oval", 1.5, "Natural", "G", "VS1", "Rose Gold (14K)", "GIA", "Three-Stone", ("Pear",))
+        total = batch_prices(config_columns([config.id]), currency)[0][0]
+        assert total == calculate_price(*config.price_args(), currency)[0]
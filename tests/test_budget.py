@@ -0,0 +1,21 @@
+"""Budget search stays correct at the edges of the budget range."""
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from ring_designer.budget import search_budget  # noqa: E402
+from ring_designer.config import MAX_CARAT  # noqa: E402
+
+
+@pytest.mark.parametrize("budget", [1e300, math.inf])
+def test_unbounded_budget_affords_the_largest_carat(budget):
+    results = search_budget(budget, 5, ("carat", "color", "clarity"), {"shape": "Oval"})
+    assert len(results) == 5
+    assert all(result["config"]["carat"] == MAX_CARAT for result in results)
+
+
+def test_nan_budget_is_rejected():
+    with pytest.raises(ValueError):
+        search_budget(math.nan, 5)
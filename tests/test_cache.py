@@ -0,0 +1,52 @@
+"""LRUCache evicts least recently used entries by byte budget and counts hits and misses."""
+from ring_designer import cache as cache_module
+from ring_designer.cache import LRUCache, cached_sketch
+
+
+def test_eviction_follows_recency_within_the_byte_budget():
+    cache = LRUCache(10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbb")
+    cache.put("c", b"ccc")
+    assert cache.get("a") == b"aaaa" # "b" is now the least recently used
+    cache.put("d", b"dd")
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == [b"aaaa", b"ccc", b"dd"]
+    cache.put("e", b"eeeeee") # Needs "a" and "c" gone, the oldest first
+    assert (cache.get("a"), cache.get("c")) == (None, None)
+    assert cache.stats()["bytes"] == 8 and cache.evictions == 3
+
+
+def test_replacing_an_entry_and_oversized_entries():
+    cache = LRUCache(10)
+    cache.put("a", b"aaaaaaaa")
+    cache.put("a", b"aa")
+    assert cache.current_bytes == 2
+    cache.put("big", b"x" * 11) # Would flush everything: not cached at all
+    assert cache.get("big") is None and cache.get("a") == b"aa"
+    assert cache.evictions == 0
+
+
+def test_counters():
+    cache = LRUCache(100)
+    calls = []
+    for _ in range(3):
+        cache.get_or_create("k", lambda: calls.append(1) or b"value")
+    cache.get("missing")
+    assert len(calls) == 1
+    assert cache.stats() == {"entries": 1, "bytes": 5, "max_bytes": 100, "hits": 2, "misses": 2, "evictions": 0}
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0 and cache.hits == 2
+
+
+def test_cached_sketch_shares_one_entry_per_snapped_carat(monkeypatch):
+    monkeypatch.setattr(cache_module, "SKETCH_CACHE", LRUCache(100, sizeof=lambda value: 1))
+    renders = []
+
+    def render(shape, carat, setting_key, sides, size):
+        renders.append(carat)
+        return carat
+
+    first = cached_sketch(render, "Oval", 1.2000000000000002, "halo", ("Round",), 100)
+    second = cached_sketch(render, "Oval", 1.2, "halo", ("Pear",), 100) # Halo ignores side stones
+    assert renders == [1.2] and first == second == 1.2
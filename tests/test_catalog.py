@@ -0,0 +1,28 @@
+"""Streamed catalog sheets hold every tile where the manifest says."""
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image  # noqa: E402
+
+from ring_designer.catalog import render_sheet  # noqa: E402
+from ring_designer.compositor import compose_indexed_sketch  # noqa: E402
+from ring_designer.config import CARAT_STEPS  # noqa: E402
+from ring_designer.options import METALS  # noqa: E402
+from ring_designer.sketch import apply_metal_palette  # noqa: E402
+
+
+def test_sheet_tiles_match_single_renders(tmp_path):
+    tile_size = 48
+    name, entries = render_sheet(("Pear", "three_stone", [("Pear",), ("Round",)], str(tmp_path), tile_size))
+    sheet = Image.open(os.path.join(tmp_path, name))
+    assert len(entries) == len(CARAT_STEPS) * 2 * len(METALS)
+    assert sheet.size == (len(CARAT_STEPS) * tile_size, 2 * len(METALS) * tile_size)
+    for entry in entries[::7]:
+        indexed = compose_indexed_sketch("Pear", entry["carat"], "three_stone", tuple(entry["side_stones"]))
+        tile = apply_metal_palette(indexed, METALS[entry["metal"]]).convert("RGB")
+        tile = tile.resize((tile_size, tile_size), Image.LANCZOS)
+        box = (entry["x"], entry["y"], entry["x"] + entry["w"], entry["y"] + entry["h"])
+        assert sheet.crop(box).tobytes() == tile.tobytes()
@@ -0,0 +1,31 @@
+"""Sketches composed from cached layers are pixel-identical to direct drawing."""
+import pytest
+
+pytest.importorskip("PIL")
+
+from ring_designer.compositor import LAYER_CACHE, compose_indexed_sketch, compose_ring_sketch  # noqa: E402
+from ring_designer.options import DIAMOND_SHAPES, METALS, SETTINGS  # noqa: E402
+from ring_designer.sketch import create_ring_sketch, create_ring_sketch_indexed  # noqa: E402
+
+SIDES = {"three_stone": ("Marquise",), "seven_stone": ("Pear", "Round", "Marquise")}
+
+
+@pytest.mark.parametrize("shape", DIAMOND_SHAPES)
+@pytest.mark.parametrize("setting_key", sorted(SETTINGS.values()))
+def test_composed_sketch_matches_create_ring_sketch(shape, setting_key):
+    sides = SIDES.get(setting_key, ("Round",))
+    for carat in (0.5, 1.7, 3.0):
+        for metal_key in METALS.values():
+            expected = create_ring_sketch(shape, carat, metal_key, setting_key, sides)
+            composed = compose_ring_sketch(shape, carat, metal_key, setting_key, sides).convert("RGB")
+            assert composed.tobytes() == expected.tobytes(), (carat, metal_key)
+
+
+@pytest.mark.parametrize("size", [200, 1000])
+@pytest.mark.parametrize("setting_key", sorted(SETTINGS.values()))
+def test_layers_reused_across_renders_match_at_other_sizes(setting_key, size):
+    sides = SIDES.get(setting_key, ("Round",))
+    LAYER_CACHE.clear()
+    for shape, carat in (("Oval", 1.2), ("Oval", 2.4), ("Emerald", 2.4)): # Later renders reuse layers
+        expected = create_ring_sketch_indexed(shape, carat, setting_key, sides, size=size)
+        assert compose_indexed_sketch(shape, carat, setting_key, sides, size).tobytes() == expected.tobytes()
@@ -0,0 +1,46 @@
+"""RingConfig ids are canonical and survive pickling."""
+import pickle
+import random
+
+import pytest
+
+from ring_designer.config import CONFIG_ID_LIMIT, SIDE_RADIX, RingConfig
+
+
+def test_every_design_round_trips_through_its_id():
+    rng = random.Random(1234)
+    for _ in range(5000):
+        try:
+            config = RingConfig.from_id(rng.randrange(CONFIG_ID_LIMIT))
+        except ValueError:
+            continue
+        rebuilt = RingConfig(config.shape, config.carat, config.diamond_type, config.color, config.clarity,
+                             config.metal, config.certificate, config.setting, config.side_stones)
+        assert rebuilt.id == config.id
+        assert RingConfig.from_token(config.token) == config
+
+
+@pytest.mark.parametrize("setting,side_stones,unused", [
+    ("Solitaire (Single Diamond)", ("Round",), 5),
+    ("Halo", ("Round",), 1),
+    ("Three-Stone", ("Pear",), 4),
+])
+def test_unused_side_digits_are_rejected(setting, side_stones, unused):
+    config = RingConfig("Round", 1.0, "Natural", "G", "VS1", "Yellow Gold (14K)", "GIA", setting, side_stones)
+    assert config.id % SIDE_RADIX + unused < SIDE_RADIX
+    with pytest.raises(ValueError):
+        RingConfig.from_id(config.id + unused)
+
+
+def test_seven_stone_uses_every_side_digit():
+    config = RingConfig("Oval", 2.0, "Lab-Grown", "D", "IF", "Rose Gold (14K)", "CGL",
+                        "Seven-Stone (Cluster Sides)", ("Pear", "Round", "Marquise"))
+    base = config.id - config.id % SIDE_RADIX
+    assert len({RingConfig.from_id(base + digit).side_stones for digit in range(SIDE_RADIX)}) == SIDE_RADIX
+
+
+def test_pickle_round_trip():
+    config = RingConfig("Pear", 1.5, "Natural", "F", "VVS2", "White Gold (14K)", "GIA", "Three-Stone", ("Marquise",))
+    restored = pickle.loads(pickle.dumps(config))
+    assert restored == config
+    assert restored.as_dict() == config.as_dict()
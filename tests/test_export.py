@@ -0,0 +1,50 @@
+"""Strip rendering must add up to the single-canvas sketch, and both writers must decode."""
+import io
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image  # noqa: E402
+
+from ring_designer.export import iter_print_export, render_strips  # noqa: E402
+from ring_designer.options import DIAMOND_SHAPES, SETTINGS  # noqa: E402
+from ring_designer.sketch import apply_metal_palette, create_ring_sketch_indexed  # noqa: E402
+
+SIDES = ("Pear", "Pear", "Round")
+
+
+def sides_for(setting_key):
+    return SIDES if setting_key == "seven_stone" else SIDES[:1]
+
+
+def stripped(shape, carat, setting_key, size, strip_rows, supersample=1):
+    return b"".join(render_strips(shape, carat, "rose_gold", setting_key, sides_for(setting_key), size,
+                                  strip_rows, supersample))
+
+
+@pytest.mark.parametrize("strip_rows", [600, 300, 100, 64, 37])
+def test_strips_match_single_canvas(strip_rows):
+    size = 1200
+    canvas = apply_metal_palette(create_ring_sketch_indexed("Marquise", 2.0, "seven_stone", SIDES, size=size),
+                                 "rose_gold")
+    assert stripped("Marquise", 2.0, "seven_stone", size, strip_rows) == canvas.convert("RGB").tobytes()
+
+
+@pytest.mark.parametrize("shape", DIAMOND_SHAPES)
+@pytest.mark.parametrize("setting_key", sorted(SETTINGS.values()))
+def test_supersampled_strips_match_one_strip(shape, setting_key):
+    size = 600
+    assert stripped(shape, 2.5, setting_key, size, 37, 2) == stripped(shape, 2.5, setting_key, size, size, 2)
+
+
+@pytest.mark.parametrize("fmt", ["png", "tiff"])
+def test_print_files_decode_to_the_strips(fmt):
+    size, strip_rows = 400, 90
+    data = b"".join(iter_print_export("Pear", 1.5, "rose_gold", "halo", ("Round",), size=size, fmt=fmt,
+                                      dpi=600, strip_rows=strip_rows))
+    image = Image.open(io.BytesIO(data))
+    assert image.size == (size, size)
+    assert round(image.info["dpi"][0]) == 600
+    expected = b"".join(render_strips("Pear", 1.5, "rose_gold", "halo", ("Round",), size, strip_rows))
+    assert image.convert("RGB").tobytes() == expected
@@ -0,0 +1,59 @@
+"""The price book reloads good edits and keeps the live book through broken ones."""
+import json
+import os
+
+import pytest
+
+from ring_designer.price_book import PriceBookError, _PriceBookSource, builtin_price_book_data, parse_price_book
+
+
+@pytest.fixture
+def book_file(tmp_path):
+    path = tmp_path / "price_book.json"
+    stamp = [1_000_000_000]
+
+    def write(raw):
+        path.write_bytes(raw)
+        stamp[0] += 1 # A new mtime for every write, however fast the edits come
+        os.utime(path, (stamp[0], stamp[0]))
+
+    return path, write
+
+
+def _json(**changes):
+    data = builtin_price_book_data()
+    data["version"] = "1"
+    data.update(changes)
+    return json.dumps(data).encode("utf-8")
+
+
+def test_hot_reload_through_good_broken_and_versioned_edits(book_file, caplog):
+    path, write = book_file
+    write(_json())
+    source = _PriceBookSource(str(path), interval=0)
+    first = source.get()
+    assert (first.version, first.base_per_carat) == ("1", builtin_price_book_data()["base_per_carat"])
+
+    write(_json(base_per_carat=6000)) # Good edit, same version
+    edited = source.get()
+    assert edited.base_per_carat == 6000 and edited.version == "1" and edited.key != first.key
+
+    for broken in (b"\xff\xfe not utf-8", b"{\"version\": ", _json(currencies={})):
+        write(broken)
+        assert source.get() is edited
+    assert "Keeping price book 1" in caplog.text
+
+    write(_json(version="2", base_per_carat=6500)) # Version change
+    assert (source.get().version, source.get().base_per_carat) == ("2", 6500)
+
+
+def test_undecodable_file_is_a_price_book_error():
+    with pytest.raises(PriceBookError):
+        parse_price_book(b"table,key,value\nmeta,version,\xff\n", "prices.csv")
+
+
+def test_broken_file_without_a_live_book_raises(book_file):
+    path, write = book_file
+    write(b"\xff")
+    with pytest.raises(PriceBookError):
+        _PriceBookSource(str(path), interval=0).get()
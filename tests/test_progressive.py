@@ -0,0 +1,55 @@
+"""The final pass recovers from a slow render and never caches degraded images."""
+import pytest
+
+pytest.importorskip("PIL")
+
+from ring_designer import progressive  # noqa: E402
+
+ARGS = ("Pear", 2.0, "rose_gold", "halo", ("Round",))
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(progressive, "_seconds_per_pixel", None)
+    progressive.FINAL_CACHE.clear()
+    progressive.ENCODED_CACHE.clear()
+    yield
+    progressive.FINAL_CACHE.clear()
+    progressive.ENCODED_CACHE.clear()
+
+
+def test_degraded_render_is_not_cached_as_final():
+    progressive._record_cost(10.0, 1000 ** 2) # One very slow sample
+    assert progressive.affordable_supersample(500, 2) == 1
+    progressive.final_sketch(*ARGS, supersample=2)
+    assert progressive.cached_final_sketch(*ARGS, supersample=2) is None
+    progressive.final_sketch_bytes(*ARGS, supersample=2)
+    assert progressive.cached_final_sketch_bytes(*ARGS, supersample=2) is None
+
+
+def test_estimate_recovers_after_a_slow_sample():
+    progressive._record_cost(0.4, 1000 ** 2)
+    for _ in range(50):
+        progressive.final_sketch(*ARGS, supersample=2)
+        if progressive.cached_final_sketch(*ARGS, supersample=2) is not None:
+            break
+    assert progressive.affordable_supersample(500, 2) == 2
+    assert progressive.cached_final_sketch(*ARGS, supersample=2) is not None
+
+
+def test_each_call_looks_each_cache_up_once():
+    caches = (progressive.FINAL_CACHE, progressive.ENCODED_CACHE)
+
+    def counts():
+        return [(cache.hits, cache.misses) for cache in caches]
+
+    before = counts()
+    progressive.final_sketch_bytes(*ARGS)
+    assert counts() == [(h, m + 1) for h, m in before] # Both missed once
+    before = counts()
+    progressive.cached_final_sketch_bytes(*ARGS)
+    assert counts() == [before[0], (before[1][0] + 1, before[1][1])] # Encoded hit, render cache untouched
+    progressive.ENCODED_CACHE.clear()
+    before = counts()
+    progressive.cached_final_sketch_bytes(*ARGS)
+    assert counts() == [(before[0][0] + 1, before[0][1]), (before[1][0], before[1][1] + 1)]
@@ -0,0 +1,78 @@
+"""Quotes round-trip through SQLite: save, list, filter, export."""
+import csv
+import io
+import threading
+
+import pytest
+
+from ring_designer.config import RingConfig
+from ring_designer.quotes import COLUMNS, QuoteStore, quote_row
+
+OVAL = RingConfig("Oval", 1.5, "Natural", "G", "VS1", "Rose Gold (14K)", "GIA", "Halo")
+PEAR = RingConfig("Pear", 2.0, "Lab-Grown", "E", "VVS2", "White Gold (14K)", "CGL", "Three-Stone",
+                  ("Marquise",))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = QuoteStore(str(tmp_path / "quotes.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_saved_quote_restores_the_design(store):
+    quote_id = store.save(PEAR, (9000.0, 7000.0, 2000.0), "USD", "2024-06", customer="Ada")
+    quote = store.get(quote_id)
+    assert (quote["total"], quote["currency"], quote["customer"]) == (9000.0, "USD", "Ada")
+    assert quote["side_stones"] == "Marquise"
+    assert store.design(quote_id) == PEAR
+    assert store.get(quote_id + 1) is None
+
+
+def test_list_filters_and_pages_newest_first(store):
+    rows = [quote_row(OVAL if i % 2 else PEAR, (1000.0 * i, 800.0 * i, 200.0 * i), "USD", "v1",
+                      created_at=f"2024-01-{i:02d}T00:00:00Z")
+            for i in range(1, 11)]
+    assert store.save_many(rows) == 10
+    assert [q["total"] for q in store.list(limit=3)] == [10000.0, 9000.0, 8000.0]
+    assert [q["shape"] for q in store.list(shape="Oval")] == ["Oval"] * 5
+    assert store.count(shape=["Oval", "Pear"], min_total=3000, max_total=6000) == 4
+    assert store.count(since="2024-01-05", until="2024-01-08") == 3
+    first = store.list(limit=4)
+    second = store.list(limit=4, before_id=first[-1]["id"])
+    assert [q["total"] for q in second] == [6000.0, 5000.0, 4000.0, 3000.0]
+
+
+def test_failed_bulk_save_rolls_back(store):
+    good = quote_row(OVAL, (1.0, 1.0, 0.0), "USD", "v1")
+    with pytest.raises(Exception):
+        store.save_many([good, good[:-1]])
+    assert store.count() == 0
+
+
+def test_export_streams_matching_rows_oldest_first(store, monkeypatch):
+    monkeypatch.setattr("ring_designer.quotes.EXPORT_BATCH_ROWS", 2)
+    store.save_many(quote_row(OVAL if i % 2 else PEAR, (float(i), 0.0, 0.0), "EUR", "v1") for i in range(7))
+    out = io.StringIO()
+    assert store.export_csv(out, shape="Oval") == 3
+    header, *rows = csv.reader(io.StringIO(out.getvalue()))
+    assert tuple(header) == COLUMNS
+    assert [float(row[COLUMNS.index("total")]) for row in rows] == [1.0, 3.0, 5.0]
+
+
+def test_threads_share_one_connection(store):
+    ids = []
+
+    def save():
+        ids.append(store.save(OVAL, (1.0, 1.0, 0.0), "USD", "v1"))
+        with store.connection() as conn:
+            connections.append(conn)
+
+    connections = []
+    threads = [threading.Thread(target=save) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 8 and store.count() == 8
+    assert len({id(conn) for conn in connections}) == 1
@@ -0,0 +1,67 @@
+"""HTTP service: conditional requests, parameter validation and error responses."""
+import asyncio
+import json
+
+import pytest
+
+from ring_designer import server
+from ring_designer.price_book import PriceBookError
+
+
+@pytest.fixture
+def service():
+    service = server.RingService(workers=1)
+    yield service
+    service.close()
+
+
+def get(service, target, **headers):
+    return asyncio.run(service.handle("GET", target, {name.replace("_", "-"): v for name, v in headers.items()}))
+
+
+@pytest.mark.parametrize("target", [
+    "/price?shape=Oval&carat=1.5&setting=Three-Stone&side_stones=Pear",
+    "/sketch?shape=Pear&carat=2.0&format=svg",
+])
+def test_matching_if_none_match_gets_a_304(service, target):
+    status, headers, body = get(service, target)
+    assert status == 200 and body
+    etag = headers["ETag"]
+    status, headers, body = get(service, target, if_none_match=f'"stale", {etag}')
+    assert (status, headers["ETag"], body) == (304, etag, b"")
+    assert get(service, target, if_none_match='"stale"')[0] == 200
+
+
+@pytest.mark.parametrize("target", [
+    "/price?id=",
+    "/price?id=zzzzzzzzzz",
+    "/price?shape=Heart",
+    "/price?carat=",
+    "/price?carat=abc",
+    "/price?carat=4.0",
+    "/price?setting=Three-Stone&side_stones=Pear,Round",
+    "/price?currency=XYZ",
+    "/sketch?format=gif",
+    "/budget",
+    "/budget?budget=inf",
+    "/budget?budget=nan",
+    "/budget?budget=-5",
+    "/budget?budget=20000&top=0",
+    "/budget?budget=20000&max_carat=inf",
+    "/budget?budget=20000&order=price",
+    "/budget?budget=20000&shape=",
+])
+def test_bad_parameters_get_a_400(service, target):
+    status, headers, body = get(service, target)
+    assert status == 400, body
+    assert json.loads(body)["error"]
+
+
+def test_unexpected_errors_get_a_500(service, monkeypatch):
+    def broken_book():
+        raise PriceBookError("Invalid price book")
+
+    monkeypatch.setattr(server, "current_price_book", broken_book)
+    status, _, body = get(service, "/price?shape=Oval")
+    assert status == 500
+    assert json.loads(body) == {"error": "internal error"}
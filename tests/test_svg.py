@@ -0,0 +1,142 @@
+"""The SVG backend must look like the raster sketch once rasterized.
+
+The SVG is rasterized here with SVG semantics (strokes centred on the path,
+round joins) by a small Pillow-based renderer, supersampled, and compared
+with draw_indexed_sketch output. Anti-aliasing and Pillow's pixel snapping
+only move edges, so a pixel counts as matching when the other image has the
+same colour within one pixel of it. Clip paths are applied as masks.
+"""
+import itertools
+import re
+import xml.etree.ElementTree as ET
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from PIL import Image, ImageChops, ImageDraw  # noqa: E402
+
+from ring_designer.options import DIAMOND_SHAPES, SETTINGS, SIDE_STONE_SHAPES  # noqa: E402
+from ring_designer.sketch import IMG_SIZE, apply_metal_palette, create_ring_sketch_indexed  # noqa: E402
+from ring_designer.svg import create_ring_sketch_svg  # noqa: E402
+
+SUPERSAMPLE = 2
+METAL = "rose_gold"
+MAX_MISMATCH = 0.001 # Fraction of pixels with no same-coloured neighbour in the other image
+SIDES = {
+    "three_stone": [(shape,) for shape in SIDE_STONE_SHAPES],
+    "seven_stone": [("Pear", "Round", "Marquise"), ("Marquise", "Pear", "Round")],
+}
+
+
+def _rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5)) if color.startswith("#") else color
+
+
+def _floats(element, *names):
+    return [float(element.get(name)) * SUPERSAMPLE for name in names]
+
+
+def _points(element):
+    return [tuple(float(v) * SUPERSAMPLE for v in point.split(","))
+            for point in element.get("points").split()]
+
+
+def _mask(paint):
+    mask = Image.new("L", (IMG_SIZE * SUPERSAMPLE,) * 2, 0)
+    paint(ImageDraw.Draw(mask))
+    return mask
+
+
+def _shape_masks(element, stroke_width):
+    """(fill mask, stroke mask) of one element, strokes centred on the outline."""
+    half = stroke_width / 2
+    tag = element.tag.rsplit("}", 1)[-1]
+    if tag == "ellipse":
+        cx, cy, rx, ry = _floats(element, "cx", "cy", "rx", "ry")
+        def region(grow):
+            return _mask(lambda d: d.ellipse((cx - rx - grow, cy - ry - grow, cx + rx + grow, cy + ry + grow), fill=255))
+    elif tag == "rect":
+        x, y, w, h = _floats(element, "x", "y", "width", "height")
+        radius = float(element.get("rx", 0)) * SUPERSAMPLE
+        def region(grow):
+            box = (x - grow, y - grow, x + w + grow, y + h + grow)
+            return _mask(lambda d: d.rounded_rectangle(box, max(0, radius + grow), fill=255))
+    elif tag == "polygon":
+        points = _points(element)
+        fill = _mask(lambda d: d.polygon(points, fill=255))
+        def outline(d):
+            d.line(points + points[:1], fill=255, width=round(stroke_width), joint="curve")
+            for px, py in points:
+                d.ellipse((px - half, py - half, px + half, py + half), fill=255)
+        return fill, _mask(outline) if stroke_width else None
+    elif tag == "polyline":
+        points = _points(element)
+        return None, _mask(lambda d: d.line(points, fill=255, width=round(stroke_width), joint="curve"))
+    else:
+        raise AssertionError(f"Unexpected SVG element: {tag}")
+    if not stroke_width:
+        return region(0), None
+    return region(-half), ImageChops.subtract(region(half), region(-half))
+
+
+def rasterize_svg(document):
+    root = ET.fromstring(document)
+    canvas = Image.new("RGB", (IMG_SIZE * SUPERSAMPLE,) * 2, "white")
+    clips = {}
+    for element in list(root)[1:]: # Skip the background rect
+        if element.tag.endswith("clipPath"):
+            clips[f"url(#{element.get('id')})"] = _shape_masks(element[0], 0)[0]
+            continue
+        stroke = element.get("stroke")
+        stroke_width = float(element.get("stroke-width", 0)) * SUPERSAMPLE if stroke else 0
+        fill_mask, stroke_mask = _shape_masks(element, stroke_width)
+        clip = clips.get(element.get("clip-path"))
+        if clip is not None:
+            fill_mask = fill_mask and ImageChops.multiply(fill_mask, clip)
+            stroke_mask = stroke_mask and ImageChops.multiply(stroke_mask, clip)
+        if fill_mask is not None and element.get("fill", "none") != "none":
+            canvas.paste(_rgb(element.get("fill")), mask=fill_mask)
+        if stroke_mask is not None:
+            canvas.paste(_rgb(stroke), mask=stroke_mask)
+    return canvas.resize((IMG_SIZE, IMG_SIZE), Image.NEAREST)
+
+
+def _unmatched(a, b):
+    """Pixels of a whose colour appears nowhere in b's 3x3 neighbourhood."""
+    padded = np.pad(b, ((1, 1), (1, 1), (0, 0)), mode="edge")
+    matched = np.zeros(a.shape[:2], dtype=bool)
+    for dy, dx in itertools.product(range(3), repeat=2):
+        matched |= (padded[dy:dy + IMG_SIZE, dx:dx + IMG_SIZE] == a).all(axis=2)
+    return ~matched
+
+
+CASES = [
+    (shape, setting_key, sides)
+    for shape in DIAMOND_SHAPES
+    for setting_key in SETTINGS.values()
+    for sides in SIDES.get(setting_key, [("Round",)])
+]
+
+
+@pytest.mark.parametrize("shape,setting_key,sides", CASES)
+def test_svg_matches_raster(shape, setting_key, sides):
+    carat = 1.5
+    raster = np.asarray(apply_metal_palette(
+        create_ring_sketch_indexed(shape, carat, setting_key, sides), METAL).convert("RGB"))
+    vector = np.asarray(rasterize_svg(create_ring_sketch_svg(shape, carat, METAL, setting_key, sides)))
+
+    for a, b in ((raster, vector), (vector, raster)):
+        assert _unmatched(a, b).mean() <= MAX_MISMATCH
+
+
+def test_rasterizer_catches_missing_geometry():
+    """Guards the comparison itself: dropping an element must fail it."""
+    raster = np.asarray(apply_metal_palette(
+        create_ring_sketch_indexed("Oval", 1.5, "halo", ("Round",)), METAL).convert("RGB"))
+    document = create_ring_sketch_svg("Oval", 1.5, METAL, "halo", ("Round",))
+    # Drop the last element (the halo frame)
+    document = re.sub(r"<[a-z]+ [^<]*/></svg>$", "</svg>", document)
+    vector = np.asarray(rasterize_svg(document))
+    assert _unmatched(raster, vector).mean() > MAX_MISMATCH